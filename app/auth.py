@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from functools import wraps
 import os
@@ -5,30 +7,55 @@ from typing import Annotated
 
 from dotenv import load_dotenv
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 import jwt
 from jwt.exceptions import InvalidTokenError
 from passlib.context import CryptContext
 from pydantic import BaseModel
 from sqlmodel import Session, select
 
-from app.db.models import User
+from app.cache import CacheBackend, cache_call, get_counter_backend
+from app.db.models import User, get_role_permissions
+from app.db.permissions import role_permission_cache
 from app.dependencies import get_session, oauth2_scheme
+from app.metrics import AUTH_FAILURES
+
+load_dotenv()
+
+SECRET_KEY = os.environ.get("TOKEN_SECRET_KEY")
+ALGORITHM = "HS256"
+PASSWORD_HASH_CONCURRENCY = int(
+    os.environ.get("PASSWORD_HASH_CONCURRENCY", os.cpu_count() or 1)
+)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is deliberately slow, so it runs on its own small pool rather than
+# on the event loop or the request threadpool
+password_hashing = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_CONCURRENCY, thread_name_prefix="password-hash"
+)
+
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return password_hashing.submit(pwd_context.hash, password).result()
 
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hashing.submit(
+        pwd_context.verify, plain_password, hashed_password
+    ).result()
 
 
-load_dotenv()
+async def verify_password_async(plain_password, hashed_password):
+    return await asyncio.wrap_future(
+        password_hashing.submit(pwd_context.verify, plain_password, hashed_password)
+    )
 
-SECRET_KEY = os.environ.get("TOKEN_SECRET_KEY")
-ALGORITHM = "HS256"
+
+async def dummy_verify_password_async():
+    await asyncio.wrap_future(password_hashing.submit(pwd_context.dummy_verify))
+    return False
 
 
 class Token(BaseModel):
@@ -38,6 +65,50 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email_address: str | None = None
+    user_id: int | None = None
+    role_id: int | None = None
+    version: int | None = None
+
+
+class CurrentUser(BaseModel):
+    id: int
+    email_address: str
+    role_id: int | None = None
+    permissions: frozenset[str] = frozenset()
+
+    def has(self, permission: str) -> bool:
+        return permission in self.permissions
+
+
+class TokenVersions:
+    """Table of the token version each user must present.
+
+    Bumping a user's version revokes every token issued to them before the
+    bump. The versions are counters on the counter backend, so with Redis
+    they are shared by every worker and survive restarts; with the in-memory
+    backend they are per process and start empty, and tokens are
+    short-lived to bound that window. A token with a newer version than this
+    process knows of is accepted. Reads raise ``CacheError`` when Redis is
+    unreachable, so revocations are never skipped.
+    """
+
+    def __init__(self, backend: CacheBackend | None = None):
+        self._backend = backend
+
+    @property
+    def backend(self) -> CacheBackend:
+        if self._backend is None:
+            self._backend = get_counter_backend()
+        return self._backend
+
+    def current(self, user_id: int) -> int:
+        return self.backend.counter(f"token_version:{user_id}")
+
+    def revoke(self, user_id: int):
+        self.backend.incr(f"token_version:{user_id}")
+
+
+token_versions = TokenVersions()
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
@@ -51,6 +122,52 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return encoded_jwt
 
 
+def create_user_access_token(user: User, expires_delta: timedelta | None = None):
+    return create_access_token(
+        data={
+            "sub": user.email_address,
+            "uid": user.id,
+            "rid": user.role_id,
+            "ver": token_versions.current(user.id),
+        },
+        expires_delta=expires_delta,
+    )
+
+
+def cached_token_permissions(token: str) -> frozenset[str]:
+    """Permissions granted to a bearer token, without touching the database.
+
+    Invalid, revoked and legacy tokens get none, and so does a role whose
+    permissions aren't cached yet. This reads the cache backends, so call it
+    through ``cache_call`` on the event loop.
+    """
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except InvalidTokenError:
+        return frozenset()
+    user_id = payload.get("uid")
+    if user_id is None or payload.get("ver") != token_versions.current(user_id):
+        return frozenset()
+    return role_permission_cache.get(payload.get("rid")) or frozenset()
+
+
+def cached_credentials(
+    token_data: TokenData, check_version: bool
+) -> tuple[bool, frozenset[str] | None]:
+    """Whether the token is still valid, and its role's cached permissions.
+
+    The permissions are None on a cache miss.
+    """
+    if check_version and (
+        token_data.version is None
+        or token_data.version < token_versions.current(token_data.user_id)
+    ):
+        # Only older versions are revoked: a newer one was issued after a
+        # revocation this process hasn't seen
+        return False, None
+    return True, role_permission_cache.get(token_data.role_id)
+
+
 def get_user(email_address: str, session: Session) -> User:
     db_user = session.exec(
         select(User).where(User.email_address == email_address.lower())
@@ -58,11 +175,16 @@ def get_user(email_address: str, session: Session) -> User:
     return db_user
 
 
-def authenticate_user(email_address: str, password: str, session: Session):
-    user = get_user(email_address=email_address, session=session)
+async def authenticate_user(email_address: str, password: str, session: Session):
+    user = await run_in_threadpool(
+        get_user, email_address=email_address, session=session
+    )
     if not user:
-        return False
-    if not verify_password(password, user.password_hash):
+        AUTH_FAILURES.inc("unknown_user")
+        # Spend the same time as a real check so unknown emails can't be probed
+        return await dummy_verify_password_async()
+    if not await verify_password_async(password, user.password_hash):
+        AUTH_FAILURES.inc("bad_password")
         return False
     return user
 
@@ -70,7 +192,7 @@ def authenticate_user(email_address: str, password: str, session: Session):
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
     session: Annotated[Session, Depends(get_session)],
-) -> User:
+) -> CurrentUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -80,14 +202,44 @@ async def get_current_user(
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email_address: str = payload.get("sub")
         if email_address is None:
+            AUTH_FAILURES.inc("invalid_token")
             raise credentials_exception
-        token_data = TokenData(email_address=email_address)
+        token_data = TokenData(
+            email_address=email_address,
+            user_id=payload.get("uid"),
+            role_id=payload.get("rid"),
+            version=payload.get("ver"),
+        )
     except InvalidTokenError:
+        AUTH_FAILURES.inc("invalid_token")
         raise credentials_exception
-    user = get_user(email_address=token_data.email_address, session=session)
-    if user is None:
+    check_version = token_data.user_id is not None
+    if not check_version:
+        # Tokens issued before ids were embedded still need a lookup
+        user = await run_in_threadpool(
+            get_user, email_address=token_data.email_address, session=session
+        )
+        if user is None:
+            AUTH_FAILURES.inc("unknown_user")
+            raise credentials_exception
+        token_data.user_id = user.id
+        token_data.role_id = user.role_id
+    # Raises CacheError, answered with a 503, if revocations can't be checked
+    valid, permissions = await cache_call(cached_credentials, token_data, check_version)
+    if not valid:
+        AUTH_FAILURES.inc("revoked_token")
         raise credentials_exception
-    return user
+    # Only a cache miss needs the database, and that must not block the loop
+    if permissions is None:
+        permissions = await run_in_threadpool(
+            get_role_permissions, token_data.role_id, session=session
+        )
+    return CurrentUser(
+        id=token_data.user_id,
+        email_address=token_data.email_address,
+        role_id=token_data.role_id,
+        permissions=permissions,
+    )
 
 
 def require_permission(*permissions: str):
@@ -98,6 +250,7 @@ def require_permission(*permissions: str):
             if not current_user or not any(
                 current_user.has(permission) for permission in permissions
             ):
+                AUTH_FAILURES.inc("permission_denied")
                 raise HTTPException(
                     status_code=400,
                     detail=f"User does not have any of the required permission {permissions}",
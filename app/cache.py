@@ -0,0 +1,553 @@
+"""Cache backends shared by the in-process caches.
+
+``CACHE_URL`` picks the backend. The default, ``memory://``, keeps
+everything in the process: an LRU of at most ``CACHE_MAXSIZE`` entries.
+``redis://[:password@]host[:port][/db]`` stores entries, counters and
+invalidations in Redis, so every uvicorn worker sees the same state;
+``rediss://`` connects over TLS and verifies the server's certificate. The
+client speaks the Redis protocol directly, so any server that implements it
+(Redis, Valkey, KeyDB) works without an extra dependency.
+
+Entries are pickled, and unpickling runs arbitrary code, so each one is
+signed with ``CACHE_SIGNING_KEY`` (by default the token secret) and an entry
+with a bad signature is ignored. Anyone who can write to the server still
+can't get the app to load their data.
+
+Entries always expire, after ``CACHE_TTL`` seconds unless a cache sets its
+own TTL. Counters (token versions, generations) have no TTL and must never
+be evicted, or revoked tokens would become valid again. The server must
+therefore run with ``maxmemory-policy noeviction`` or a ``volatile-*``
+policy, which only evicts keys that have a TTL; the backend logs an error
+if it finds an ``allkeys-*`` policy. ``CACHE_COUNTER_URL`` puts the
+counters on a separate server.
+
+``Cache`` is a namespace on a backend with a generation counter. Each entry
+is stored with the generation its value was computed at, and reads ignore
+entries older than the last invalidation of their key, so a value that
+raced with an invalidation in any process is never served. Invalidations are
+broadcast, so caches that keep objects in memory (the catalog, role ETags)
+can tell that another worker changed the data.
+
+Redis calls block, so code on the event loop makes them through
+``cache_call``. Entry reads and writes that fail are logged and treated as
+misses. Counter operations raise ``CacheError``, which the app answers with
+a 503.
+"""
+
+from collections import OrderedDict
+from functools import cache
+import hashlib
+import hmac
+import logging
+import os
+import pickle
+from queue import Empty, Full, LifoQueue
+import socket
+import ssl
+from threading import Lock, Thread
+import time
+from urllib.parse import unquote, urlsplit
+
+from anyio import to_thread
+
+from app.db.database import env_float, env_int
+from app.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger("app.cache")
+
+CACHE_URL = os.environ.get("CACHE_URL", "memory://")
+CACHE_COUNTER_URL = os.environ.get("CACHE_COUNTER_URL", CACHE_URL)
+CACHE_MAXSIZE = env_int("CACHE_MAXSIZE", 10000)
+CACHE_TTL = env_float("CACHE_TTL", 3600.0)
+CACHE_PREFIX = os.environ.get("CACHE_PREFIX", "app:")
+CACHE_SIGNING_KEY = os.environ.get(
+    "CACHE_SIGNING_KEY", os.environ.get("TOKEN_SECRET_KEY")
+)
+REDIS_TIMEOUT = 1.0
+REDIS_POOL_SIZE = 16
+RESUBSCRIBE_DELAY = 1.0
+# A subscription that doesn't answer a PING within this many seconds is
+# assumed dead and reopened
+SUBSCRIBER_PING_INTERVAL = 30.0
+
+MISSING = object()
+
+
+class CacheError(Exception):
+    pass
+
+
+class CacheBackend:
+    """Key-value storage with TTLs, counters and a broadcast channel."""
+
+    # Whether other worker processes see the same state
+    shared = False
+
+    def get(self, key: str):
+        """Return the value stored at ``key``, or ``MISSING``."""
+        raise NotImplementedError
+
+    def get_with_counters(self, key: str, *counters: str) -> tuple[object, list[int]]:
+        """``get(key)`` and the values of ``counters``, read together."""
+        raise NotImplementedError
+
+    def set(self, key: str, value, ttl: float | None = None):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def counter(self, key: str) -> int:
+        raise NotImplementedError
+
+    def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+    def set_counter(self, key: str, value: int):
+        raise NotImplementedError
+
+    def publish(self, channel: str, message: str):
+        raise NotImplementedError
+
+    def subscribe(self, channel: str, callback):
+        """Call ``callback(message)`` for every message on ``channel``.
+
+        ``message`` is ``None`` after a reconnect, when messages may have
+        been missed.
+        """
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    def __init__(self, maxsize: int = CACHE_MAXSIZE):
+        self.maxsize = maxsize
+        # key: (expiry or None, value), least recently used first
+        self._entries: OrderedDict[str, tuple[float | None, object]] = OrderedDict()
+        self._counters: dict[str, int] = {}
+        self._subscribers: dict[str, list] = {}
+        self._lock = Lock()
+
+    def _get(self, key: str):
+        if (entry := self._entries.get(key)) is None:
+            return MISSING
+        expiry, value = entry
+        if expiry is not None and expiry <= time.monotonic():
+            del self._entries[key]
+            return MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def get(self, key: str):
+        with self._lock:
+            return self._get(key)
+
+    def get_with_counters(self, key: str, *counters: str) -> tuple[object, list[int]]:
+        with self._lock:
+            return self._get(key), [self._counters.get(c, 0) for c in counters]
+
+    def set(self, key: str, value, ttl: float | None = None):
+        expiry = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (expiry, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def counter(self, key: str) -> int:
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = self._counters[key] = self._counters.get(key, 0) + 1
+            return value
+
+    def set_counter(self, key: str, value: int):
+        with self._lock:
+            self._counters[key] = value
+
+    def publish(self, channel: str, message: str):
+        for callback in self._subscribers.get(channel, ()):
+            callback(message)
+
+    def subscribe(self, channel: str, callback):
+        self._subscribers.setdefault(channel, []).append(callback)
+
+
+def _encode_command(*args) -> bytes:
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+def _read_reply(stream):
+    line = stream.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Connection closed by the cache server")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        raise CacheError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        if (length := int(rest)) < 0:
+            return None
+        data = stream.read(length + 2)
+        if len(data) != length + 2:
+            raise ConnectionError("Connection closed by the cache server")
+        return data[:-2]
+    if kind == b"*":
+        if (length := int(rest)) < 0:
+            return None
+        return [_read_reply(stream) for _ in range(length)]
+    raise CacheError(f"Unexpected reply {line!r}")
+
+
+class RedisConnection:
+    def __init__(self, host: str, port: int, db: int, password: str | None, tls: bool):
+        self.socket = socket.create_connection((host, port), timeout=REDIS_TIMEOUT)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if tls:
+            self.socket = ssl.create_default_context().wrap_socket(
+                self.socket, server_hostname=host
+            )
+        self.stream = self.socket.makefile("rb")
+        if password:
+            self.execute("AUTH", password)
+        if db:
+            self.execute("SELECT", db)
+
+    def send(self, *args):
+        self.socket.sendall(_encode_command(*args))
+
+    def execute(self, *args):
+        self.send(*args)
+        return _read_reply(self.stream)
+
+    def close(self):
+        self.stream.close()
+        self.socket.close()
+
+
+class RedisBackend(CacheBackend):
+    shared = True
+    # Policies that evict keys without a TTL, counters included
+    UNSAFE_EVICTION_POLICIES = ("allkeys-",)
+
+    def __init__(
+        self,
+        url: str,
+        prefix: str = CACHE_PREFIX,
+        signing_key: str | None = None,
+    ):
+        parts = urlsplit(url)
+        self.address = (
+            parts.hostname or "localhost",
+            parts.port or 6379,
+            int(parts.path.lstrip("/") or 0),
+            unquote(parts.password) if parts.password else None,
+            parts.scheme == "rediss",
+        )
+        self.prefix = prefix
+        if not (signing_key := signing_key or CACHE_SIGNING_KEY):
+            raise ValueError("CACHE_SIGNING_KEY must be set to use Redis")
+        self._signing_key = signing_key.encode()
+        self._pool: LifoQueue[RedisConnection] = LifoQueue(REDIS_POOL_SIZE)
+        self._subscribers: dict[str, list] = {}
+        self._subscriber_lock = Lock()
+        self._listener: Thread | None = None
+        self._listener_connection: RedisConnection | None = None
+        self._policy_checked = False
+
+    def _connect(self) -> RedisConnection:
+        connection = RedisConnection(*self.address)
+        if not self._policy_checked:
+            self._policy_checked = True
+            self._check_eviction_policy(connection)
+        return connection
+
+    def _check_eviction_policy(self, connection: RedisConnection):
+        try:
+            _, policy = connection.execute("CONFIG", "GET", "maxmemory-policy")
+        except (CacheError, TypeError, ValueError):
+            # CONFIG is often disabled on managed servers
+            return
+        if policy.decode().startswith(self.UNSAFE_EVICTION_POLICIES):
+            logger.error(
+                "Cache server uses maxmemory-policy %s, which can evict token "
+                "revocations; use noeviction or a volatile-* policy",
+                policy.decode(),
+            )
+
+    def execute(self, *args):
+        try:
+            connection = self._pool.get_nowait()
+        except Empty:
+            connection = None
+        try:
+            if connection is None:
+                connection = self._connect()
+            return connection.execute(*args)
+        except OSError as e:
+            # The connection may be half way through a reply
+            if connection is not None:
+                connection.close()
+                connection = None
+            raise CacheError(f"Cache server unavailable: {e}") from e
+        finally:
+            if connection is not None:
+                try:
+                    self._pool.put_nowait(connection)
+                except Full:
+                    connection.close()
+
+    def _sign(self, data: bytes) -> bytes:
+        return hmac.new(self._signing_key, data, hashlib.sha256).digest()
+
+    def _dumps(self, value) -> bytes:
+        data = pickle.dumps(value)
+        return self._sign(data) + data
+
+    def _loads(self, data: bytes):
+        signature, data = data[:32], data[32:]
+        if not hmac.compare_digest(signature, self._sign(data)):
+            logger.error("Ignoring a cache entry with a bad signature")
+            return MISSING
+        return pickle.loads(data)
+
+    def get(self, key: str):
+        return self.get_with_counters(key)[0]
+
+    def get_with_counters(self, key: str, *counters: str) -> tuple[object, list[int]]:
+        try:
+            data, *values = self.execute(
+                "MGET", *(self.prefix + name for name in (key, *counters))
+            )
+        except CacheError:
+            logger.warning("Cache read failed", exc_info=True)
+            return MISSING, [0] * len(counters)
+        value = MISSING if data is None else self._loads(data)
+        return value, [int(count or 0) for count in values]
+
+    def set(self, key: str, value, ttl: float | None = None):
+        args = ["SET", self.prefix + key, self._dumps(value)]
+        if ttl is not None:
+            args += ["PX", max(int(ttl * 1000), 1)]
+        try:
+            self.execute(*args)
+        except CacheError:
+            logger.warning("Cache write failed", exc_info=True)
+
+    def delete(self, key: str):
+        try:
+            self.execute("DEL", self.prefix + key)
+        except CacheError:
+            logger.warning("Cache delete failed", exc_info=True)
+
+    def counter(self, key: str) -> int:
+        return int(self.execute("GET", self.prefix + key) or 0)
+
+    def incr(self, key: str) -> int:
+        return self.execute("INCR", self.prefix + key)
+
+    def set_counter(self, key: str, value: int):
+        self.execute("SET", self.prefix + key, value)
+
+    def publish(self, channel: str, message: str):
+        self.execute("PUBLISH", self.prefix + channel, message)
+
+    def subscribe(self, channel: str, callback):
+        with self._subscriber_lock:
+            self._subscribers.setdefault(self.prefix + channel, []).append(callback)
+            if self._listener is None:
+                self._listener = Thread(
+                    target=self._listen, name="cache-subscriber", daemon=True
+                )
+                self._listener.start()
+                Thread(
+                    target=self._keep_alive, name="cache-keepalive", daemon=True
+                ).start()
+            elif self._listener_connection is not None:
+                # Otherwise the listener subscribes once it connects
+                self._listener_connection.send("SUBSCRIBE", self.prefix + channel)
+
+    def _listen(self):
+        connected_before = False
+        while True:
+            try:
+                connection = RedisConnection(*self.address)
+                connection.socket.settimeout(None)
+                connection.socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+                connection.last_reply = time.monotonic()
+                connection.pinged_at = None
+                with self._subscriber_lock:
+                    self._listener_connection = connection
+                    connection.send("SUBSCRIBE", *self._subscribers)
+                    callbacks = list(self._subscribers.items())
+                if connected_before:
+                    for _, channel_callbacks in callbacks:
+                        for callback in channel_callbacks:
+                            callback(None)
+                connected_before = True
+                while True:
+                    reply = _read_reply(connection.stream)
+                    connection.last_reply = time.monotonic()
+                    if reply[0] == b"message":
+                        channel, message = reply[1].decode(), reply[2].decode()
+                        for callback in list(self._subscribers.get(channel, ())):
+                            callback(message)
+            except Exception:
+                logger.warning("Cache subscription lost, reconnecting", exc_info=True)
+                with self._subscriber_lock:
+                    self._listener_connection = None
+                time.sleep(RESUBSCRIBE_DELAY)
+
+    def _keep_alive(self):
+        """PING the subscription, and close it if a PING goes unanswered.
+
+        A connection whose peer vanished without closing it never fails a
+        read, so without this the listener would wait forever and every
+        invalidation from then on would be missed. Closing it makes the
+        listener reconnect, which tells the subscribers to catch up.
+        """
+        while True:
+            time.sleep(SUBSCRIBER_PING_INTERVAL)
+            with self._subscriber_lock:
+                if (connection := self._listener_connection) is None:
+                    continue
+                try:
+                    pinged_at = connection.pinged_at
+                    if pinged_at is not None and connection.last_reply < pinged_at:
+                        logger.warning("Cache subscription stopped answering")
+                        connection.socket.shutdown(socket.SHUT_RDWR)
+                    else:
+                        connection.pinged_at = time.monotonic()
+                        connection.send("PING")
+                except OSError:
+                    # The listener notices the broken connection itself
+                    pass
+
+
+def create_backend(url: str) -> CacheBackend:
+    scheme = urlsplit(url).scheme
+    if scheme == "memory":
+        return MemoryBackend()
+    if scheme in ("redis", "rediss"):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported cache URL scheme {scheme!r}")
+
+
+# Created on first use so importing the app never connects to Redis
+@cache
+def get_backend() -> CacheBackend:
+    return create_backend(CACHE_URL)
+
+
+@cache
+def get_counter_backend() -> CacheBackend:
+    if CACHE_COUNTER_URL == CACHE_URL:
+        return get_backend()
+    return create_backend(CACHE_COUNTER_URL)
+
+
+async def cache_call(func, *args):
+    """Call ``func``, which uses the cache backends, from the event loop.
+
+    Redis calls block on the network, so they run in the threadpool. The
+    in-memory backend never blocks and skips the hop.
+    """
+    if get_backend().shared or get_counter_backend().shared:
+        return await to_thread.run_sync(func, *args)
+    return func(*args)
+
+
+class Cache:
+    """A namespace of cached values with a broadcast generation.
+
+    ``generation`` goes up whenever anything in the namespace is
+    invalidated, in any process. Values are stored with the generation they
+    were computed at, and ``get`` ignores a value computed before the last
+    invalidation of its key or of the whole namespace.
+    """
+
+    def __init__(self, name: str, ttl: float = CACHE_TTL, backend=None):
+        self.name = name
+        self.ttl = ttl
+        self._backend = backend
+        # Loaded and subscribed to on first use
+        self._generation: int | None = None
+        self._lock = Lock()
+
+    @property
+    def backend(self) -> CacheBackend:
+        if self._backend is None:
+            self._backend = get_backend()
+        return self._backend
+
+    @property
+    def generation(self) -> int:
+        if (generation := self._generation) is None:
+            with self._lock:
+                if self._generation is None:
+                    self.backend.subscribe(self.name, self._on_invalidate)
+                    self._generation = self.backend.counter(f"{self.name}:generation")
+                generation = self._generation
+        return generation
+
+    def _advance(self, generation: int):
+        with self._lock:
+            if self._generation is None or generation > self._generation:
+                self._generation = generation
+
+    def _on_invalidate(self, message: str | None):
+        if message is None:
+            # Resubscribed, so invalidations may have been missed
+            self._advance(self.backend.counter(f"{self.name}:generation"))
+        else:
+            self._advance(int(message))
+
+    def _key(self, key) -> str:
+        return f"{self.name}:{key}"
+
+    def get(self, key):
+        entry, invalidated = self.backend.get_with_counters(
+            self._key(key),
+            f"{self.name}:invalidated",
+            f"{self.name}:invalidated:{key}",
+        )
+        value = MISSING
+        if entry is not MISSING:
+            generation, value = entry
+            if generation < max(invalidated):
+                value = MISSING
+        CACHE_REQUESTS.inc(self.name, "miss" if value is MISSING else "hit")
+        return value
+
+    def set(self, key, value, generation: int | None = None):
+        """Store ``value``, computed from data read at ``generation``.
+
+        ``generation`` defaults to the current one. If ``key`` is
+        invalidated after that generation, in this process or another, the
+        value is never served, even if it's stored after the invalidation.
+        """
+        if generation is None:
+            generation = self.generation
+        self.backend.set(self._key(key), (generation, value), self.ttl)
+
+    def invalidate(self, key=None):
+        generation = self.backend.incr(f"{self.name}:generation")
+        if key is None:
+            self.backend.set_counter(f"{self.name}:invalidated", generation)
+        else:
+            self.backend.set_counter(f"{self.name}:invalidated:{key}", generation)
+            self.backend.delete(self._key(key))
+        self._advance(generation)
+        self.backend.publish(self.name, str(generation))
@@ -0,0 +1,128 @@
+import datetime
+
+from sqlalchemy import bindparam, insert, update
+from sqlmodel import Session, select
+
+from app.db.models import Weight
+
+
+def find_missing_ids(session: Session, model, ids) -> list[int]:
+    """Return the ids in ``ids`` that have no ``model`` row, in one query."""
+    ids = set(ids)
+    if not ids:
+        return []
+    found = set(session.exec(select(model.id).where(model.id.in_(ids))))
+    return sorted(ids - found)
+
+
+def insert_exercise_links(
+    session: Session, model, parent_column: str, parent_id: int, exercise_ids
+) -> dict[int, int]:
+    """Link ``exercise_ids`` to a new workout or routine.
+
+    ``model`` is ``WorkoutExercise`` or ``RoutineExercise``, which are unique
+    on (parent, exercise). All rows go in one executemany and their ids are
+    read back with a single select, keyed by exercise id.
+    """
+    insert_rows(
+        session,
+        model,
+        [
+            {parent_column: parent_id, "exercise_id": exercise_id}
+            for exercise_id in dict.fromkeys(exercise_ids)
+        ],
+    )
+    return dict(
+        session.exec(
+            select(model.exercise_id, model.id).where(
+                getattr(model, parent_column) == parent_id
+            )
+        ).all()
+    )
+
+
+def ensure_exercise_links(
+    session: Session, model, parent_column: str, pairs
+) -> dict[tuple[int, int], int]:
+    """Resolve (parent id, exercise id) pairs to link row ids, creating any
+    that don't exist yet.
+
+    Existing links are found with one query, the missing ones are inserted
+    with one executemany and then read back with the same query.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return {}
+    parent = getattr(model, parent_column)
+    query = select(parent, model.exercise_id, model.id).where(
+        parent.in_({parent_id for parent_id, _ in pairs}),
+        model.exercise_id.in_({exercise_id for _, exercise_id in pairs}),
+    )
+
+    def resolve():
+        return {
+            (parent_id, exercise_id): link_id
+            for parent_id, exercise_id, link_id in session.exec(query)
+        }
+
+    links = resolve()
+    if missing := pairs - links.keys():
+        insert_rows(
+            session,
+            model,
+            [
+                {parent_column: parent_id, "exercise_id": exercise_id}
+                for parent_id, exercise_id in sorted(missing)
+            ],
+        )
+        links = resolve()
+    return links
+
+
+def insert_rows(session: Session, model, rows: list[dict]):
+    """Insert ``rows`` with a single executemany, skipping empty batches."""
+    if rows:
+        session.execute(insert(model), rows)
+
+
+def upsert_weights(
+    session: Session, user_id: int, weights: dict[datetime.date, float]
+) -> tuple[int, int]:
+    """Insert or update one weight per date for ``user_id``.
+
+    Existing dates are found with one range query, then updates and inserts
+    each go in a single executemany. Returns (inserted, updated) counts.
+    """
+    if not weights:
+        return 0, 0
+    existing = set(
+        session.exec(
+            select(Weight.date).where(
+                Weight.user_id == user_id,
+                Weight.date.between(min(weights), max(weights)),
+            )
+        )
+    )
+    updates = [
+        {"b_date": date, "b_weight": weight}
+        for date, weight in weights.items()
+        if date in existing
+    ]
+    if updates:
+        table = Weight.__table__
+        session.execute(
+            update(table)
+            .where(table.c.user_id == user_id, table.c.date == bindparam("b_date"))
+            .values(weight=bindparam("b_weight")),
+            updates,
+        )
+    insert_rows(
+        session,
+        Weight,
+        [
+            {"user_id": user_id, "date": date, "weight": weight}
+            for date, weight in weights.items()
+            if date not in existing
+        ],
+    )
+    return len(weights) - len(updates), len(updates)
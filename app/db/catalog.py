@@ -0,0 +1,175 @@
+"""In-process cache of the exercise and muscle group catalog.
+
+The catalog only changes through the admin endpoints, so it's loaded in
+three queries and served from memory until one of them calls
+``invalidate``. Each load is stamped with the cache's version, which only
+ever goes up, so a version identifies the catalog contents. A load that
+races with an invalidation is discarded rather than cached, like
+``RolePermissionCache``.
+
+Catalogs are kept per engine, and each worker process has its own copy. The
+version is the generation of a ``Cache``, so with a shared cache backend an
+invalidation in one worker reaches all of them. Without one, other workers'
+changes can't be seen, so a catalog is reloaded once it's ``CATALOG_TTL``
+seconds old and exercise ids are always checked against the database.
+"""
+
+from dataclasses import dataclass
+import logging
+from threading import Lock
+import time
+from weakref import WeakKeyDictionary
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from app.cache import Cache, MemoryBackend
+from app.db.bulk import find_missing_ids
+from app.db.database import CATALOG_TTL
+from app.db.models import (
+    Exercise,
+    ExerciseMuscleGroup,
+    ExerciseRead,
+    MuscleGroup,
+    MuscleGroupRead,
+)
+from app.etag import make_etag
+
+logger = logging.getLogger("app.db.catalog")
+
+
+@dataclass(frozen=True)
+class Catalog:
+    version: int
+    # A hash of the contents, the same in every process
+    etag: str
+    # Both in id order
+    exercises: dict[int, ExerciseRead]
+    musclegroups: dict[int, MuscleGroupRead]
+    exercise_musclegroups: dict[int, tuple[int, ...]]
+    musclegroup_exercises: dict[int, tuple[int, ...]]
+    loaded_at: float
+
+    def exercise_musclegroup_list(self, exercise_id: int) -> list[MuscleGroupRead]:
+        return [
+            self.musclegroups[musclegroup_id]
+            for musclegroup_id in self.exercise_musclegroups.get(exercise_id, ())
+        ]
+
+    def musclegroup_exercise_list(self, musclegroup_id: int) -> list[ExerciseRead]:
+        return [
+            self.exercises[exercise_id]
+            for exercise_id in self.musclegroup_exercises.get(musclegroup_id, ())
+        ]
+
+
+def load_catalog(session: Session, version: int) -> Catalog:
+    exercises = {
+        id: ExerciseRead(id=id, name=name)
+        for id, name in session.exec(
+            select(Exercise.id, Exercise.name).order_by(Exercise.id)
+        )
+    }
+    musclegroups = {
+        id: MuscleGroupRead(id=id, name=name)
+        for id, name in session.exec(
+            select(MuscleGroup.id, MuscleGroup.name).order_by(MuscleGroup.id)
+        )
+    }
+    exercise_musclegroups: dict[int, list[int]] = {}
+    musclegroup_exercises: dict[int, list[int]] = {}
+    for exercise_id, musclegroup_id in session.exec(
+        select(
+            ExerciseMuscleGroup.exercise_id, ExerciseMuscleGroup.musclegroup_id
+        ).order_by(ExerciseMuscleGroup.exercise_id, ExerciseMuscleGroup.musclegroup_id)
+    ):
+        # Skip links left dangling by a concurrent delete
+        if exercise_id in exercises and musclegroup_id in musclegroups:
+            exercise_musclegroups.setdefault(exercise_id, []).append(musclegroup_id)
+            musclegroup_exercises.setdefault(musclegroup_id, []).append(exercise_id)
+    return Catalog(
+        version=version,
+        etag=make_etag(
+            [(id, exercise.name) for id, exercise in exercises.items()],
+            [(id, group.name) for id, group in musclegroups.items()],
+            sorted(exercise_musclegroups.items()),
+        ),
+        exercises=exercises,
+        musclegroups=musclegroups,
+        exercise_musclegroups={
+            id: tuple(ids) for id, ids in exercise_musclegroups.items()
+        },
+        musclegroup_exercises={
+            id: tuple(sorted(ids)) for id, ids in musclegroup_exercises.items()
+        },
+        loaded_at=time.monotonic(),
+    )
+
+
+class CatalogCache:
+    def __init__(self, versions: Cache | None = None, ttl: float = CATALOG_TTL):
+        self._catalogs: WeakKeyDictionary[Engine, Catalog] = WeakKeyDictionary()
+        self._versions = versions or Cache("catalog", backend=MemoryBackend())
+        self.ttl = ttl
+        self._lock = Lock()
+
+    @property
+    def version(self) -> int:
+        return self._versions.generation
+
+    @property
+    def shared(self) -> bool:
+        """Whether invalidations reach every worker."""
+        return self._versions.backend.shared
+
+    def _fresh(self, catalog: Catalog | None, version: int) -> bool:
+        if catalog is None or catalog.version != version:
+            return False
+        return self.shared or time.monotonic() - catalog.loaded_at < self.ttl
+
+    def get(self, session: Session) -> Catalog:
+        engine = session.get_bind()
+        version = self.version
+        catalog = self._catalogs.get(engine)
+        if not self._fresh(catalog, version):
+            catalog = load_catalog(session, version)
+            with self._lock:
+                if catalog.version == self.version:
+                    self._catalogs[engine] = catalog
+        return catalog
+
+    def invalidate(self):
+        self._versions.invalidate()
+        with self._lock:
+            self._catalogs.clear()
+
+    def warm(self, engine: Engine):
+        """Load ``engine``'s catalog; meant to run off the request path."""
+        try:
+            with Session(engine) as session:
+                self.get(session)
+        except Exception:
+            # The first request will load it instead
+            logger.exception("Could not warm the exercise catalog")
+
+    def missing_exercise_ids(self, session: Session, exercise_ids) -> list[int]:
+        """``find_missing_ids`` for exercises, answered from the catalog.
+
+        Ids the catalog doesn't know are checked against the database, so an
+        exercise created by another worker isn't reported missing. Without a
+        shared backend the known ids are checked too, since another worker
+        may have deleted them. The catalog is reloaded if it disagrees.
+        """
+        catalog = self.get(session)
+        ids = set(exercise_ids)
+        unknown = ids - catalog.exercises.keys()
+        checked = unknown if self.shared else ids
+        if not checked:
+            return []
+        missing = find_missing_ids(session, Exercise, checked)
+        if set(missing) != unknown:
+            self.invalidate()
+        return missing
+
+
+catalog_cache = CatalogCache(Cache("catalog"))
@@ -1,16 +1,106 @@
+from functools import cache, partial
 import os
 
 from dotenv import load_dotenv
-from sqlmodel import create_engine, SQLModel
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlmodel import create_engine
+
+from app.db.instrumentation import instrument_engine
+from app.db.slow_queries import slow_query_log
 
 load_dotenv()
 
 db_url = os.environ.get("SQLALCHEMY_DATABASE_URL")
 
-engine = create_engine(
-    db_url,
-    echo=True,
-    connect_args={"check_same_thread": False},
+
+def env_flag(name: str, default: bool = False) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return default if value is None else int(value)
+
+
+def env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return default if value is None else float(value)
+
+
+SQLALCHEMY_ECHO = env_flag("SQLALCHEMY_ECHO")
+SQLALCHEMY_POOL_SIZE = env_int("SQLALCHEMY_POOL_SIZE", 10)
+SQLALCHEMY_MAX_OVERFLOW = env_int("SQLALCHEMY_MAX_OVERFLOW", 20)
+SQLALCHEMY_POOL_RECYCLE = env_int("SQLALCHEMY_POOL_RECYCLE", 1800)
+SQLALCHEMY_POOL_PRE_PING = env_flag("SQLALCHEMY_POOL_PRE_PING", True)
+SQLITE_MMAP_SIZE = env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+# Sync endpoints run on the AnyIO threadpool and each holds a connection, so
+# by default allow exactly as many threads as the pool can hand out
+THREADPOOL_SIZE = env_int(
+    "THREADPOOL_SIZE", SQLALCHEMY_POOL_SIZE + SQLALCHEMY_MAX_OVERFLOW
 )
+SQL_STATS_HEADERS = env_flag("SQL_STATS_HEADERS", True)
+SQL_STATS_LOG_SAMPLE_RATE = env_float("SQL_STATS_LOG_SAMPLE_RATE", 0.01)
+CATALOG_WARM = env_flag("CATALOG_WARM", True)
+# Seconds a worker keeps its catalog when invalidations aren't shared
+CATALOG_TTL = env_float("CATALOG_TTL", 30.0)
+SLOW_QUERY_THRESHOLD_MS = env_float("SLOW_QUERY_THRESHOLD_MS", 500.0)
+SLOW_QUERY_PLANS = env_int("SLOW_QUERY_PLANS", 100)
+
+slow_query_log.configure(SLOW_QUERY_THRESHOLD_MS / 1000, SLOW_QUERY_PLANS)
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record, journal_mode="WAL"):
+    cursor = dbapi_connection.cursor()
+    if journal_mode:
+        cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.close()
+
+
+def create_db_engine(url: str, **kwargs) -> Engine:
+    """Create an engine tuned for the dialect in ``url``.
+
+    Pool sizing and echo come from the ``SQLALCHEMY_*`` environment
+    variables; any keyword argument overrides them.
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    options = {"echo": SQLALCHEMY_ECHO}
+    if backend == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options.update(
+            pool_size=SQLALCHEMY_POOL_SIZE,
+            max_overflow=SQLALCHEMY_MAX_OVERFLOW,
+            pool_recycle=SQLALCHEMY_POOL_RECYCLE,
+            pool_pre_ping=SQLALCHEMY_POOL_PRE_PING,
+        )
+    if backend == "mssql" and url.get_driver_name() == "pyodbc":
+        options["fast_executemany"] = True
+    options.update(kwargs)
+
+    engine = create_engine(url, **options)
+
+    if backend == "sqlite":
+        # WAL only applies to on-disk databases
+        in_memory = url.database in (None, "", ":memory:")
+        event.listen(
+            engine,
+            "connect",
+            partial(set_sqlite_pragmas, journal_mode=None if in_memory else "WAL"),
+        )
+    instrument_engine(engine)
+    return engine
+
 
-SQLModel.metadata.create_all(engine)
+@cache
+def get_engine() -> Engine:
+    # Created on first use so importing the app never touches the database.
+    # The schema itself is managed by Alembic (``alembic upgrade head``).
+    return create_db_engine(db_url)
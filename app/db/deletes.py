@@ -0,0 +1,128 @@
+"""Set-based deletes for rows and everything that hangs off them.
+
+Each function takes a select of the ids to delete and removes dependants
+first with ``DELETE ... WHERE ... IN (subquery)`` statements, so nothing is
+loaded into the session and memory use doesn't grow with the amount of
+history being removed. Callers commit.
+"""
+
+from sqlalchemy import delete, update
+from sqlmodel import Session, select
+
+from app.db.models import (
+    Exercise,
+    ExerciseMuscleGroup,
+    MuscleGroup,
+    Permission,
+    PlannedSet,
+    Role,
+    RolePermissions,
+    RoutineExercise,
+    Set,
+    User,
+    Weight,
+    Workout,
+    WorkoutExercise,
+    WorkoutRoutine,
+)
+
+
+def _delete(session: Session, model, *criteria):
+    # The identity map isn't synchronised; handlers return straight after
+    session.execute(
+        delete(model).where(*criteria).execution_options(synchronize_session=False)
+    )
+
+
+def delete_workouts(session: Session, workout_ids):
+    workout_exercise_ids = select(WorkoutExercise.id).where(
+        WorkoutExercise.workout_id.in_(workout_ids)
+    )
+    _delete(session, Set, Set.workout_exercise_id.in_(workout_exercise_ids))
+    _delete(session, WorkoutExercise, WorkoutExercise.workout_id.in_(workout_ids))
+    _delete(session, Workout, Workout.id.in_(workout_ids))
+
+
+def delete_workout_routines(session: Session, routine_ids):
+    routine_exercise_ids = select(RoutineExercise.id).where(
+        RoutineExercise.routine_id.in_(routine_ids)
+    )
+    _delete(
+        session,
+        PlannedSet,
+        PlannedSet.routine_exercise_id.in_(routine_exercise_ids),
+    )
+    _delete(session, RoutineExercise, RoutineExercise.routine_id.in_(routine_ids))
+    delete_workouts(
+        session,
+        select(Workout.id).where(Workout.workoutroutine_id.in_(routine_ids)),
+    )
+    _delete(session, WorkoutRoutine, WorkoutRoutine.id.in_(routine_ids))
+
+
+def delete_users(session: Session, user_ids):
+    _delete(session, Weight, Weight.user_id.in_(user_ids))
+    delete_workout_routines(
+        session,
+        select(WorkoutRoutine.id).where(WorkoutRoutine.user_id.in_(user_ids)),
+    )
+    # Workouts logged against another user's routine
+    delete_workouts(session, select(Workout.id).where(Workout.user_id.in_(user_ids)))
+    _delete(session, User, User.id.in_(user_ids))
+
+
+def delete_exercises(session: Session, exercise_ids):
+    workout_exercise_ids = select(WorkoutExercise.id).where(
+        WorkoutExercise.exercise_id.in_(exercise_ids)
+    )
+    _delete(session, Set, Set.workout_exercise_id.in_(workout_exercise_ids))
+    _delete(session, WorkoutExercise, WorkoutExercise.exercise_id.in_(exercise_ids))
+    routine_exercise_ids = select(RoutineExercise.id).where(
+        RoutineExercise.exercise_id.in_(exercise_ids)
+    )
+    _delete(
+        session,
+        PlannedSet,
+        PlannedSet.routine_exercise_id.in_(routine_exercise_ids),
+    )
+    _delete(session, RoutineExercise, RoutineExercise.exercise_id.in_(exercise_ids))
+    delete_exercise_musclegroups(session, exercise_ids)
+    _delete(session, Exercise, Exercise.id.in_(exercise_ids))
+
+
+def delete_exercise_musclegroups(session: Session, exercise_ids):
+    _delete(
+        session,
+        ExerciseMuscleGroup,
+        ExerciseMuscleGroup.exercise_id.in_(exercise_ids),
+    )
+
+
+def delete_musclegroups(session: Session, musclegroup_ids):
+    _delete(
+        session,
+        ExerciseMuscleGroup,
+        ExerciseMuscleGroup.musclegroup_id.in_(musclegroup_ids),
+    )
+    _delete(session, MuscleGroup, MuscleGroup.id.in_(musclegroup_ids))
+
+
+def delete_roles(session: Session, role_ids):
+    # Users keep their accounts and lose the role, as the ORM cascade did
+    session.execute(
+        update(User)
+        .where(User.role_id.in_(role_ids))
+        .values(role_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    _delete(session, RolePermissions, RolePermissions.role_id.in_(role_ids))
+    _delete(session, Role, Role.id.in_(role_ids))
+
+
+def delete_permissions(session: Session, permission_ids):
+    _delete(
+        session,
+        RolePermissions,
+        RolePermissions.permission_id.in_(permission_ids),
+    )
+    _delete(session, Permission, Permission.id.in_(permission_ids))
@@ -0,0 +1,83 @@
+"""Queries behind a user's full-history export.
+
+Each record type is a flat column select so rows never become ORM objects,
+and results are fetched ``EXPORT_BATCH_SIZE`` rows at a time with
+``yield_per`` so memory use doesn't depend on the size of the history.
+"""
+
+from sqlmodel import Session, select
+
+from app.db.models import (
+    Exercise,
+    PlannedSet,
+    RoutineExercise,
+    Set,
+    Weight,
+    Workout,
+    WorkoutExercise,
+    WorkoutRoutine,
+)
+
+EXPORT_BATCH_SIZE = 1000
+
+
+def export_queries(user_id: int):
+    return {
+        "weight": select(Weight.id, Weight.date, Weight.weight)
+        .where(Weight.user_id == user_id)
+        .order_by(Weight.date, Weight.id),
+        "workout_routine": select(WorkoutRoutine.id, WorkoutRoutine.name)
+        .where(WorkoutRoutine.user_id == user_id)
+        .order_by(WorkoutRoutine.id),
+        "routine_exercise": select(
+            RoutineExercise.id,
+            RoutineExercise.routine_id,
+            RoutineExercise.exercise_id,
+            Exercise.name.label("exercise"),
+        )
+        .join(WorkoutRoutine)
+        .join(Exercise)
+        .where(WorkoutRoutine.user_id == user_id)
+        .order_by(RoutineExercise.id),
+        "planned_set": select(
+            PlannedSet.id, PlannedSet.routine_exercise_id, PlannedSet.reps
+        )
+        .join(RoutineExercise)
+        .join(WorkoutRoutine)
+        .where(WorkoutRoutine.user_id == user_id)
+        .order_by(PlannedSet.id),
+        "workout": select(Workout.id, Workout.date, Workout.workoutroutine_id)
+        .where(Workout.user_id == user_id)
+        .order_by(Workout.date, Workout.id),
+        "workout_exercise": select(
+            WorkoutExercise.id,
+            WorkoutExercise.workout_id,
+            WorkoutExercise.exercise_id,
+            Exercise.name.label("exercise"),
+        )
+        .join(Workout)
+        .join(Exercise)
+        .where(Workout.user_id == user_id)
+        .order_by(WorkoutExercise.id),
+        "set": select(Set.id, Set.workout_exercise_id, Set.reps, Set.weight)
+        .join(WorkoutExercise)
+        .join(Workout)
+        .where(Workout.user_id == user_id)
+        .order_by(Set.id),
+    }
+
+
+def export_fields() -> list[str]:
+    """Every column any record type can have, in first-seen order."""
+    fields = {"type": None}
+    for query in export_queries(0).values():
+        fields.update(dict.fromkeys(column.key for column in query.selected_columns))
+    return list(fields)
+
+
+def export_batches(session: Session, user_id: int):
+    """Yield lists of records, each tagged with its ``type``."""
+    for record_type, query in export_queries(user_id).items():
+        result = session.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for rows in result.partitions():
+            yield [{"type": record_type, **row._asdict()} for row in rows]
@@ -0,0 +1,83 @@
+"""Per-request SQL statistics.
+
+``instrument_engine`` times every statement an engine executes and adds it
+to the ``QueryStats`` of the request being served, if any. The stats object
+lives in a context variable that the request middleware sets; sync handlers
+run in worker threads with a copy of that context, so they record into the
+same object. Statements over the slow-query threshold also go to
+``slow_query_log``.
+"""
+
+from contextvars import ContextVar
+from time import perf_counter
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.db.slow_queries import capture_pending_plans, slow_query_log
+
+SLOWEST_STATEMENT_LENGTH = 500
+
+
+class QueryStats:
+    def __init__(self, scope=None):
+        # The request's ASGI scope, which gains the matched route once the
+        # router has run
+        self.scope = scope
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: str | None = None
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.total_time += duration
+        if duration >= self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_statement = statement[:SLOWEST_STATEMENT_LENGTH]
+
+    @property
+    def route(self) -> str | None:
+        if self.scope is not None and (route := self.scope.get("route")):
+            return route.path
+        return None
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.total_time * 1000:.2f};desc="{self.count} queries", '
+            f"db-slowest;dur={self.slowest_time * 1000:.2f}"
+        )
+
+
+current_query_stats: ContextVar[QueryStats | None] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = perf_counter() - conn.info["query_start_time"].pop()
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    if duration >= slow_query_log.threshold:
+        route = stats.route if stats is not None else None
+        slow_query_log.record(conn, statement, parameters, duration, executemany, route)
+
+
+def _handle_error(exception_context):
+    # Failed statements never reach after_cursor_execute
+    if (conn := exception_context.connection) is not None:
+        if start_times := conn.info.get("query_start_time"):
+            start_times.pop()
+
+
+def instrument_engine(engine: Engine):
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+        event.listen(engine.pool, "checkin", capture_pending_plans)
@@ -0,0 +1,54 @@
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.db.models import (
+    Role,
+    RolePermissions,
+    RoleReadOnlyPermissions,
+    RoutineExercise,
+    User,
+    UserRead,
+    Workout,
+    WorkoutExercise,
+    WorkoutExerciseRead,
+    WorkoutRead,
+    WorkoutRoutine,
+    WorkoutRoutineRead,
+    WorkoutRoutinesRead,
+    WorkoutsRead,
+)
+
+# Each response model that nests relationships gets the loader options that
+# fetch everything it serializes up front. selectinload issues one extra
+# query per level regardless of how many rows are returned, so a list page
+# costs a fixed number of queries instead of one per row per level.
+_workout_options = (
+    selectinload(Workout.workout_exercises).options(
+        joinedload(WorkoutExercise.exercise),
+        selectinload(WorkoutExercise.sets),
+    ),
+)
+_workout_routine_options = (
+    selectinload(WorkoutRoutine.routine_exercises).options(
+        joinedload(RoutineExercise.exercise),
+        selectinload(RoutineExercise.planned_sets),
+    ),
+)
+
+LOADER_OPTIONS = {
+    WorkoutRead: _workout_options,
+    WorkoutsRead: _workout_options,
+    WorkoutRoutineRead: _workout_routine_options,
+    WorkoutRoutinesRead: _workout_routine_options,
+    WorkoutExerciseRead: (
+        joinedload(WorkoutExercise.workout),
+        selectinload(WorkoutExercise.sets),
+    ),
+    UserRead: (joinedload(User.role),),
+    RoleReadOnlyPermissions: (
+        selectinload(Role.role_permissions).joinedload(RolePermissions.permission),
+    ),
+}
+
+
+def loader_options(response_model) -> tuple:
+    return LOADER_OPTIONS.get(response_model, ())
@@ -1,11 +1,21 @@
 import datetime
 
-from sqlmodel import Field, SQLModel, Relationship
+from sqlalchemy import Index, UniqueConstraint
+from sqlalchemy.orm import object_session
+from sqlmodel import Field, Session, SQLModel, Relationship, select
+
+from app.db.permissions import role_permission_cache
 
 
 class RolePermissions(SQLModel, table=True):
+    __table_args__ = (
+        UniqueConstraint(
+            "role_id", "permission_id", name="uq_rolepermissions_role_id_permission_id"
+        ),
+    )
+
     role_permission_id: int | None = Field(default=None, primary_key=True)
-    permission_id: int = Field(foreign_key="permission.id")
+    permission_id: int = Field(foreign_key="permission.id", index=True)
     role_id: int = Field(foreign_key="role.id")
     permission: "Permission" = Relationship(back_populates="role_permissions")
     role: "Role" = Relationship(back_populates="role_permissions")
@@ -68,6 +78,22 @@ class RoleReadOnlyPermissions(RoleBase):
     role_permissions: list[RolePermissionsReadOnlyPermission] = []
 
 
+def get_role_permissions(role_id: int | None, session: Session) -> frozenset[str]:
+    if role_id is None:
+        return frozenset()
+    if (permissions := role_permission_cache.get(role_id)) is None:
+        generation = role_permission_cache.generation
+        permissions = frozenset(
+            session.exec(
+                select(Permission.name)
+                .join(RolePermissions)
+                .where(RolePermissions.role_id == role_id)
+            )
+        )
+        role_permission_cache.set(role_id, permissions, generation)
+    return permissions
+
+
 class UserBase(SQLModel):
     name: str
     email_address: str = Field(index=True, unique=True, max_length=256)
@@ -79,12 +105,15 @@ class User(UserBase, table=True):
     weights: list["Weight"] = Relationship(back_populates="user")
     workouts: list["Workout"] = Relationship(back_populates="user")
     workout_routines: list["WorkoutRoutine"] = Relationship(back_populates="user")
-    role_id: int | None = Field(foreign_key="role.id")
+    role_id: int | None = Field(foreign_key="role.id", index=True)
     role: Role = Relationship(back_populates="users")
 
-    def has(self, permission: str):
-        if permission in [rp.permission.name for rp in self.role.role_permissions]:
-            return True
+    @property
+    def permissions(self) -> frozenset[str]:
+        return get_role_permissions(self.role_id, session=object_session(self))
+
+    def has(self, permission: str) -> bool:
+        return permission in self.permissions
 
 
 class UserLogin(SQLModel):
@@ -108,6 +137,8 @@ class WeightBase(SQLModel):
 
 
 class Weight(WeightBase, table=True):
+    __table_args__ = (Index("ix_weight_user_id_date", "user_id", "date"),)
+
     id: int | None = Field(default=None, primary_key=True)
 
     user: User = Relationship(back_populates="weights")
@@ -123,27 +154,56 @@ class WeightRead(WeightBase):
     user_id: int
 
 
+class WeightImportRead(SQLModel):
+    inserted: int
+    updated: int
+
+
 class ExerciseMuscleGroup(SQLModel, table=True):
+    __table_args__ = (
+        UniqueConstraint(
+            "exercise_id",
+            "musclegroup_id",
+            name="uq_exercisemusclegroup_exercise_id_musclegroup_id",
+        ),
+    )
+
     exercise_musclegroup_id: int | None = Field(default=None, primary_key=True)
     exercise_id: int = Field(foreign_key="exercise.id")
-    musclegroup_id: int = Field(foreign_key="musclegroup.id")
+    musclegroup_id: int = Field(foreign_key="musclegroup.id", index=True)
     exercise: "Exercise" = Relationship(back_populates="exercise_muscle_groups")
     muscle_group: "MuscleGroup" = Relationship(back_populates="exercise_muscle_groups")
 
 
 class RoutineExercise(SQLModel, table=True):
+    __table_args__ = (
+        UniqueConstraint(
+            "routine_id",
+            "exercise_id",
+            name="uq_routineexercise_routine_id_exercise_id",
+        ),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     routine_id: int = Field(foreign_key="workoutroutine.id")
-    exercise_id: int = Field(foreign_key="exercise.id")
+    exercise_id: int = Field(foreign_key="exercise.id", index=True)
     workout_routine: "WorkoutRoutine" = Relationship(back_populates="routine_exercises")
     exercise: "Exercise" = Relationship(back_populates="routine_exercises")
     planned_sets: list["PlannedSet"] = Relationship(back_populates="routine_exercise")
 
 
 class WorkoutExercise(SQLModel, table=True):
+    __table_args__ = (
+        UniqueConstraint(
+            "workout_id",
+            "exercise_id",
+            name="uq_workoutexercise_workout_id_exercise_id",
+        ),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     workout_id: int = Field(foreign_key="workout.id")
-    exercise_id: int = Field(foreign_key="exercise.id")
+    exercise_id: int = Field(foreign_key="exercise.id", index=True)
     workout: "Workout" = Relationship(back_populates="workout_exercises")
     exercise: "Exercise" = Relationship(back_populates="workout_exercises")
     sets: list["Set"] = Relationship(back_populates="workout_exercise")
@@ -217,13 +277,17 @@ class PlannedSetBase(SQLModel):
 
 class Set(SetBase, table=True):
     id: int | None = Field(default=None, primary_key=True)
-    workout_exercise_id: int | None = Field(foreign_key="workoutexercise.id")
+    workout_exercise_id: int | None = Field(
+        foreign_key="workoutexercise.id", index=True
+    )
     workout_exercise: WorkoutExercise = Relationship(back_populates="sets")
 
 
 class PlannedSet(SetBase, table=True):
     id: int | None = Field(default=None, primary_key=True)
-    routine_exercise_id: int | None = Field(foreign_key="routineexercise.id")
+    routine_exercise_id: int | None = Field(
+        foreign_key="routineexercise.id", index=True
+    )
     reps: int
     routine_exercise: RoutineExercise = Relationship(back_populates="planned_sets")
 
@@ -258,6 +322,15 @@ class SetCreate(SetBase):
     workout_id: int | None = None
 
 
+class SetBatchCreate(SetBase):
+    exercise_id: int
+    workout_id: int
+
+
+class SetBatchRead(SQLModel):
+    created: int
+
+
 class ExerciseCreateWithPlannedSets(ExerciseBase):
     id: int
     planned_sets: list[PlannedSetCreate] = []
@@ -374,8 +447,10 @@ class Exercise(ExerciseBase, table=True):
 
 
 class Workout(WorkoutBase, table=True):
+    __table_args__ = (Index("ix_workout_user_id_date", "user_id", "date"),)
+
     id: int | None = Field(default=None, primary_key=True)
-    workoutroutine_id: int = Field(foreign_key="workoutroutine.id")
+    workoutroutine_id: int = Field(foreign_key="workoutroutine.id", index=True)
     workoutroutine: "WorkoutRoutine" = Relationship(back_populates="workouts")
     workout_exercises: list[WorkoutExercise] = Relationship(back_populates="workout")
 
@@ -384,6 +459,10 @@ class Workout(WorkoutBase, table=True):
 
 
 class WorkoutRoutine(WorkoutRoutineBase, table=True):
+    __table_args__ = (
+        UniqueConstraint("user_id", "name", name="uq_workoutroutine_user_id_name"),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     workouts: list[Workout] = Relationship(back_populates="workoutroutine")
     routine_exercises: list[RoutineExercise] = Relationship(
@@ -0,0 +1,63 @@
+import time
+
+from app.cache import MISSING, Cache, MemoryBackend
+
+# Without a shared cache backend other workers' invalidations never reach
+# this process, so an entry is reloaded after this many seconds however it
+# was last changed
+ROLE_PERMISSION_TTL = 30.0
+
+
+class RolePermissionCache:
+    """Maps role ids to the frozenset of permission names granted to the role.
+
+    Entries are loaded on first use and dropped by ``invalidate`` whenever a
+    role or permission is changed. A load that races with an invalidation,
+    in any worker, is stored with the generation it started at and ignored
+    on read, so a stale set is never served.
+
+    The entries live in a ``Cache``; without one a private in-memory cache is
+    used. Unless the cache's backend is shared, ``invalidate`` only reaches
+    this process, so entries also expire after ``ttl`` seconds; a change made
+    through another worker is seen within that bound.
+    """
+
+    def __init__(self, cache: Cache | None = None, ttl: float = ROLE_PERMISSION_TTL):
+        self._cache = cache or Cache("role_permissions", backend=MemoryBackend())
+        self.ttl = ttl
+
+    @property
+    def shared(self) -> bool:
+        """Whether invalidations reach every worker."""
+        return self._cache.backend.shared
+
+    @property
+    def generation(self) -> int:
+        return self._cache.generation
+
+    @property
+    def version(self):
+        """Changes whenever a cached set may be out of date: on every
+        invalidation and, without a shared backend, every ``ttl`` seconds for
+        other workers' changes."""
+        if self.shared:
+            return self.generation
+        return self.generation, int(time.monotonic() // self.ttl)
+
+    def get(self, role_id: int) -> frozenset[str] | None:
+        entry = self._cache.get(role_id)
+        if entry is MISSING:
+            return None
+        loaded_at, permissions = entry
+        if not self.shared and time.monotonic() - loaded_at >= self.ttl:
+            return None
+        return permissions
+
+    def set(self, role_id: int, permissions: frozenset[str], generation: int):
+        self._cache.set(role_id, (time.monotonic(), permissions), generation)
+
+    def invalidate(self, role_id: int | None = None):
+        self._cache.invalidate(role_id)
+
+
+role_permission_cache = RolePermissionCache(Cache("role_permissions"))
@@ -0,0 +1,289 @@
+"""Generate synthetic training history for scale testing.
+
+    python -m app.db.seed --users 1000 --years 5 --seed 1
+
+Output depends only on the options and on which ids are already taken, so
+the same command against an empty database always produces the same rows.
+Rows are written with explicit ids in executemany batches of
+``--batch-size``, parents before children, so memory use stays flat however
+much history is generated. The schema must exist already (``alembic upgrade
+head``) unless ``--create-schema`` is passed.
+"""
+
+import argparse
+from dataclasses import dataclass
+import datetime
+import random
+
+from sqlalchemy import func, insert
+from sqlalchemy.engine import Engine
+from sqlmodel import SQLModel, Session, select
+
+from app.db.database import create_db_engine, db_url
+from app.db.models import (
+    Exercise,
+    ExerciseMuscleGroup,
+    MuscleGroup,
+    PlannedSet,
+    Role,
+    RoutineExercise,
+    Set,
+    User,
+    Weight,
+    Workout,
+    WorkoutExercise,
+    WorkoutRoutine,
+)
+
+MUSCLE_GROUPS = [
+    "chest",
+    "back",
+    "shoulders",
+    "biceps",
+    "triceps",
+    "quadriceps",
+    "hamstrings",
+    "glutes",
+    "calves",
+    "core",
+]
+
+# Insert order; every model comes after the models it references
+HISTORY_MODELS = [
+    User,
+    WorkoutRoutine,
+    RoutineExercise,
+    PlannedSet,
+    Weight,
+    Workout,
+    WorkoutExercise,
+    Set,
+]
+
+
+@dataclass
+class SeedConfig:
+    users: int = 10
+    years: float = 1
+    exercises: int = 40
+    exercises_per_workout: int = 5
+    sets_per_exercise: int = 4
+    workouts_per_week: float = 3
+    routines_per_user: int = 3
+    end_date: datetime.date = datetime.date(2024, 12, 31)
+    seed: int = 0
+    batch_size: int = 50_000
+
+
+class RowWriter:
+    """Buffer rows per model and hand out ids, writing them in batches."""
+
+    def __init__(self, engine: Engine, batch_size: int):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.rows = {model: [] for model in HISTORY_MODELS}
+        self.buffered = 0
+        self.written = dict.fromkeys(HISTORY_MODELS, 0)
+        with Session(engine) as session:
+            self.next_ids = {
+                model: session.exec(select(func.max(model.id))).one() or 0
+                for model in HISTORY_MODELS
+            }
+
+    def add(self, model, **values) -> int:
+        self.next_ids[model] += 1
+        values["id"] = self.next_ids[model]
+        self.rows[model].append(values)
+        self.buffered += 1
+        if self.buffered >= self.batch_size:
+            self.flush()
+        return values["id"]
+
+    def flush(self):
+        with self.engine.begin() as conn:
+            for model, rows in self.rows.items():
+                if rows:
+                    conn.execute(insert(model.__table__), rows)
+                    self.written[model] += len(rows)
+                    rows.clear()
+        self.buffered = 0
+
+
+def seed_catalog(engine: Engine, config: SeedConfig) -> tuple[int, list[int]]:
+    """Create the "user" role, muscle groups and exercises if missing.
+
+    Returns the role id and the exercise ids to draw workouts from.
+    """
+    rng = random.Random(config.seed)
+    names = [f"exercise {i}" for i in range(1, config.exercises + 1)]
+    with Session(engine) as session:
+        if not (role := session.exec(select(Role).where(Role.name == "user")).first()):
+            role = Role(name="user")
+            session.add(role)
+        existing = set(
+            session.exec(
+                select(MuscleGroup.name).where(MuscleGroup.name.in_(MUSCLE_GROUPS))
+            )
+        )
+        for name in MUSCLE_GROUPS:
+            if name not in existing:
+                session.add(MuscleGroup(name=name))
+        session.flush()
+        muscle_group_ids = session.exec(
+            select(MuscleGroup.id).where(MuscleGroup.name.in_(MUSCLE_GROUPS))
+        ).all()
+        existing = set(
+            session.exec(select(Exercise.name).where(Exercise.name.in_(names)))
+        )
+        for name in names:
+            if name not in existing:
+                exercise = Exercise(name=name)
+                for muscle_group_id in rng.sample(muscle_group_ids, 2):
+                    session.add(
+                        ExerciseMuscleGroup(
+                            exercise=exercise, musclegroup_id=muscle_group_id
+                        )
+                    )
+        session.commit()
+        exercise_ids = session.exec(
+            select(Exercise.id).where(Exercise.name.in_(names)).order_by(Exercise.id)
+        ).all()
+        return role.id, exercise_ids
+
+
+def seed_user(
+    writer: RowWriter,
+    rng: random.Random,
+    config: SeedConfig,
+    role_id: int,
+    exercise_ids: list[int],
+):
+    user_id = writer.next_ids[User] + 1
+    writer.add(
+        User,
+        name=f"user {user_id}",
+        email_address=f"user{user_id}@example.com",
+        # A fixed placeholder; hashing a password per user would dominate
+        password_hash="",
+        role_id=role_id,
+    )
+    routines = []
+    for number in range(1, config.routines_per_user + 1):
+        routine_id = writer.add(
+            WorkoutRoutine, name=f"routine {number}", user_id=user_id
+        )
+        routine_exercise_ids = rng.sample(exercise_ids, config.exercises_per_workout)
+        for exercise_id in routine_exercise_ids:
+            routine_exercise_id = writer.add(
+                RoutineExercise, routine_id=routine_id, exercise_id=exercise_id
+            )
+            for _ in range(config.sets_per_exercise):
+                writer.add(
+                    PlannedSet,
+                    reps=rng.choice((5, 8, 10, 12)),
+                    routine_exercise_id=routine_exercise_id,
+                )
+        routines.append((routine_id, routine_exercise_ids))
+
+    days = round(config.years * 365)
+    start = config.end_date - datetime.timedelta(days=days - 1)
+    body_weight = rng.uniform(55, 110)
+    working_weights = {
+        exercise_id: rng.uniform(20, 100) for exercise_id in exercise_ids
+    }
+    training_odds = config.workouts_per_week / 7
+    for day in range(days):
+        date = start + datetime.timedelta(days=day)
+        body_weight += rng.gauss(0, 0.2)
+        writer.add(Weight, date=date, weight=round(body_weight, 1), user_id=user_id)
+        if rng.random() >= training_odds:
+            continue
+        routine_id, routine_exercise_ids = rng.choice(routines)
+        workout_id = writer.add(
+            Workout, date=date, workoutroutine_id=routine_id, user_id=user_id
+        )
+        for exercise_id in routine_exercise_ids:
+            workout_exercise_id = writer.add(
+                WorkoutExercise, workout_id=workout_id, exercise_id=exercise_id
+            )
+            working_weights[exercise_id] *= rng.uniform(0.99, 1.015)
+            for _ in range(config.sets_per_exercise):
+                writer.add(
+                    Set,
+                    reps=rng.randint(3, 12),
+                    weight=round(working_weights[exercise_id] / 2.5) * 2.5,
+                    workout_exercise_id=workout_exercise_id,
+                )
+
+
+def seed_database(engine: Engine, config: SeedConfig) -> dict[str, int]:
+    """Generate ``config.users`` users with their history.
+
+    Returns the number of rows written per table.
+    """
+    role_id, exercise_ids = seed_catalog(engine, config)
+    writer = RowWriter(engine, config.batch_size)
+    rng = random.Random(config.seed)
+    for _ in range(config.users):
+        seed_user(writer, rng, config, role_id, exercise_ids)
+    writer.flush()
+    return {model.__tablename__: count for model, count in writer.written.items()}
+
+
+def main(argv=None):
+    defaults = SeedConfig()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--url", default=db_url, help="defaults to $SQLALCHEMY_DATABASE_URL"
+    )
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--years", type=float, default=defaults.years)
+    parser.add_argument("--exercises", type=int, default=defaults.exercises)
+    parser.add_argument(
+        "--exercises-per-workout", type=int, default=defaults.exercises_per_workout
+    )
+    parser.add_argument(
+        "--sets-per-exercise", type=int, default=defaults.sets_per_exercise
+    )
+    parser.add_argument(
+        "--workouts-per-week", type=float, default=defaults.workouts_per_week
+    )
+    parser.add_argument(
+        "--routines-per-user", type=int, default=defaults.routines_per_user
+    )
+    parser.add_argument(
+        "--end-date",
+        type=datetime.date.fromisoformat,
+        default=defaults.end_date,
+        help="date of the last day of history",
+    )
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--batch-size", type=int, default=defaults.batch_size)
+    parser.add_argument(
+        "--create-schema",
+        action="store_true",
+        help="create missing tables first, for throwaway databases",
+    )
+    args = parser.parse_args(argv)
+    if not args.url:
+        parser.error("no database URL; pass --url or set SQLALCHEMY_DATABASE_URL")
+    if args.exercises_per_workout > args.exercises:
+        parser.error("--exercises-per-workout can't exceed --exercises")
+
+    engine = create_db_engine(args.url)
+    if args.create_schema:
+        SQLModel.metadata.create_all(engine)
+    options = vars(args)
+    config = SeedConfig(
+        **{
+            name: options[name]
+            for name in SeedConfig.__dataclass_fields__
+            if name in options
+        }
+    )
+    for table, count in seed_database(engine, config).items():
+        print(f"{table:16} {count:>12,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Slow-query log.
+
+Statements slower than the threshold are logged as one JSON line with
+their duration, originating route and bound parameters, redacted to type
+names. The first time a statement shape is seen its query plan is captured
+on SQLite (``EXPLAIN QUERY PLAN``) and MSSQL (``SHOWPLAN_TEXT``), and the
+most recent shapes are kept for the ``/slow_queries`` endpoint.
+
+Plans are captured when the connection is checked back in to the pool
+rather than straight away: the slow statement's cursor may still have
+unfetched rows, which MSSQL won't run another statement alongside. If a
+capture fails the connection is invalidated instead of returned, since it
+may not have left SHOWPLAN mode.
+"""
+
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+import json
+import logging
+import re
+from threading import Lock
+import time
+
+logger = logging.getLogger("app.db.slow_queries")
+
+PENDING_PLANS = "slow_query_pending_plans"
+# DDL, PRAGMAs and the like have no plan worth keeping
+PLANNED_STATEMENTS = ("select", "with", "insert", "update", "delete")
+STATEMENT_LENGTH = 2000
+
+# Expanded IN lists and multi-row VALUES differ only in their number of
+# placeholders, so they share a shape
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    return _PLACEHOLDER_LIST.sub("(?, ...)", _WHITESPACE.sub(" ", statement.strip()))
+
+
+def redact_parameters(parameters):
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+@dataclass
+class SlowQuery:
+    shape: str
+    statement: str
+    dialect: str
+    route: str | None
+    count: int = 1
+    max_ms: float = 0.0
+    last_ms: float = 0.0
+    last_seen: float = field(default_factory=time.time)
+    plan: list[str] | None = None
+
+
+class SlowQueryLog:
+    """Logs slow statements and keeps the latest ``capacity`` shapes."""
+
+    def __init__(self, threshold: float = 0.5, capacity: int = 100):
+        self.threshold = threshold
+        self.capacity = capacity
+        self._queries: OrderedDict[str, SlowQuery] = OrderedDict()
+        self._lock = Lock()
+
+    def configure(self, threshold: float, capacity: int):
+        self.threshold = threshold
+        self.capacity = capacity
+
+    def queries(self) -> list[dict]:
+        with self._lock:
+            return [asdict(query) for query in reversed(self._queries.values())]
+
+    def clear(self):
+        with self._lock:
+            self._queries.clear()
+
+    def record(self, conn, statement, parameters, duration, executemany, route):
+        duration_ms = round(duration * 1000, 3)
+        if executemany:
+            rows = len(parameters)
+            parameters = parameters[0] if parameters else ()
+        else:
+            rows = 1
+        fields = {
+            "duration_ms": duration_ms,
+            "route": route,
+            "statement": statement[:STATEMENT_LENGTH],
+            "parameters": redact_parameters(parameters),
+            "rows": rows,
+        }
+        logger.warning(json.dumps(fields), extra={"slow_query": fields})
+
+        shape = statement_shape(statement)
+        with self._lock:
+            if (query := self._queries.get(shape)) is not None:
+                self._queries.move_to_end(shape)
+                query.count += 1
+                query.max_ms = max(query.max_ms, duration_ms)
+                query.last_ms = duration_ms
+                query.last_seen = time.time()
+                query.route = route
+                return
+            query = self._queries[shape] = SlowQuery(
+                shape=shape,
+                statement=statement[:STATEMENT_LENGTH],
+                dialect=conn.dialect.name,
+                route=route,
+                max_ms=duration_ms,
+                last_ms=duration_ms,
+            )
+            while len(self._queries) > self.capacity:
+                self._queries.popitem(last=False)
+        if query.dialect in PLAN_CAPTURES and shape.lower().startswith(
+            PLANNED_STATEMENTS
+        ):
+            conn.info.setdefault(PENDING_PLANS, []).append(
+                (query, statement, parameters)
+            )
+
+
+def _sqlite_plan(cursor, statement, parameters) -> list[str]:
+    cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    depths = {0: -1}
+    plan = []
+    for node, parent, _, detail in cursor.fetchall():
+        depths[node] = depths.get(parent, -1) + 1
+        plan.append("  " * depths[node] + detail)
+    return plan
+
+
+def _mssql_plan(cursor, statement, parameters) -> list[str]:
+    cursor.execute("SET SHOWPLAN_TEXT ON")
+    try:
+        # Compiles the statement without running it; one result set per
+        # statement in the batch
+        cursor.execute(statement, parameters)
+        plan = []
+        while True:
+            plan.extend(row[0] for row in cursor.fetchall())
+            if not cursor.nextset():
+                return plan
+    finally:
+        cursor.execute("SET SHOWPLAN_TEXT OFF")
+
+
+PLAN_CAPTURES = {"sqlite": _sqlite_plan, "mssql": _mssql_plan}
+
+
+def capture_pending_plans(dbapi_connection, connection_record):
+    pending = connection_record.info.pop(PENDING_PLANS, None)
+    if not pending or dbapi_connection is None:
+        return
+    for query, statement, parameters in pending:
+        try:
+            cursor = dbapi_connection.cursor()
+            try:
+                query.plan = PLAN_CAPTURES[query.dialect](cursor, statement, parameters)
+            finally:
+                cursor.close()
+        except Exception as exc:
+            query.plan = [f"plan unavailable: {exc}"]
+            # The connection may be stuck in SHOWPLAN mode, where statements
+            # are compiled but never run, so it is never handed out again
+            connection_record.invalidate(exc)
+            return
+    dbapi_connection.rollback()
+
+
+slow_query_log = SlowQueryLog()
@@ -1,11 +1,11 @@
 from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import Session
 
-from app.db.database import engine
+from app.db.database import get_engine
 
 
 def get_session():
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         yield session
 
 
@@ -0,0 +1,89 @@
+"""Strong ETags and conditional GETs.
+
+ETags are hashes of the content, so every worker process gives the same
+resource the same tag. Where a cache already knows a resource's content
+(the exercise catalog) or has seen it rendered at the current version
+(roles), a matching ``If-None-Match`` is answered with a 304 before anything
+is queried or serialized. Otherwise the tag is taken from the rendered body
+and a 304 only saves the bandwidth.
+"""
+
+from hashlib import blake2b
+from threading import Lock
+
+from fastapi import Request, Response
+
+from app.db.database import env_int
+
+CATALOG_MAX_AGE = env_int("CATALOG_MAX_AGE", 0)
+# Responses depend on who is asking, so only the client may keep them
+CATALOG_CACHE_CONTROL = f"private, max-age={CATALOG_MAX_AGE}"
+
+
+def make_etag(*parts) -> str:
+    digest = blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if not (header := request.headers.get("if-none-match")):
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison
+    return etag in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def not_modified(
+    request: Request, response: Response, etag: str, cache_control: str | None = None
+) -> Response | None:
+    """Tag ``response`` and return a 304 if the client's copy is current.
+
+    ``response`` is the one FastAPI injects, or the one the handler returns.
+    """
+    headers = {"ETag": etag}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    response.headers.update(headers)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return None
+
+
+def etag_response(
+    request: Request, response: Response, cache_control: str | None = None
+) -> Response:
+    """Tag a rendered response with the hash of its body."""
+    return (
+        not_modified(request, response, make_etag(response.body), cache_control)
+        or response
+    )
+
+
+class ETagCache:
+    """The ETags of responses rendered at a given version of their data.
+
+    Entries are keyed by URL and dropped whenever the version moves on.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._version = None
+        self._etags: dict[str, str] = {}
+        self._lock = Lock()
+
+    def get(self, version, url: str) -> str | None:
+        if version != self._version:
+            return None
+        return self._etags.get(url)
+
+    def set(self, version, url: str, etag: str):
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self._etags = {}
+            if len(self._etags) < self.maxsize:
+                self._etags[url] = etag
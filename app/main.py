@@ -1,5 +1,17 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import logging
+from threading import Thread
 
+from anyio import to_thread
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from app.cache import CacheError
+from app.db.catalog import catalog_cache
+from app.db.database import CATALOG_WARM, THREADPOOL_SIZE, db_url, get_engine
+from app.metrics import CONTENT_TYPE, registry
+from app.middleware import QueryStatsMiddleware
+from app import profiling
 from app.routers import (
     exercises,
     musclegroups,
@@ -13,24 +25,69 @@ from app.routers import (
     workout_exercises,
     roles,
     permissions,
+    profiles,
+    slow_queries,
 )
 
-app = FastAPI()
-
-app.include_router(exercises.router)
-app.include_router(musclegroups.router)
-app.include_router(workout_routines.router)
-app.include_router(workouts.router)
-app.include_router(sets.router)
-app.include_router(planned_sets.router)
-app.include_router(users.router)
-app.include_router(weights.router)
-app.include_router(auth.router)
-app.include_router(workout_exercises.router)
-app.include_router(roles.router)
-app.include_router(permissions.router)
-
-
-@app.get("/")
-async def root():
-    return {"message": "Hello World!"}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup doesn't wait on the database: the engine connects lazily on the
+    # first request and the schema is managed by Alembic, not created here.
+    # The only I/O is the optional catalog warm-up, off the startup path.
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    if CATALOG_WARM and db_url:
+        # Loaded in the background so startup never waits on the database
+        Thread(
+            target=catalog_cache.warm,
+            args=(get_engine(),),
+            name="catalog-warm",
+            daemon=True,
+        ).start()
+    yield
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(lifespan=lifespan)
+
+    app.include_router(exercises.router)
+    app.include_router(musclegroups.router)
+    app.include_router(workout_routines.router)
+    app.include_router(workouts.router)
+    app.include_router(sets.router)
+    app.include_router(planned_sets.router)
+    app.include_router(users.router)
+    app.include_router(weights.router)
+    app.include_router(auth.router)
+    app.include_router(workout_exercises.router)
+    app.include_router(roles.router)
+    app.include_router(permissions.router)
+    app.include_router(slow_queries.router)
+    if profiling.PROFILING_ENABLED:
+        app.include_router(profiles.router)
+
+    @app.get("/")
+    async def root():
+        return {"message": "Hello World!"}
+
+    @app.exception_handler(CacheError)
+    async def cache_unavailable(request: Request, exc: CacheError):
+        # Token revocations live in the cache, so auth fails closed without it
+        logging.getLogger("app.cache").warning("Cache unavailable: %s", exc)
+        return JSONResponse(
+            {"detail": "Service temporarily unavailable"}, status_code=503
+        )
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(registry.render(), media_type=CONTENT_TYPE)
+
+    if profiling.PROFILING_ENABLED:
+        profiling.install_profiling(app)
+    # Added last so it's the outermost middleware and its SQL stats cover
+    # everything else, including profiling
+    app.add_middleware(QueryStatsMiddleware)
+
+    return app
@@ -0,0 +1,196 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Metrics are per process; with several workers each one is scraped (or
+aggregated) separately. Updates take a lock and touch one dict entry, so
+recording them on every request is cheap.
+"""
+
+from bisect import bisect_left
+from threading import Lock
+
+from app.db.database import get_engine
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = Lock()
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        with self._lock:
+            values = list(self._values.items())
+        for labelvalues, value in values:
+            lines.extend(self._samples(labelvalues, value))
+        return lines
+
+    def _samples(self, labelvalues, value) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, labelvalues)} {_number(value)}"]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def inc(self, *labelvalues, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues, amount: float = 1):
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, value: float, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            if (series := self._values.get(labelvalues)) is None:
+                # Per-bucket counts, then the sum
+                series = self._values[labelvalues] = [0] * (len(self.buckets) + 1) + [0]
+            series[index] += 1
+            series[-1] += value
+
+    def _samples(self, labelvalues, series) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), series):
+            cumulative += count
+            labels = _labels(self.labelnames, labelvalues, f'le="{_number(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _labels(self.labelnames, labelvalues)
+        lines.append(f"{self.name}_sum{labels} {_number(series[-1])}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """Call ``collector()`` before every render, to refresh gauges."""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self.collectors:
+            collector()
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time to serve a request, including streaming its body.",
+        ("method", "route", "status"),
+        LATENCY_BUCKETS,
+    )
+)
+REQUESTS_IN_FLIGHT = registry.register(
+    Gauge("http_requests_in_flight", "Requests currently being served.")
+)
+REQUEST_QUERIES = registry.register(
+    Histogram(
+        "http_request_queries",
+        "SQL statements executed per request.",
+        ("method", "route"),
+        QUERY_COUNT_BUCKETS,
+    )
+)
+DB_POOL_SIZE = registry.register(
+    Gauge("db_pool_size", "Connections the pool keeps open.")
+)
+DB_POOL_CHECKED_OUT = registry.register(
+    Gauge("db_pool_checked_out", "Connections currently checked out of the pool.")
+)
+DB_POOL_OVERFLOW = registry.register(
+    Gauge("db_pool_overflow", "Connections open beyond the pool size.")
+)
+AUTH_FAILURES = registry.register(
+    Counter(
+        "auth_failures_total",
+        "Rejected logins, tokens and permission checks.",
+        ("reason",),
+    )
+)
+CACHE_REQUESTS = registry.register(
+    Counter(
+        "cache_requests_total",
+        "Cache lookups, by cache and hit or miss.",
+        ("cache", "result"),
+    )
+)
+
+
+def collect_pool_stats():
+    # Only report once the engine exists; scraping must not create it
+    if not get_engine.cache_info().currsize:
+        return
+    pool = get_engine().pool
+    for gauge, stat in (
+        (DB_POOL_SIZE, "size"),
+        (DB_POOL_CHECKED_OUT, "checkedout"),
+        (DB_POOL_OVERFLOW, "overflow"),
+    ):
+        # SQLite's pools don't track all of these
+        if callable(value := getattr(pool, stat, None)):
+            gauge.set(value())
+
+
+registry.add_collector(collect_pool_stats)
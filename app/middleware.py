@@ -0,0 +1,91 @@
+"""ASGI middleware.
+
+These are plain ASGI callables rather than ``BaseHTTPMiddleware`` so that
+streamed responses pass straight through and the context variables they set
+are visible to the handler.
+"""
+
+import json
+import logging
+import random
+from time import perf_counter
+
+from starlette.datastructures import MutableHeaders
+
+from app.db.database import SQL_STATS_HEADERS, SQL_STATS_LOG_SAMPLE_RATE
+from app.db.instrumentation import QueryStats, current_query_stats
+from app.metrics import REQUEST_DURATION, REQUEST_QUERIES, REQUESTS_IN_FLIGHT
+
+logger = logging.getLogger("app.requests")
+
+
+def route_path(scope) -> str:
+    # FastAPI stores the matched route in the scope; unmatched paths are
+    # grouped so they can't blow up log cardinality
+    route = scope.get("route")
+    return route.path if route is not None else "<unmatched>"
+
+
+class QueryStatsMiddleware:
+    """Count the SQL statements and DB time each request costs.
+
+    The totals are sent as ``Server-Timing`` and ``X-Query-Count`` headers
+    and a sample of requests is logged as one JSON line per request.
+    Statements run while a streamed body is being sent are only in the log.
+    Every request also feeds the latency, in-flight and query-count metrics.
+    """
+
+    def __init__(
+        self,
+        app,
+        headers: bool = SQL_STATS_HEADERS,
+        log_sample_rate: float = SQL_STATS_LOG_SAMPLE_RATE,
+    ):
+        self.app = app
+        self.headers = headers
+        self.log_sample_rate = log_sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = QueryStats(scope)
+        token = current_query_stats.set(stats)
+        REQUESTS_IN_FLIGHT.inc()
+        start = perf_counter()
+        status_code = 500
+
+        async def send_with_stats(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.headers:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", stats.server_timing())
+                    headers.append("X-Query-Count", str(stats.count))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            duration = perf_counter() - start
+            current_query_stats.reset(token)
+            REQUESTS_IN_FLIGHT.dec()
+            route = route_path(scope)
+            REQUEST_DURATION.observe(duration, scope["method"], route, status_code)
+            REQUEST_QUERIES.observe(stats.count, scope["method"], route)
+            if random.random() < self.log_sample_rate:
+                self.log(scope, status_code, duration, stats)
+
+    def log(self, scope, status_code: int, duration: float, stats: QueryStats):
+        fields = {
+            "method": scope["method"],
+            "route": route_path(scope),
+            "status": status_code,
+            "duration_ms": round(duration * 1000, 2),
+            "queries": stats.count,
+            "db_ms": round(stats.total_time * 1000, 2),
+            "slowest_ms": round(stats.slowest_time * 1000, 2),
+            "slowest_statement": stats.slowest_statement,
+        }
+        logger.info(json.dumps(fields), extra={"sql_stats": fields})
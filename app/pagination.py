@@ -0,0 +1,64 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+import datetime
+import json
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+from sqlmodel import Session
+
+# The cursor for the next page is returned in a header so list responses
+# keep their existing shape
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values) -> str:
+    payload = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        values = json.loads(urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def after_id(id_column, cursor: str):
+    """Rows after ``cursor`` when ordering by ``id_column`` ascending."""
+    try:
+        (last_id,) = decode_cursor(cursor)
+        last_id = int(last_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return id_column > last_id
+
+
+def before_date_and_id(date_column, id_column, cursor: str):
+    """Rows after ``cursor`` when ordering by date then id, both descending."""
+    try:
+        last_date, last_id = decode_cursor(cursor)
+        last_date = datetime.date.fromisoformat(last_date)
+        last_id = int(last_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Expanded rather than a row-value comparison, which MSSQL lacks
+    return or_(
+        date_column < last_date,
+        and_(date_column == last_date, id_column < last_id),
+    )
+
+
+def paginate(session: Session, query, limit: int, response: Response, cursor_for):
+    """Fetch one page of ``query`` and set the cursor for the next one.
+
+    One extra row is fetched to tell whether another page exists, so the
+    header is only set when there is something left to read.
+    """
+    rows = session.exec(query.limit(limit + 1)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = cursor_for(rows[-1])
+    return rows
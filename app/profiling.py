@@ -0,0 +1,266 @@
+"""On-demand request profiling.
+
+Disabled unless ``PROFILING_ENABLED`` is set, in which case nothing here is
+installed and requests pay nothing for it. When enabled, a request is
+profiled if it carries the ``X-Profile`` header with a bearer token that
+has the ``profile_requests`` permission, or if it is picked by
+``PROFILE_SAMPLE_RATE``.
+
+A profiled request runs cProfile on the event loop thread and records when
+the handler started and finished. Before Python 3.12 a profiler only sees
+its own thread, so a sync handler gets a second profiler in its worker
+thread. From 3.12 cProfile uses ``sys.monitoring``, which sees every thread
+and allows only one profiler at a time, so the loop thread's profiler is
+the request's only one. The merged profile is written to ``PROFILE_DIR`` as a ``.prof``
+file (load it with ``pstats`` or snakeviz) next to a JSON summary with the
+phase timings and the most expensive functions. Only the newest
+``PROFILE_KEEP`` profiles are kept. The loop thread is shared, so loop-side
+work of concurrent requests can show up in a profile.
+"""
+
+import asyncio
+import cProfile
+from contextvars import ContextVar
+from functools import wraps
+import json
+import os
+from pathlib import Path
+import pstats
+import random
+import sys
+import time
+from time import perf_counter
+from uuid import uuid4
+
+from anyio import to_thread
+from fastapi.routing import APIRoute
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.auth import cached_token_permissions
+from app.cache import CacheError, cache_call
+from app.db.database import env_flag, env_float, env_int
+from app.db.instrumentation import current_query_stats
+from app.middleware import route_path
+
+PROFILING_ENABLED = env_flag("PROFILING_ENABLED")
+PROFILE_SAMPLE_RATE = env_float("PROFILE_SAMPLE_RATE", 0.0)
+PROFILE_DIR = Path(os.environ.get("PROFILE_DIR", "profiles"))
+PROFILE_KEEP = env_int("PROFILE_KEEP", 100)
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_PERMISSION = "profile_requests"
+TOP_FUNCTIONS = 30
+PROFILER_SEES_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.id = uuid4().hex
+        self.profilers: list[cProfile.Profile] = []
+        self.start = perf_counter()
+        self.handler_start: float | None = None
+        self.handler_end: float | None = None
+        self.response_start: float | None = None
+
+    def start_profiler(self) -> cProfile.Profile | None:
+        """Enable a new profiler for this request.
+
+        Returns None if another profiler already holds the interpreter,
+        which from 3.12 is any enabled profiler.
+        """
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return None
+        self.profilers.append(profiler)
+        return profiler
+
+    def server_timing(self) -> str:
+        # Only the phases that are over once the response starts
+        if self.handler_end is None:
+            return ""
+        return ", ".join(
+            f"{name};dur={(end - start) * 1000:.3f}"
+            for name, start, end in (
+                ("deps", self.start, self.handler_start),
+                ("handler", self.handler_start, self.handler_end),
+                ("serialize", self.handler_end, self.response_start),
+            )
+        )
+
+    def phases(self, end: float, db_time: float) -> dict[str, float]:
+        """Phase durations in ms.
+
+        ``dependencies`` is everything before the handler ran: routing,
+        body parsing, ``get_session`` and ``get_current_user``.
+        ``serialization`` runs from the handler returning to the response
+        starting.
+        """
+        phases = {"total": end - self.start, "sql": db_time}
+        if self.handler_start is not None:
+            phases["dependencies"] = self.handler_start - self.start
+        if self.handler_end is not None:
+            phases["handler"] = self.handler_end - self.handler_start
+            if self.response_start is not None:
+                phases["serialization"] = self.response_start - self.handler_end
+        return {name: round(value * 1000, 3) for name, value in phases.items()}
+
+
+current_profile: ContextVar[RequestProfile | None] = ContextVar(
+    "current_profile", default=None
+)
+
+
+def profile_endpoint(call):
+    """Wrap a route's endpoint so it reports to the request's profile."""
+    if asyncio.iscoroutinefunction(call):
+        # Runs on the loop thread, which is already being profiled
+
+        @wraps(call)
+        async def profiled(*args, **kwargs):
+            if (profile := current_profile.get()) is None:
+                return await call(*args, **kwargs)
+            profile.handler_start = perf_counter()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                profile.handler_end = perf_counter()
+
+    else:
+
+        @wraps(call)
+        def profiled(*args, **kwargs):
+            if (profile := current_profile.get()) is None:
+                return call(*args, **kwargs)
+            profile.handler_start = perf_counter()
+            profiler = None
+            if not PROFILER_SEES_ALL_THREADS:
+                profiler = profile.start_profiler()
+            try:
+                return call(*args, **kwargs)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                profile.handler_end = perf_counter()
+
+    return profiled
+
+
+def install_profiling(app):
+    """Profile ``app``'s routes; call after every router is included."""
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            route.dependant.call = profile_endpoint(route.dependant.call)
+    app.add_middleware(ProfilingMiddleware)
+
+
+def write_profile(profile: RequestProfile, summary: dict):
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stats = pstats.Stats(*profile.profilers)
+    stats.dump_stats(PROFILE_DIR / f"{profile.id}.prof")
+    functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+    summary["functions"] = [
+        {
+            "function": f"{file}:{line}({name})",
+            "calls": calls,
+            "total_ms": round(total * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        }
+        for (file, line, name), (_, calls, total, cumulative, _) in functions[
+            :TOP_FUNCTIONS
+        ]
+    ]
+    (PROFILE_DIR / f"{profile.id}.json").write_text(json.dumps(summary))
+    for old in sorted(
+        PROFILE_DIR.glob("*.prof"), key=lambda path: path.stat().st_mtime_ns
+    )[:-PROFILE_KEEP]:
+        old.unlink(missing_ok=True)
+        old.with_suffix(".json").unlink(missing_ok=True)
+
+
+def read_profile_summaries() -> list[dict]:
+    summaries = []
+    for path in PROFILE_DIR.glob("*.json"):
+        try:
+            summaries.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            # Deleted or half-written by a concurrent request
+            continue
+    return sorted(summaries, key=lambda summary: summary["time"], reverse=True)
+
+
+def profile_path(profile_id: str) -> Path | None:
+    # Ids are uuid4 hex; anything else can't name a profile
+    if len(profile_id) != 32 or not all(c in "0123456789abcdef" for c in profile_id):
+        return None
+    path = PROFILE_DIR / f"{profile_id}.prof"
+    return path if path.exists() else None
+
+
+async def wants_profile(scope) -> bool:
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        return True
+    headers = Headers(scope=scope)
+    if PROFILE_HEADER not in headers:
+        return False
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer":
+        return False
+    try:
+        permissions = await cache_call(cached_token_permissions, token)
+    except CacheError:
+        # The request itself fails authentication with a 503
+        return False
+    return PROFILE_PERMISSION in permissions
+
+
+class ProfilingMiddleware:
+    # Only one profiler can run on the loop thread at a time
+    loop_profiler_busy = False
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not await wants_profile(scope):
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        status_code = 500
+
+        async def send_with_profile(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                profile.response_start = perf_counter()
+                headers = MutableHeaders(scope=message)
+                headers.append(PROFILE_ID_HEADER, profile.id)
+                if timing := profile.server_timing():
+                    headers.append("Server-Timing", timing)
+            await send(message)
+
+        loop_profiler = None
+        if not ProfilingMiddleware.loop_profiler_busy:
+            loop_profiler = profile.start_profiler()
+            ProfilingMiddleware.loop_profiler_busy = loop_profiler is not None
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            end = perf_counter()
+            if loop_profiler is not None:
+                loop_profiler.disable()
+                ProfilingMiddleware.loop_profiler_busy = False
+            current_profile.reset(token)
+            stats = current_query_stats.get()
+            summary = {
+                "id": profile.id,
+                "time": time.time(),
+                "method": scope["method"],
+                "route": route_path(scope),
+                "path": scope["path"],
+                "status": status_code,
+                "phases": profile.phases(end, stats.total_time if stats else 0.0),
+            }
+            await to_thread.run_sync(write_profile, profile, summary)
@@ -6,8 +6,16 @@ from fastapi.security import OAuth2PasswordRequestForm
 
 from sqlmodel import Session
 
+from app.cache import cache_call
 from app.dependencies import get_session
-from app.auth import authenticate_user, Token, create_access_token
+from app.auth import (
+    authenticate_user,
+    create_user_access_token,
+    get_current_user,
+    token_versions,
+    CurrentUser,
+    Token,
+)
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 120
 
@@ -32,7 +40,9 @@ async def login(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     session: Session = Depends(get_session),
 ):
-    db_user = authenticate_user(form_data.username, form_data.password, session=session)
+    db_user = await authenticate_user(
+        form_data.username, form_data.password, session=session
+    )
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -40,7 +50,13 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": db_user.email_address}, expires_delta=access_token_expires
+    access_token = await cache_call(
+        create_user_access_token, db_user, access_token_expires
     )
     return Token(access_token=access_token, token_type="bearer")
+
+
+@router.post("/logout")
+async def logout(current_user: Annotated[CurrentUser, Depends(get_current_user)]):
+    await cache_call(token_versions.revoke, current_user.id)
+    return {"ok": True}
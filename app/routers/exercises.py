@@ -1,19 +1,26 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response
 from sqlmodel import Session, select
 
 from app.db.models import (
     Exercise,
+    MuscleGroup,
     ExerciseCreate,
+    ExerciseMuscleGroup,
     ExerciseRead,
     ExerciseReadWithMuscleGroups,
     ExerciseReadFull,
     ExerciseUpdate,
-    MuscleGroup,
+    MuscleGroupRead,
 )
+from app.db.bulk import insert_rows
+from app.db.catalog import catalog_cache
+from app.db.deletes import delete_exercise_musclegroups, delete_exercises
 from app.dependencies import get_session
+from app.etag import CATALOG_CACHE_CONTROL, not_modified
 from app.auth import get_current_user, require_permission
+from app.streaming import list_stream_format, stream_list
 
 
 router = APIRouter(
@@ -22,6 +29,37 @@ router = APIRouter(
 )
 
 
+def link_musclegroups(
+    session: Session, exercise_id: int, musclegroup_ids
+) -> list[MuscleGroupRead]:
+    # Looked up in the database rather than the catalog, which may not have
+    # another worker's changes yet. Unknown muscle groups are skipped, as
+    # they always have been
+    musclegroup_ids = list(dict.fromkeys(musclegroup_ids))
+    musclegroups = {
+        id: MuscleGroupRead(id=id, name=name)
+        for id, name in session.exec(
+            select(MuscleGroup.id, MuscleGroup.name).where(
+                MuscleGroup.id.in_(musclegroup_ids)
+            )
+        )
+    }
+    musclegroup_ids = [
+        musclegroup_id
+        for musclegroup_id in musclegroup_ids
+        if musclegroup_id in musclegroups
+    ]
+    insert_rows(
+        session,
+        ExerciseMuscleGroup,
+        [
+            {"exercise_id": exercise_id, "musclegroup_id": musclegroup_id}
+            for musclegroup_id in musclegroup_ids
+        ],
+    )
+    return [musclegroups[musclegroup_id] for musclegroup_id in musclegroup_ids]
+
+
 @router.post("/", response_model=ExerciseReadWithMuscleGroups)
 @require_permission("create_exercise")
 def create_exercise(
@@ -34,15 +72,15 @@ def create_exercise(
         select(Exercise).where(Exercise.name == exercise.name.lower())
     ).first():
         raise ValueError(f"Exercise named {exercise.name} already exists!")
-    musclegroups = []
-    for musclegroup_id in exercise.musclegroup_ids:
-        if musclegroup := session.get(MuscleGroup, musclegroup_id):
-            musclegroups.append(musclegroup)
-    db_exercise = Exercise(name=exercise.name.lower(), musclegroups=musclegroups)
+    db_exercise = Exercise(name=exercise.name.lower())
     session.add(db_exercise)
+    session.flush()
+    musclegroups = link_musclegroups(session, db_exercise.id, exercise.musclegroup_ids)
     session.commit()
-    session.refresh(db_exercise)
-    return db_exercise
+    catalog_cache.invalidate()
+    return ExerciseReadWithMuscleGroups(
+        id=db_exercise.id, name=db_exercise.name, musclegroups=musclegroups
+    )
 
 
 @router.get("/", response_model=list[ExerciseRead])
@@ -50,13 +88,21 @@ def create_exercise(
 def read_exercises(
     *,
     session: Session = Depends(get_session),
+    request: Request,
+    response: Response,
     offset: int = 0,
-    limit: int = Query(default=100, lte=100),
+    limit: int | None = Query(default=None, lte=100),
+    stream_format: Annotated[str | None, Depends(list_stream_format)],
     current_user: Annotated[str, Depends(get_current_user)],
 ):
-    return session.exec(
-        select(Exercise).order_by(Exercise.id).offset(offset).limit(limit)
-    ).all()
+    if stream_format:
+        query = select(Exercise).order_by(Exercise.id).offset(offset).limit(limit)
+        return stream_list(session, query, ExerciseRead, stream_format)
+    catalog = catalog_cache.get(session)
+    if cached := not_modified(request, response, catalog.etag, CATALOG_CACHE_CONTROL):
+        return cached
+    exercises = list(catalog.exercises.values())
+    return exercises[offset : offset + (limit or 100)]
 
 
 @router.get("/{exercise_id}", response_model=ExerciseReadFull)
@@ -64,11 +110,21 @@ def read_exercises(
 def read_exercise(
     *,
     session: Session = Depends(get_session),
+    request: Request,
+    response: Response,
     exercise_id: int,
     current_user: Annotated[str, Depends(get_current_user)],
 ):
-    if exercise := session.get(Exercise, exercise_id):
-        return exercise
+    catalog = catalog_cache.get(session)
+    if exercise := catalog.exercises.get(exercise_id):
+        if cached := not_modified(
+            request, response, catalog.etag, CATALOG_CACHE_CONTROL
+        ):
+            return cached
+        return ExerciseReadFull(
+            name=exercise.name,
+            musclegroups=catalog.exercise_musclegroup_list(exercise_id),
+        )
     else:
         raise HTTPException(status_code=404, detail="Exercise not found")
 
@@ -86,14 +142,12 @@ def update_exercise(
     if not db_exercise:
         raise HTTPException(status_code=404, detail="Exercise not found")
 
+    musclegroups = catalog_cache.get(session).exercise_musclegroup_list(exercise_id)
     exercise_data = exercise.dict(exclude_unset=True)
     for key, value in exercise_data.items():
         if key == "musclegroup_ids":
-            musclegroups = []
-            for musclegroup_id in value:
-                if musclegroup := session.get(MuscleGroup, musclegroup_id):
-                    musclegroups.append(musclegroup)
-            db_exercise.musclegroups = musclegroups
+            delete_exercise_musclegroups(session, [exercise_id])
+            musclegroups = link_musclegroups(session, exercise_id, value)
         elif key == "name":
             if session.exec(
                 select(Exercise).where(
@@ -108,8 +162,11 @@ def update_exercise(
             setattr(db_exercise, key, value)
     session.add(db_exercise)
     session.commit()
+    catalog_cache.invalidate()
     session.refresh(db_exercise)
-    return db_exercise
+    return ExerciseReadWithMuscleGroups(
+        id=db_exercise.id, name=db_exercise.name, musclegroups=musclegroups
+    )
 
 
 @router.delete("/{exercise_id}")
@@ -120,16 +177,9 @@ def delete_exercise(
     exercise_id: int,
     current_user: Annotated[str, Depends(get_current_user)],
 ):
-    exercise = session.get(Exercise, exercise_id)
-    if not exercise:
+    if not session.get(Exercise, exercise_id):
         raise HTTPException(status_code=404, detail="Exercise not found")
-    # Need to delete the routine exercises first
-    for routine_exercise in exercise.routine_exercises:
-        session.delete(routine_exercise)
-        session.commit()
-    for workout_exercise in exercise.workout_exercises:
-        session.delete(workout_exercise)
-        session.commit()
-    session.delete(exercise)
+    delete_exercises(session, [exercise_id])
     session.commit()
+    catalog_cache.invalidate()
     return {"ok": True}
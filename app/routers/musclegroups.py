@@ -1,6 +1,6 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response
 from sqlmodel import Session, select
 
 from app.db.models import (
@@ -10,7 +10,10 @@ from app.db.models import (
     MuscleGroupReadWithExercises,
     MuscleGroupUpdate,
 )
+from app.db.catalog import catalog_cache
+from app.db.deletes import delete_musclegroups
 from app.dependencies import get_session
+from app.etag import CATALOG_CACHE_CONTROL, not_modified
 from app.auth import get_current_user, require_permission
 
 router = APIRouter(
@@ -35,6 +38,7 @@ def create_musclegroup(
     db_musclegroup.name = db_musclegroup.name.lower()
     session.add(db_musclegroup)
     session.commit()
+    catalog_cache.invalidate()
     session.refresh(db_musclegroup)
     return db_musclegroup
 
@@ -44,13 +48,17 @@ def create_musclegroup(
 def read_musclegroups(
     *,
     session: Session = Depends(get_session),
+    request: Request,
+    response: Response,
     offset: int = 0,
     limit: int = Query(default=100, lte=100),
     current_user: Annotated[str, Depends(get_current_user)],
 ):
-    return session.exec(
-        select(MuscleGroup).order_by(MuscleGroup.id).offset(offset).limit(limit)
-    ).all()
+    catalog = catalog_cache.get(session)
+    if cached := not_modified(request, response, catalog.etag, CATALOG_CACHE_CONTROL):
+        return cached
+    musclegroups = list(catalog.musclegroups.values())
+    return musclegroups[offset : offset + limit]
 
 
 @router.get(
@@ -61,11 +69,22 @@ def read_musclegroups(
 def read_musclegroup(
     *,
     session: Session = Depends(get_session),
+    request: Request,
+    response: Response,
     musclegroup_id: int,
     current_user: Annotated[str, Depends(get_current_user)],
 ):
-    if musclegroup := session.get(MuscleGroup, musclegroup_id):
-        return musclegroup
+    catalog = catalog_cache.get(session)
+    if musclegroup := catalog.musclegroups.get(musclegroup_id):
+        if cached := not_modified(
+            request, response, catalog.etag, CATALOG_CACHE_CONTROL
+        ):
+            return cached
+        return MuscleGroupReadWithExercises(
+            id=musclegroup.id,
+            name=musclegroup.name,
+            exercises=catalog.musclegroup_exercise_list(musclegroup_id),
+        )
     else:
         raise HTTPException(status_code=404, detail="MuscleGroup not found")
 
@@ -99,6 +118,7 @@ def update_musclegroup(
         setattr(db_musclegroup, key, value)
     session.add(db_musclegroup)
     session.commit()
+    catalog_cache.invalidate()
     session.refresh(db_musclegroup)
     return db_musclegroup
 
@@ -111,9 +131,9 @@ def delete_musclegroup(
     musclegroup_id: int,
     current_user: Annotated[str, Depends(get_current_user)],
 ):
-    musclegroup = session.get(MuscleGroup, musclegroup_id)
-    if not musclegroup:
+    if not session.get(MuscleGroup, musclegroup_id):
         raise HTTPException(status_code=404, detail="Muscle Group not found")
-    session.delete(musclegroup)
+    delete_musclegroups(session, [musclegroup_id])
     session.commit()
+    catalog_cache.invalidate()
     return {"ok": True}
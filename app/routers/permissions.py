@@ -8,6 +8,8 @@ from app.db.models import (
     PermissionRead,
     Permission,
 )
+from app.db.permissions import role_permission_cache
+from app.db.deletes import delete_permissions
 from app.dependencies import get_session
 from app.auth import get_current_user, require_permission
 
@@ -113,13 +115,9 @@ def delete_permission(
     permission_id: int,
     current_user: Annotated[str, Depends(get_current_user)],
 ):
-    permission = session.get(Permission, permission_id)
-    if not permission:
+    if not session.get(Permission, permission_id):
         raise HTTPException(status_code=404, detail="Permission not found")
-    # Need to delete the role permissions first
-    for role_permission in permission.role_permissions:
-        session.delete(role_permission)
-        session.commit()
-    session.delete(permission)
+    delete_permissions(session, [permission_id])
     session.commit()
+    role_permission_cache.invalidate()
     return {"ok": True}
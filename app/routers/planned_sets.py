@@ -1,18 +1,20 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
 from sqlmodel import Session, select
 
 from app.db.models import (
     PlannedSet,
     PlannedSetCreate,
     PlannedSetRead,
-    Exercise,
     WorkoutRoutine,
     RoutineExercise,
 )
+from app.db.catalog import catalog_cache
 from app.dependencies import get_session
 from app.auth import get_current_user, require_permission
+from app.pagination import after_id, encode_cursor, paginate
+from app.serialization import fast_response
 
 router = APIRouter(
     prefix="/planned_sets",
@@ -28,7 +30,7 @@ def create_planned_set(
     planned_set: PlannedSetCreate,
     current_user: Annotated[str, Depends(get_current_user)],
 ):
-    if not session.get(Exercise, planned_set.exercise_id):
+    if catalog_cache.missing_exercise_ids(session, [planned_set.exercise_id]):
         raise HTTPException(
             status_code=404,
             detail=f"Exercise with id {planned_set.exercise_id} not found",
@@ -75,8 +77,10 @@ def create_planned_set(
 def read_planned_sets(
     *,
     session: Session = Depends(get_session),
+    response: Response,
     offset: int = 0,
     limit: int = Query(default=100, lte=100),
+    cursor: str | None = None,
     exercise_id: int | None = None,
     workout_routine_id: int | None = None,
     user_id: int | None = None,
@@ -88,17 +92,24 @@ def read_planned_sets(
             detail="User does not have permission to read planned sets of another user",
         )
     query = select(PlannedSet)
+    if user_id or exercise_id or workout_routine_id:
+        query = query.join(RoutineExercise)
     if user_id:
-        query = query.where(
-            PlannedSet.routine_exercise.workout_routine.user_id == user_id
-        )
+        query = query.join(WorkoutRoutine).where(WorkoutRoutine.user_id == user_id)
     if exercise_id:
-        query = query.where(PlannedSet.routine_exercise.exercise_id == exercise_id)
+        query = query.where(RoutineExercise.exercise_id == exercise_id)
     if workout_routine_id:
-        query = query.where(
-            PlannedSet.routine_exercise.workout_routine_id == workout_routine_id
-        )
-    return session.exec(query.order_by(PlannedSet.id).offset(offset).limit(limit)).all()
+        query = query.where(RoutineExercise.routine_id == workout_routine_id)
+    if cursor:
+        query = query.where(after_id(PlannedSet.id, cursor))
+    rows = paginate(
+        session,
+        query.order_by(PlannedSet.id).offset(offset),
+        limit=limit,
+        response=response,
+        cursor_for=lambda planned_set: encode_cursor(planned_set.id),
+    )
+    return fast_response(PlannedSetRead, rows, response)
 
 
 @router.get(
@@ -0,0 +1,34 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+
+from app.auth import get_current_user, require_permission
+from app.profiling import PROFILE_PERMISSION, profile_path, read_profile_summaries
+
+
+router = APIRouter(
+    prefix="/profiles",
+    responses={404: {"description": "Not Found"}},
+)
+
+
+@router.get("/")
+@require_permission(PROFILE_PERMISSION)
+def read_profiles(
+    *,
+    current_user: Annotated[str, Depends(get_current_user)],
+):
+    return read_profile_summaries()
+
+
+@router.get("/{profile_id}")
+@require_permission(PROFILE_PERMISSION)
+def read_profile(
+    *,
+    profile_id: str,
+    current_user: Annotated[str, Depends(get_current_user)],
+):
+    if (path := profile_path(profile_id)) is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=path.name)
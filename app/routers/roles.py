@@ -1,6 +1,6 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response
 from sqlmodel import Session, select
 
 from app.db.models import (
@@ -9,9 +9,15 @@ from app.db.models import (
     Permission,
     RolePermissions,
     RoleReadOnlyPermissions,
+    User,
 )
+from app.db.permissions import role_permission_cache
+from app.db.loaders import loader_options
+from app.db.deletes import delete_roles
 from app.dependencies import get_session
-from app.auth import get_current_user, require_permission
+from app.auth import get_current_user, require_permission, token_versions
+from app.etag import ETagCache, etag_matches, etag_response
+from app.serialization import fast_response
 
 
 router = APIRouter(
@@ -19,6 +25,21 @@ router = APIRouter(
     responses={404: {"description": "Not Found"}},
 )
 
+# Roles change together with their permission sets, so a tag seen at the
+# permission cache's current version is still valid
+role_etags = ETagCache()
+
+
+def cached_role_response(request: Request, load) -> Response:
+    """Answer from ``role_etags`` if possible, otherwise render ``load()``."""
+    version = role_permission_cache.version
+    url = str(request.url)
+    if (etag := role_etags.get(version, url)) and etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response = etag_response(request, fast_response(RoleReadOnlyPermissions, load()))
+    role_etags.set(version, url, response.headers["ETag"])
+    return response
+
 
 @router.post("/", response_model=RoleReadOnlyPermissions)
 @require_permission("create_role")
@@ -49,6 +70,7 @@ def create_role(
     session.add(role_db)
     session.commit()
     session.refresh(role_db)
+    role_permission_cache.invalidate(role_db.id)
     return role_db
 
 
@@ -57,13 +79,21 @@ def create_role(
 def read_roles(
     *,
     session: Session = Depends(get_session),
+    request: Request,
     offset: int = 0,
     limit: int = Query(default=100, lte=100),
     current_user: Annotated[str, Depends(get_current_user)],
 ):
-    return session.exec(
-        select(Role).order_by(Role.id).offset(offset).limit(limit)
-    ).all()
+    return cached_role_response(
+        request,
+        lambda: session.exec(
+            select(Role)
+            .options(*loader_options(RoleReadOnlyPermissions))
+            .order_by(Role.id)
+            .offset(offset)
+            .limit(limit)
+        ).all(),
+    )
 
 
 @router.get("/{role_id}", response_model=RoleReadOnlyPermissions)
@@ -71,13 +101,19 @@ def read_roles(
 def read_role(
     *,
     session: Session = Depends(get_session),
+    request: Request,
     role_id: int,
     current_user: Annotated[str, Depends(get_current_user)],
 ):
-    if role := session.get(Role, role_id):
-        return role
-    else:
-        raise HTTPException(status_code=404, detail="Role not found")
+    def load():
+        if role := session.get(
+            Role, role_id, options=loader_options(RoleReadOnlyPermissions)
+        ):
+            return role
+        else:
+            raise HTTPException(status_code=404, detail="Role not found")
+
+    return cached_role_response(request, load)
 
 
 # @router.patch("/{exercise_id}", response_model=ExerciseReadWithMuscleGroups)
@@ -127,13 +163,13 @@ def delete_role(
     role_id: int,
     current_user: Annotated[str, Depends(get_current_user)],
 ):
-    role = session.get(Role, role_id)
-    if not role:
+    if not session.get(Role, role_id):
         raise HTTPException(status_code=404, detail="Role not found")
-    # Need to delete the role permissions first
-    for role_permission in role.role_permissions:
-        session.delete(role_permission)
-        session.commit()
-    session.delete(role)
+    # Tokens carry the role id, which a new role may reuse
+    user_ids = session.exec(select(User.id).where(User.role_id == role_id)).all()
+    delete_roles(session, [role_id])
     session.commit()
+    role_permission_cache.invalidate(role_id)
+    for user_id in user_ids:
+        token_versions.revoke(user_id)
     return {"ok": True}
@@ -1,24 +1,34 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
+from pydantic import conlist
 from sqlmodel import Session, select
 
 from app.db.models import (
     Set,
+    SetBatchCreate,
+    SetBatchRead,
     SetCreate,
     SetRead,
-    Exercise,
     Workout,
     WorkoutExercise,
 )
+from app.db.bulk import ensure_exercise_links, insert_rows
+from app.db.catalog import catalog_cache
 from app.dependencies import get_session
 from app.auth import get_current_user, require_permission
+from app.pagination import after_id, encode_cursor, paginate
+from app.serialization import fast_response
 
 router = APIRouter(
     prefix="/sets",
     responses={404: {"description": "Not Found"}},
 )
 
+# Each set can add up to two parameters to the IN lookups, which MSSQL caps
+# at 2100 per statement
+SET_BATCH_MAX = 1000
+
 
 @router.post("/", response_model=SetRead)
 @require_permission("create_all_sets", "create_own_sets")
@@ -28,7 +38,7 @@ def create_set(
     workout_set: SetCreate,
     current_user: Annotated[str, Depends(get_current_user)],
 ):
-    if not session.get(Exercise, workout_set.exercise_id):
+    if catalog_cache.missing_exercise_ids(session, [workout_set.exercise_id]):
         raise HTTPException(
             status_code=404,
             detail=f"Exercise with id {workout_set.exercise_id} not found",
@@ -70,13 +80,75 @@ def create_set(
     return workout_set_db
 
 
+@router.post("/batch", response_model=SetBatchRead)
+@require_permission("create_all_sets", "create_own_sets")
+def create_sets(
+    *,
+    session: Session = Depends(get_session),
+    workout_sets: conlist(SetBatchCreate, max_items=SET_BATCH_MAX),
+    current_user: Annotated[str, Depends(get_current_user)],
+):
+    if missing_ids := catalog_cache.missing_exercise_ids(
+        session, [workout_set.exercise_id for workout_set in workout_sets]
+    ):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Exercise with id {missing_ids[0]} not found",
+        )
+    workout_ids = {workout_set.workout_id for workout_set in workout_sets}
+    workout_user_ids = dict(
+        session.exec(
+            select(Workout.id, Workout.user_id).where(Workout.id.in_(workout_ids))
+        ).all()
+    )
+    if missing_ids := sorted(workout_ids - workout_user_ids.keys()):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Workout with id {missing_ids[0]} not found",
+        )
+    if any(
+        user_id != current_user.id for user_id in workout_user_ids.values()
+    ) and not current_user.has("create_all_sets"):
+        raise HTTPException(
+            status_code=400,
+            detail="User does not have permission to create sets for another user",
+        )
+    workout_exercise_ids = ensure_exercise_links(
+        session,
+        WorkoutExercise,
+        "workout_id",
+        [
+            (workout_set.workout_id, workout_set.exercise_id)
+            for workout_set in workout_sets
+        ],
+    )
+    insert_rows(
+        session,
+        Set,
+        [
+            {
+                "reps": workout_set.reps,
+                "weight": workout_set.weight,
+                "workout_exercise_id": workout_exercise_ids[
+                    (workout_set.workout_id, workout_set.exercise_id)
+                ],
+            }
+            for workout_set in workout_sets
+        ],
+    )
+    session.commit()
+    return SetBatchRead(created=len(workout_sets))
+
+
 @router.get("/", response_model=list[SetRead])
 @require_permission("read_all_planned_sets", "read_own_planned_sets")
 def read_sets(
     *,
     session: Session = Depends(get_session),
+    response: Response,
     offset: int = 0,
     limit: int = Query(default=100, lte=100),
+    cursor: str | None = None,
     exercise_id: int | None = None,
     workout_id: int | None = None,
     user_id: int | None = None,
@@ -88,13 +160,24 @@ def read_sets(
             detail="User does not have permission to read sets of another user",
         )
     query = select(Set)
+    if user_id or exercise_id or workout_id:
+        query = query.join(WorkoutExercise)
     if user_id:
-        query = query.where(Set.workout_exercise.workout.user_id == user_id)
+        query = query.join(Workout).where(Workout.user_id == user_id)
     if exercise_id:
-        query = query.where(Set.workout_exercise.exercise_id == exercise_id)
+        query = query.where(WorkoutExercise.exercise_id == exercise_id)
     if workout_id:
-        query = query.where(Set.workout_exercise.workout_id == workout_id)
-    return session.exec(query.order_by(Set.id).offset(offset).limit(limit)).all()
+        query = query.where(WorkoutExercise.workout_id == workout_id)
+    if cursor:
+        query = query.where(after_id(Set.id, cursor))
+    rows = paginate(
+        session,
+        query.order_by(Set.id).offset(offset),
+        limit=limit,
+        response=response,
+        cursor_for=lambda workout_set: encode_cursor(workout_set.id),
+    )
+    return fast_response(SetRead, rows, response)
 
 
 @router.get(
@@ -0,0 +1,19 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+
+from app.auth import get_current_user, require_permission
+from app.db.slow_queries import slow_query_log
+
+
+router = APIRouter(prefix="/slow_queries")
+
+
+@router.get("/")
+@require_permission("read_slow_queries")
+def read_slow_queries(
+    *,
+    current_user: Annotated[str, Depends(get_current_user)],
+):
+    """The most recently seen slow statement shapes, newest first."""
+    return slow_query_log.queries()
@@ -1,11 +1,29 @@
-from typing import Annotated
+from typing import Annotated, Literal
 
 from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
 
 from app.db.models import User, UserRead, UserCreate, Role
+from app.db.loaders import loader_options
+from app.db.deletes import delete_users
+from app.db.export import export_batches, export_fields
 from app.dependencies import get_session
-from app.auth import get_password_hash, get_current_user, require_permission
+from app.auth import (
+    get_password_hash,
+    get_current_user,
+    require_permission,
+    token_versions,
+    CurrentUser,
+)
+from app.streaming import (
+    CSV_MEDIA_TYPE,
+    NDJSON_MEDIA_TYPE,
+    iter_csv,
+    iter_ndjson,
+    list_stream_format,
+    stream_list,
+)
 
 router = APIRouter(
     prefix="/users",
@@ -45,19 +63,27 @@ def read_users(
     *,
     session: Session = Depends(get_session),
     offset: int = 0,
-    limit: int = Query(default=100, lte=100),
-    current_user: Annotated[User, Depends(get_current_user)],
+    limit: int | None = Query(default=None, lte=100),
+    stream_format: Annotated[str | None, Depends(list_stream_format)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
 ):
-    return session.exec(
-        select(User).order_by(User.id).offset(offset).limit(limit)
-    ).all()
+    query = select(User).order_by(User.id).offset(offset)
+    if stream_format:
+        return stream_list(session, query.limit(limit), UserRead, stream_format)
+    query = query.options(*loader_options(UserRead))
+    return session.exec(query.limit(limit or 100)).all()
 
 
 @router.get("/me", response_model=User)
-async def read_users_me(
-    current_user: Annotated[User, Depends(get_current_user)],
+def read_users_me(
+    *,
+    session: Session = Depends(get_session),
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
 ):
-    return current_user
+    if user := session.get(User, current_user.id):
+        return user
+    else:
+        raise HTTPException(status_code=404, detail="User not found")
 
 
 @router.get(
@@ -69,18 +95,55 @@ def read_user(
     *,
     session: Session = Depends(get_session),
     user_id: int,
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
 ):
     if user_id != current_user.id and not current_user.has("read_all_users"):
         raise HTTPException(
             status_code=400, detail="User does not have permission to read other users"
         )
-    if user := session.get(User, user_id):
+    if user := session.get(User, user_id, options=loader_options(UserRead)):
         return user
     else:
         raise HTTPException(status_code=404, detail="User not found")
 
 
+@router.get("/{user_id}/export")
+@require_permission("read_all_users", "read_own_user")
+def export_user(
+    *,
+    session: Session = Depends(get_session),
+    user_id: int,
+    file_format: Literal["ndjson", "csv"] = "ndjson",
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
+):
+    """Stream a user's weights, routines and workouts, one record per line."""
+    if user_id != current_user.id and not current_user.has("read_all_users"):
+        raise HTTPException(
+            status_code=400, detail="User does not have permission to read other users"
+        )
+    if not session.get(User, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+
+    def records():
+        # The request session is closed before the body is streamed
+        with Session(session.get_bind()) as export_session:
+            yield from export_batches(export_session, user_id)
+
+    if file_format == "csv":
+        body, media_type = iter_csv(records(), export_fields()), CSV_MEDIA_TYPE
+    else:
+        body, media_type = iter_ndjson(records()), NDJSON_MEDIA_TYPE
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="user-{user_id}-export.{file_format}"'
+            )
+        },
+    )
+
+
 # @router.patch("/{musclegroup_id}", response_model=MuscleGroupRead)
 # def update_musclegroup(
 #     *,
@@ -118,30 +181,16 @@ def delete_user(
     *,
     session: Session = Depends(get_session),
     user_id: int,
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[CurrentUser, Depends(get_current_user)],
 ):
     if user_id != current_user.id and not current_user.has("delete_all_users"):
         raise HTTPException(
             status_code=400,
             detail="User does not have permission to delete other users",
         )
-    user = session.get(User, user_id)
-    if not user:
+    if not session.get(User, user_id):
         raise HTTPException(status_code=404, detail="User not found")
-    for weight in user.weights:
-        session.delete(weight)
-    for workout_routine in user.workout_routines:
-        for routine_exercise in workout_routine.routine_exercises:
-            for planned_set in routine_exercise.planned_sets:
-                session.delete(planned_set)
-            session.delete(routine_exercise)
-        for workout in workout_routine.workouts:
-            for workout_exercise in workout.workout_exercises:
-                for sset in workout_exercise.sets:
-                    session.delete(sset)
-                session.delete(workout_exercise)
-            session.delete(workout)
-        session.delete(workout_routine)
-    session.delete(user)
+    delete_users(session, [user_id])
     session.commit()
+    token_versions.revoke(user_id)
     return {"ok": True}
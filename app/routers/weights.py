@@ -1,15 +1,26 @@
-from typing import Annotated
+import codecs
+import csv
+import datetime
+from itertools import islice
+import json
+import math
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Response, UploadFile
 from sqlmodel import Session, select, desc
 
+from app.db.bulk import upsert_weights
 from app.db.models import (
+    User,
     Weight,
     WeightRead,
     WeightCreate,
+    WeightImportRead,
 )
 from app.dependencies import get_session
 from app.auth import get_current_user, require_permission
+from app.pagination import before_date_and_id, encode_cursor, paginate
+from app.serialization import fast_response
 
 router = APIRouter(
     prefix="/weights",
@@ -37,13 +48,101 @@ def create_weight(
     return db_weight
 
 
+IMPORT_CHUNK_SIZE = 5000
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/jsonl"}
+
+
+def read_import_rows(lines, file_format: str):
+    """Yield (line number, date, weight) for each record in an upload."""
+    if file_format == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row.get("date"), row.get("weight")
+        return
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        if not isinstance(row, dict):
+            raise HTTPException(
+                status_code=422, detail=f"Line {line_number}: invalid JSON object"
+            )
+        yield line_number, row.get("date"), row.get("weight")
+
+
+def parse_import_row(line_number: int, date, weight) -> tuple[datetime.date, float]:
+    try:
+        row = datetime.date.fromisoformat(date), float(weight)
+    except (TypeError, ValueError):
+        row = None
+    # float() accepts "nan" and "inf", which can't be rendered back as JSON
+    if row is None or not math.isfinite(row[1]):
+        raise HTTPException(
+            status_code=422,
+            detail=f"Line {line_number}: expected an ISO date and a numeric weight",
+        )
+    return row
+
+
+@router.post("/import", response_model=WeightImportRead)
+@require_permission("create_all_weights", "create_own_weight")
+def import_weights(
+    *,
+    session: Session = Depends(get_session),
+    file: UploadFile,
+    user_id: int | None = None,
+    file_format: Literal["csv", "ndjson"] | None = None,
+    current_user: Annotated[str, Depends(get_current_user)],
+):
+    """Upsert a CSV (``date,weight`` header) or NDJSON weight history.
+
+    The upload is read line by line and written in chunks, one weight per
+    date; a date that already exists for the user is overwritten. Nothing is
+    committed unless every row is valid.
+    """
+    user_id = user_id or current_user.id
+    if user_id != current_user.id and not current_user.has("create_all_weights"):
+        raise HTTPException(
+            status_code=400,
+            detail="User does not have permission to create weights for another user",
+        )
+    if not session.get(User, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    if file_format is None:
+        ndjson = file.content_type in NDJSON_CONTENT_TYPES or (
+            file.filename or ""
+        ).endswith((".ndjson", ".jsonl"))
+        file_format = "ndjson" if ndjson else "csv"
+
+    rows = read_import_rows(codecs.iterdecode(file.file, "utf-8-sig"), file_format)
+    inserted = updated = 0
+    try:
+        while chunk := list(islice(rows, IMPORT_CHUNK_SIZE)):
+            # Later lines win when a date repeats
+            weights = dict(parse_import_row(*row) for row in chunk)
+            chunk_inserted, chunk_updated = upsert_weights(session, user_id, weights)
+            inserted += chunk_inserted
+            updated += chunk_updated
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=422, detail="File is not valid UTF-8")
+    except csv.Error as e:
+        raise HTTPException(status_code=422, detail=f"Invalid CSV: {e}")
+    session.commit()
+    return WeightImportRead(inserted=inserted, updated=updated)
+
+
 @router.get("/", response_model=list[WeightRead])
 @require_permission("read_all_weights", "read_own_weight")
 def read_weights(
     *,
     session: Session = Depends(get_session),
+    response: Response,
     offset: int = 0,
     limit: int = Query(default=100, lte=100),
+    cursor: str | None = None,
     user_id: int | None = None,
     current_user: Annotated[str, Depends(get_current_user)],
 ):
@@ -55,9 +154,16 @@ def read_weights(
     query = select(Weight)
     if user_id:
         query = query.where(Weight.user_id == user_id)
-    return session.exec(
-        query.order_by(desc(Weight.date)).offset(offset).limit(limit)
-    ).all()
+    if cursor:
+        query = query.where(before_date_and_id(Weight.date, Weight.id, cursor))
+    rows = paginate(
+        session,
+        query.order_by(desc(Weight.date), desc(Weight.id)).offset(offset),
+        limit=limit,
+        response=response,
+        cursor_for=lambda weight: encode_cursor(weight.date, weight.id),
+    )
+    return fast_response(WeightRead, rows, response)
 
 
 @router.get(
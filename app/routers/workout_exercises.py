@@ -1,6 +1,6 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlmodel import Session, select
 
 from app.db.models import (
@@ -10,8 +10,11 @@ from app.db.models import (
     Workout,
     Exercise,
 )
+from app.db.loaders import loader_options
 from app.dependencies import get_session
 from app.auth import get_current_user, require_permission
+from app.pagination import after_id, encode_cursor, paginate
+from app.serialization import fast_response
 
 
 router = APIRouter(
@@ -62,8 +65,10 @@ def create_workout_exercise(
 def read_workout_exercises(
     *,
     session: Session = Depends(get_session),
+    response: Response,
     offset: int = 0,
     limit: int = Query(default=100, lte=100),
+    cursor: str | None = None,
     exercise_id: int | None = None,
     workout_id: int | None = None,
     user_id: int | None = None,
@@ -76,7 +81,7 @@ def read_workout_exercises(
             status_code=400,
             detail="User does not have permission to read workout exercises of another user",
         )
-    query = select(WorkoutExercise)
+    query = select(WorkoutExercise).options(*loader_options(WorkoutExerciseRead))
     if exercise_id:
         query = query.where(WorkoutExercise.exercise_id == exercise_id)
     if workout_id:
@@ -85,9 +90,16 @@ def read_workout_exercises(
         query = query.join(Workout, WorkoutExercise.workout_id == Workout.id).where(
             Workout.user_id == user_id
         )
-    return session.exec(
-        query.order_by(WorkoutExercise.id).offset(offset).limit(limit)
-    ).all()
+    if cursor:
+        query = query.where(after_id(WorkoutExercise.id, cursor))
+    rows = paginate(
+        session,
+        query.order_by(WorkoutExercise.id).offset(offset),
+        limit=limit,
+        response=response,
+        cursor_for=lambda workout_exercise: encode_cursor(workout_exercise.id),
+    )
+    return fast_response(WorkoutExerciseRead, rows, response)
 
 
 @router.get(
@@ -101,7 +113,11 @@ def read_workout_exercise(
     workout_exercise_id: int,
     current_user: Annotated[str, Depends(get_current_user)],
 ):
-    if workout_exercise := session.get(WorkoutExercise, workout_exercise_id):
+    if workout_exercise := session.get(
+        WorkoutExercise,
+        workout_exercise_id,
+        options=loader_options(WorkoutExerciseRead),
+    ):
         if workout_exercise.workout.user_id != current_user.id and not current_user.has(
             "read_all_workout_exercises"
         ):
@@ -1,6 +1,6 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlmodel import Session, select
 
 from app.db.models import (
@@ -8,12 +8,17 @@ from app.db.models import (
     WorkoutRoutineCreate,
     WorkoutRoutineRead,
     WorkoutRoutinesRead,
-    Exercise,
     PlannedSet,
     RoutineExercise,
 )
+from app.db.bulk import insert_exercise_links, insert_rows
+from app.db.catalog import catalog_cache
+from app.db.loaders import loader_options
+from app.db.deletes import delete_workout_routines
 from app.dependencies import get_session
 from app.auth import get_current_user, require_permission
+from app.etag import etag_response
+from app.serialization import fast_response
 
 
 router = APIRouter(
@@ -59,34 +64,44 @@ def create_workout_routine(
             f"WorkoutRoutine named {workout_routine.name.lower()} \
             already exists for user {workout_routine.user_id}!"
         )
+    if missing_ids := catalog_cache.missing_exercise_ids(
+        session, [exercise.id for exercise in workout_routine.exercises]
+    ):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Exercise with id {missing_ids[0]} not found",
+        )
     workout_routine_db = WorkoutRoutine(
         name=workout_routine.name.lower(), user_id=workout_routine.user_id
     )
     session.add(workout_routine_db)
+    session.flush()
+    routine_exercise_ids = insert_exercise_links(
+        session,
+        RoutineExercise,
+        "routine_id",
+        workout_routine_db.id,
+        [exercise.id for exercise in workout_routine.exercises],
+    )
+    insert_rows(
+        session,
+        PlannedSet,
+        [
+            {
+                "reps": planned_set.reps,
+                "routine_exercise_id": routine_exercise_ids[exercise.id],
+            }
+            for exercise in workout_routine.exercises
+            for planned_set in exercise.planned_sets
+        ],
+    )
     session.commit()
-    session.refresh(workout_routine_db)
-    for exercise in workout_routine.exercises:
-        if not (exercise_db := session.get(Exercise, exercise.id)):
-            raise HTTPException(
-                status_code=404,
-                detail=f"Exercise with id {exercise.id} not found",
-            )
-        routine_exercise_db = RoutineExercise(
-            workout_routine=workout_routine_db, exercise=exercise_db
-        )
-        session.add(routine_exercise_db)
-        session.commit()
-        session.refresh(routine_exercise_db)
-        for planned_set in exercise.planned_sets:
-            set_db = PlannedSet(
-                reps=planned_set.reps, routine_exercise=routine_exercise_db
-            )
-            session.add(set_db)
-    session.add(workout_routine_db)
-    session.commit()
-    session.refresh(workout_routine_db)
-
-    return workout_routine_db
+    return session.get(
+        WorkoutRoutine,
+        workout_routine_db.id,
+        options=loader_options(WorkoutRoutineRead),
+        populate_existing=True,
+    )
 
 
 @router.get("/", response_model=list[WorkoutRoutinesRead])
@@ -104,12 +119,13 @@ def read_workout_routines(
             status_code=400,
             detail="User does not have permission to read workout routines of another user",
         )
-    query = select(WorkoutRoutine)
+    query = select(WorkoutRoutine).options(*loader_options(WorkoutRoutinesRead))
     if user_id:
         query = query.where(WorkoutRoutine.user_id == user_id)
-    return session.exec(
+    workout_routines = session.exec(
         query.order_by(WorkoutRoutine.id).offset(offset).limit(limit)
     ).all()
+    return fast_response(WorkoutRoutinesRead, workout_routines)
 
 
 @router.get(
@@ -120,10 +136,15 @@ def read_workout_routines(
 def read_workout_routine(
     *,
     session: Session = Depends(get_session),
+    request: Request,
     workoutroutine_id: int,
     current_user: Annotated[str, Depends(get_current_user)],
 ):
-    if workout_routine := session.get(WorkoutRoutine, workoutroutine_id):
+    if workout_routine := session.get(
+        WorkoutRoutine,
+        workoutroutine_id,
+        options=loader_options(WorkoutRoutineRead),
+    ):
         if workout_routine.user_id != current_user.id and not current_user.has(
             "read_all_workout_routines"
         ):
@@ -131,12 +152,14 @@ def read_workout_routine(
                 status_code=400,
                 detail="User does not have permission to read workout routines of another user",
             )
-        return workout_routine
+        return etag_response(
+            request, fast_response(WorkoutRoutineRead, workout_routine)
+        )
     else:
         raise HTTPException(status_code=404, detail="WorkoutRoutine not found")
 
 
-@router.delete("/{workout_routine_id}")
+@router.delete("/{workoutroutine_id}")
 @require_permission("delete_all_workouts", "delete_own_workout")
 def delete_workout_routine(
     *,
@@ -154,15 +177,7 @@ def delete_workout_routine(
             status_code=400,
             detail="User does not have permission to delete workout routines of another user",
         )
-    for routine_exercise in workout_routine.routine_exercises:
-        for planned_set in routine_exercise.planned_sets:
-            session.delete(planned_set)
-        session.delete(routine_exercise)
-    for workout in workout_routine.workouts:
-        for workout_exercise in workout.workout_exercises:
-            session.delete(workout_exercise)
-        session.delete(workout)
-    session.delete(workout_routine)
+    delete_workout_routines(session, [workoutroutine_id])
     session.commit()
     return {"ok": True}
 
@@ -1,19 +1,25 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlmodel import Session, select, desc
 
 from app.db.models import (
     Workout,
     WorkoutCreate,
     WorkoutRead,
-    Exercise,
     Set,
     WorkoutRoutine,
     WorkoutExercise,
 )
+from app.db.bulk import insert_exercise_links, insert_rows
+from app.db.catalog import catalog_cache
+from app.db.loaders import loader_options
+from app.db.deletes import delete_workouts
 from app.dependencies import get_session
 from app.auth import get_current_user, require_permission
+from app.pagination import before_date_and_id, encode_cursor, paginate
+from app.serialization import fast_response
+from app.streaming import list_stream_format, stream_list
 
 
 router = APIRouter(
@@ -50,41 +56,55 @@ def create_workout(
             status_code=400,
             detail="User does not have permission to crate workouts for another user",
         )
-    workout_db = Workout(
-        workoutroutine_id=workout.workoutroutine_id,
-        date=workout.date,
-        user_id=workout.user_id,
-    )
     if not (session.get(WorkoutRoutine, workout.workoutroutine_id)):
         raise HTTPException(
             status_code=404,
             detail=f"Workout Routine with id {workout.workoutroutine_id}\
                 not found",
         )
+    if missing_ids := catalog_cache.missing_exercise_ids(
+        session, [exercise.id for exercise in workout.exercises]
+    ):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Exercise with id {missing_ids[0]} not found",
+        )
+    # Everything is validated up front and written in one transaction, so a
+    # bad request never leaves a partial workout behind
+    workout_db = Workout(
+        workoutroutine_id=workout.workoutroutine_id,
+        date=workout.date,
+        user_id=workout.user_id,
+    )
     session.add(workout_db)
+    session.flush()
+    workout_exercise_ids = insert_exercise_links(
+        session,
+        WorkoutExercise,
+        "workout_id",
+        workout_db.id,
+        [exercise.id for exercise in workout.exercises],
+    )
+    insert_rows(
+        session,
+        Set,
+        [
+            {
+                "reps": workout_set.reps,
+                "weight": workout_set.weight,
+                "workout_exercise_id": workout_exercise_ids[exercise.id],
+            }
+            for exercise in workout.exercises
+            for workout_set in exercise.sets
+        ],
+    )
     session.commit()
-    session.refresh(workout_db)
-    for exercise in workout.exercises:
-        if not (exercise_db := session.get(Exercise, exercise.id)):
-            raise HTTPException(
-                status_code=404,
-                detail=f"Exercise with id {exercise.id} not found",
-            )
-        workout_exercise_db = WorkoutExercise(workout=workout_db, exercise=exercise_db)
-        session.add(workout_exercise_db)
-        session.commit()
-        session.refresh(workout_exercise_db)
-        for workout_set in exercise.sets:
-            set_db = Set(
-                reps=workout_set.reps,
-                weight=workout_set.weight,
-                workout_exercise=workout_exercise_db,
-            )
-            session.add(set_db)
-    session.add(workout_db)
-    session.commit()
-    session.refresh(workout_db)
-    return workout_db
+    return session.get(
+        Workout,
+        workout_db.id,
+        options=loader_options(WorkoutRead),
+        populate_existing=True,
+    )
 
 
 @router.get("/", response_model=list[WorkoutRead])
@@ -92,10 +112,13 @@ def create_workout(
 def read_workouts(
     *,
     session: Session = Depends(get_session),
+    response: Response,
     offset: int = 0,
-    limit: int = Query(default=100, lte=100),
+    limit: int | None = Query(default=None, lte=100),
+    cursor: str | None = None,
     workoutroutine_id: int | None = None,
     user_id: int | None = None,
+    stream_format: Annotated[str | None, Depends(list_stream_format)],
     current_user: Annotated[str, Depends(get_current_user)],
 ):
     if user_id != current_user.id and not current_user.has("read_all_workouts"):
@@ -108,9 +131,20 @@ def read_workouts(
         query = query.where(Workout.workoutroutine_id == workoutroutine_id)
     if user_id:
         query = query.where(Workout.user_id == user_id)
-    return session.exec(
-        query.order_by(desc(Workout.date)).offset(offset).limit(limit)
-    ).all()
+    if cursor:
+        query = query.where(before_date_and_id(Workout.date, Workout.id, cursor))
+    query = query.order_by(desc(Workout.date), desc(Workout.id)).offset(offset)
+    if stream_format:
+        return stream_list(session, query.limit(limit), WorkoutRead, stream_format)
+    query = query.options(*loader_options(WorkoutRead))
+    workouts = paginate(
+        session,
+        query,
+        limit=limit or 100,
+        response=response,
+        cursor_for=lambda workout: encode_cursor(workout.date, workout.id),
+    )
+    return fast_response(WorkoutRead, workouts, response)
 
 
 @router.get(
@@ -129,10 +163,14 @@ def read_latest_workout(
             status_code=400,
             detail="User does not have permission to read workouts of another user",
         )
-    query = select(Workout)
+    query = select(Workout).options(*loader_options(WorkoutRead))
     if user_id:
         query = query.where(Workout.user_id == user_id)
-    return session.exec(query.order_by(desc(Workout.date))).first()
+    query = query.order_by(desc(Workout.date), desc(Workout.id)).limit(1)
+    if workout := session.exec(query).first():
+        return fast_response(WorkoutRead, workout)
+    else:
+        raise HTTPException(status_code=404, detail="Workout not found")
 
 
 @router.get(
@@ -146,7 +184,7 @@ def read_workout(
     workout_id: int,
     current_user: Annotated[str, Depends(get_current_user)],
 ):
-    if workout := session.get(Workout, workout_id):
+    if workout := session.get(Workout, workout_id, options=loader_options(WorkoutRead)):
         if workout.user_id != current_user.id and not current_user.has(
             "read_all_workouts"
         ):
@@ -154,7 +192,7 @@ def read_workout(
                 status_code=400,
                 detail="User does not have permission to view workouts of another user",
             )
-        return workout
+        return fast_response(WorkoutRead, workout)
     else:
         raise HTTPException(status_code=404, detail="Workout not found")
 
@@ -177,11 +215,7 @@ def delete_workout(
             status_code=400,
             detail="User does not have permission to delete workouts of another user",
         )
-    for workout_exercise in workout.workout_exercises:
-        for set_db in workout_exercise.sets:
-            session.delete(set_db)
-        session.delete(workout_exercise)
-    session.delete(workout)
+    delete_workouts(session, [workout_id])
     session.commit()
     return {"ok": True}
 
@@ -0,0 +1,104 @@
+"""Encoders that turn batches of records into chunks of a streamed body.
+
+Batches are encoded one at a time so a ``StreamingResponse`` can start
+sending as soon as the first batch is fetched.
+"""
+
+import csv
+import io
+from typing import Literal
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session, select
+
+from app.db.loaders import loader_options
+from app.serialization import dumper, dumps
+
+JSON_MEDIA_TYPE = "application/json"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+STREAM_BATCH_SIZE = 500
+
+
+def iter_ndjson(batches):
+    for batch in batches:
+        yield b"".join(dumps(record) + b"\n" for record in batch)
+
+
+def iter_json_array(batches):
+    separator = b"["
+    for batch in batches:
+        if batch:
+            yield separator + b",".join(dumps(record) for record in batch)
+            separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+
+def iter_csv(batches, fieldnames: list[str]):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+    writer.writeheader()
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def list_stream_format(
+    request: Request, stream: Literal["json", "ndjson"] | None = None
+) -> str | None:
+    """Dependency for list endpoints that can stream their rows.
+
+    Streaming is opt-in with ``?stream=json`` or ``?stream=ndjson``, or by
+    sending ``Accept: application/x-ndjson``. Returns None otherwise.
+    """
+    if stream:
+        return stream
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return "ndjson"
+    return None
+
+
+def stream_rows(session: Session, query, response_model):
+    """Yield batches of ``query`` rows encoded as ``response_model``.
+
+    Only the ids come through the server-side cursor, ``STREAM_BATCH_SIZE``
+    at a time. Each batch of rows is then loaded with the response model's
+    eager loads by a second session, so no statement runs on the cursor's
+    connection while it still has results pending (which pyodbc refuses
+    without MARS). ``query`` must not carry loader options of its own. The
+    identity maps only hold weak references, so encoded batches are freed as
+    the stream moves on.
+    """
+    model = query.column_descriptions[0]["entity"]
+    options = loader_options(response_model)
+    dump = dumper(response_model)
+    bind = session.get_bind()
+    with Session(bind) as id_session, Session(bind) as load_session:
+        result = id_session.exec(
+            query.with_only_columns(model.id).execution_options(
+                yield_per=STREAM_BATCH_SIZE
+            )
+        )
+        for ids in result.partitions():
+            rows = {
+                row.id: row
+                for row in load_session.exec(
+                    select(model).where(model.id.in_(ids)).options(*options)
+                )
+            }
+            # Rows deleted since the ids were read are skipped
+            yield [dump(rows[row_id]) for row_id in ids if row_id in rows]
+
+
+def stream_list(
+    session: Session, query, response_model, stream_format: str
+) -> StreamingResponse:
+    batches = stream_rows(session, query, response_model)
+    if stream_format == "ndjson":
+        return StreamingResponse(iter_ndjson(batches), media_type=NDJSON_MEDIA_TYPE)
+    return StreamingResponse(iter_json_array(batches), media_type=JSON_MEDIA_TYPE)
@@ -3,18 +3,37 @@ import pytest
 from sqlmodel import create_engine, Session, SQLModel
 from sqlmodel.pool import StaticPool
 
-from app.main import app
+from app.auth import CurrentUser, get_current_user
+from app.main import create_app
 from app.dependencies import get_session
 
 
-@pytest.fixture(name="session")
-def session_fixture():
+def create_test_engine():
     engine = create_engine(
         "sqlite://",
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
     )
     SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def authenticate(client: TestClient, *permissions: str, user_id: int = 1):
+    """Serve ``client``'s requests as ``user_id`` holding ``permissions``."""
+    client.app.dependency_overrides[get_current_user] = lambda: CurrentUser(
+        id=user_id,
+        email_address="user@email.com",
+        permissions=frozenset(permissions),
+    )
+
+
+@pytest.fixture(name="engine")
+def engine_fixture():
+    return create_test_engine()
+
+
+@pytest.fixture(name="session")
+def session_fixture(engine):
     with Session(engine) as session:
         yield session
 
@@ -24,7 +43,7 @@ def client_fixture(session: Session):
     def get_session_override():
         return session
 
+    app = create_app()
     app.dependency_overrides[get_session] = get_session_override
 
     yield TestClient(app)
-    app.dependency_overrides.clear()
@@ -0,0 +1,108 @@
+import asyncio
+
+from fastapi import HTTPException
+import pytest
+from sqlmodel import Session
+
+from app import auth
+from app.db.models import Permission, Role, RolePermissions, User
+from app.routers import roles
+
+from .fixtures import engine_fixture, session_fixture  # noqa: F401
+
+
+@pytest.fixture(autouse=True)
+def seed(session: Session, monkeypatch):
+    monkeypatch.setattr(auth, "SECRET_KEY", "secret")
+    role = Role(name="user")
+    session.add(RolePermissions(role=role, permission=Permission(name="read_exercise")))
+    session.add(
+        User(
+            name="user",
+            email_address="user@email.com",
+            password_hash=auth.get_password_hash("password"),
+            role=role,
+        )
+    )
+    session.commit()
+
+
+def get_current_user(token: str, session: Session):
+    return asyncio.run(auth.get_current_user(token=token, session=session))
+
+
+def test_token_carries_user_and_role(session: Session):
+    user = auth.get_user("user@email.com", session=session)
+    token = auth.create_user_access_token(user)
+
+    current_user = get_current_user(token, session=session)
+    assert current_user.id == user.id
+    assert current_user.role_id == user.role_id
+    assert current_user.has("read_exercise")
+    assert not current_user.has("delete_exercise")
+
+
+def test_legacy_token_falls_back_to_lookup(session: Session):
+    token = auth.create_access_token(data={"sub": "user@email.com"})
+
+    current_user = get_current_user(token, session=session)
+    assert current_user.id == 1
+    assert current_user.has("read_exercise")
+
+
+def test_revoked_token_is_rejected(session: Session):
+    user = auth.get_user("user@email.com", session=session)
+    token = auth.create_user_access_token(user)
+    auth.token_versions.revoke(user.id)
+
+    with pytest.raises(HTTPException) as exc_info:
+        get_current_user(token, session=session)
+    assert exc_info.value.status_code == 401
+
+    token = auth.create_user_access_token(user)
+    assert get_current_user(token, session=session).id == user.id
+
+
+def test_newer_token_is_accepted(session: Session):
+    # Issued by a worker that has seen a logout this one hasn't
+    user = auth.get_user("user@email.com", session=session)
+    version = auth.token_versions.current(user.id) + 1
+    token = auth.create_access_token(
+        data={
+            "sub": user.email_address,
+            "uid": user.id,
+            "rid": user.role_id,
+            "ver": version,
+        }
+    )
+
+    assert get_current_user(token, session=session).id == user.id
+
+
+def test_deleting_role_revokes_its_users_tokens(session: Session):
+    user = auth.get_user("user@email.com", session=session)
+    token = auth.create_user_access_token(user)
+    admin = auth.CurrentUser(
+        id=user.id, email_address=user.email_address, permissions={"delete_role"}
+    )
+
+    roles.delete_role(session=session, role_id=user.role_id, current_user=admin)
+
+    with pytest.raises(HTTPException) as exc_info:
+        get_current_user(token, session=session)
+    assert exc_info.value.status_code == 401
+
+
+@pytest.mark.parametrize(
+    "email_address,password,authenticated",
+    [
+        ("user@email.com", "password", True),
+        ("user@email.com", "wrong", False),
+        ("unknown@email.com", "password", False),
+    ],
+)
+def test_authenticate_user(
+    session: Session, email_address: str, password: str, authenticated: bool
+):
+    user = asyncio.run(auth.authenticate_user(email_address, password, session=session))
+    assert bool(user) is authenticated
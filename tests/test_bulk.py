@@ -0,0 +1,119 @@
+import datetime
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlmodel import Session, select
+
+from app.db.bulk import (
+    ensure_exercise_links,
+    find_missing_ids,
+    insert_exercise_links,
+    insert_rows,
+)
+from app.db.models import (
+    Exercise,
+    Set,
+    User,
+    Workout,
+    WorkoutExercise,
+    WorkoutRoutine,
+)
+from app.routers.sets import SET_BATCH_MAX
+
+from .fixtures import (  # noqa: F401
+    authenticate,
+    client_fixture,
+    engine_fixture,
+    session_fixture,
+)
+
+
+@pytest.fixture(autouse=True)
+def seed(session: Session):
+    session.add(Exercise(name="bench press"))
+    session.add(Exercise(name="squat"))
+    session.commit()
+
+
+def test_find_missing_ids(session: Session):
+    assert find_missing_ids(session, Exercise, []) == []
+    assert find_missing_ids(session, Exercise, [1, 2]) == []
+    assert find_missing_ids(session, Exercise, [5, 1, 3, 3]) == [3, 5]
+
+
+def test_insert_exercise_links(session: Session):
+    user = User(name="user", email_address="user@email.com", password_hash="")
+    workout = Workout(
+        date=datetime.date(2020, 1, 1),
+        user=user,
+        workoutroutine=WorkoutRoutine(name="test routine", user=user),
+    )
+    session.add(workout)
+    session.flush()
+
+    workout_exercise_ids = insert_exercise_links(
+        session, WorkoutExercise, "workout_id", workout.id, [2, 1, 2]
+    )
+    insert_rows(
+        session,
+        Set,
+        [
+            {"reps": 5, "weight": 60, "workout_exercise_id": workout_exercise_ids[2]},
+            {"reps": 5, "weight": 80, "workout_exercise_id": workout_exercise_ids[1]},
+        ],
+    )
+    insert_rows(session, Set, [])
+    session.commit()
+
+    assert set(workout_exercise_ids) == {1, 2}
+    sets = session.exec(select(Set).order_by(Set.id)).all()
+    assert [workout_set.workout_exercise.exercise_id for workout_set in sets] == [
+        2,
+        1,
+    ]
+
+
+def test_ensure_exercise_links_reuses_existing(session: Session):
+    user = User(name="user", email_address="user@email.com", password_hash="")
+    routine = WorkoutRoutine(name="test routine", user=user)
+    workouts = [
+        Workout(date=datetime.date(2020, 1, day), user=user, workoutroutine=routine)
+        for day in (1, 2)
+    ]
+    session.add_all(workouts)
+    session.flush()
+    existing = WorkoutExercise(workout_id=workouts[0].id, exercise_id=1)
+    session.add(existing)
+    session.flush()
+
+    links = ensure_exercise_links(
+        session,
+        WorkoutExercise,
+        "workout_id",
+        [(workouts[0].id, 1), (workouts[0].id, 2), (workouts[1].id, 1)],
+    )
+
+    assert links[(workouts[0].id, 1)] == existing.id
+    assert len(set(links.values())) == 3
+    assert len(session.exec(select(WorkoutExercise)).all()) == 3
+    assert ensure_exercise_links(session, WorkoutExercise, "workout_id", []) == {}
+
+
+@pytest.mark.parametrize(
+    "sets",
+    [
+        [
+            {"reps": 5, "exercise_id": None, "workout_id": 1},
+            {"reps": 5, "exercise_id": 9, "workout_id": 1},
+        ],
+        [{"reps": 5, "exercise_id": 1, "workout_id": None}],
+        [{"reps": 5, "workout_id": 1}],
+        [{"reps": 5, "exercise_id": 1, "workout_id": 1}] * (SET_BATCH_MAX + 1),
+    ],
+)
+def test_create_sets_rejects_invalid_batch(client: TestClient, sets: list[dict]):
+    authenticate(client, "create_all_sets")
+
+    response = client.post("/sets/batch", json=sets)
+
+    assert response.status_code == 422
@@ -0,0 +1,439 @@
+import asyncio
+import logging
+import pickle
+import socket
+import socketserver
+from threading import Lock, Thread, current_thread, main_thread
+import time
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlmodel import Session
+
+from app import auth, cache as cache_module
+from app.auth import TokenVersions
+from app.cache import (
+    MISSING,
+    Cache,
+    CacheError,
+    MemoryBackend,
+    RedisBackend,
+    _encode_command,
+    _read_reply,
+)
+from app.db.catalog import CatalogCache
+from app.db.models import User
+from app.db.permissions import RolePermissionCache
+from app.metrics import CACHE_REQUESTS
+
+from .fixtures import client_fixture, engine_fixture, session_fixture  # noqa: F401
+
+
+def encode_reply(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(map(encode_reply, value))
+    data = value if isinstance(value, bytes) else value.encode()
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+class StandInHandler(socketserver.StreamRequestHandler):
+    """Enough of the Redis protocol for ``RedisBackend``."""
+
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                command, *args = _read_reply(self.rfile)
+            except (CacheError, ConnectionError, OSError):
+                break
+            command = command.decode().upper()
+            if command == "SUBSCRIBE":
+                for channel in args:
+                    with server.lock:
+                        server.channels.setdefault(channel, []).append(self)
+                    self.write(["subscribe", channel, 1])
+            elif command == "PING":
+                # Subscribed connections answer with an array
+                if server.answer_pings:
+                    self.write(["pong", ""])
+            else:
+                self.write(server.execute(command, args))
+        with server.lock:
+            for subscribers in server.channels.values():
+                if self in subscribers:
+                    subscribers.remove(self)
+
+    def write(self, reply):
+        if isinstance(reply, CacheError):
+            data = b"-%s\r\n" % str(reply).encode()
+        elif reply == "OK":
+            data = b"+OK\r\n"
+        else:
+            data = encode_reply(reply)
+        with self.server.lock:
+            self.wfile.write(data)
+
+
+class StandInServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.data: dict[bytes, tuple[float | None, bytes]] = {}
+        self.channels: dict[bytes, list[StandInHandler]] = {}
+        self.policy = b"volatile-lru"
+        self.answer_pings = True
+        self.lock = Lock()
+
+    @property
+    def url(self) -> str:
+        return "redis://127.0.0.1:%d/0" % self.server_address[1]
+
+    def lookup(self, key: bytes) -> bytes | None:
+        expiry, value = self.data.get(key, (None, None))
+        if expiry is not None and expiry <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, command: str, args: list[bytes]):
+        with self.lock:
+            if command == "GET":
+                return self.lookup(args[0])
+            if command == "MGET":
+                return [self.lookup(key) for key in args]
+            if command == "CONFIG":
+                return [b"maxmemory-policy", self.policy]
+            if command == "SET":
+                expiry = None
+                if len(args) == 4 and args[2].upper() == b"PX":
+                    expiry = time.monotonic() + int(args[3]) / 1000
+                self.data[args[0]] = (expiry, args[1])
+                return "OK"
+            if command == "DEL":
+                return int(self.data.pop(args[0], None) is not None)
+            if command == "INCR":
+                value = int(self.lookup(args[0]) or 0) + 1
+                self.data[args[0]] = (None, str(value).encode())
+                return value
+            if command == "PUBLISH":
+                subscribers = list(self.channels.get(args[0], ()))
+            else:
+                return CacheError(f"ERR unknown command '{command}'")
+        message = encode_reply([b"message", args[0], args[1]])
+        for subscriber in subscribers:
+            with self.lock:
+                subscriber.wfile.write(message)
+        return len(subscribers)
+
+    def wait_for_subscribers(self, channel: str, count: int):
+        channel = channel.encode()
+        deadline = time.monotonic() + 5
+        while len(self.channels.get(channel, ())) < count:
+            assert time.monotonic() < deadline, "subscription never arrived"
+            time.sleep(0.01)
+
+
+@pytest.fixture(name="server")
+def server_fixture():
+    server = StandInServer()
+    Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def unreachable_url() -> str:
+    with socket.socket() as unused:
+        unused.bind(("127.0.0.1", 0))
+        port = unused.getsockname()[1]
+    return f"redis://127.0.0.1:{port}"
+
+
+@pytest.fixture(autouse=True)
+def seed(session: Session, monkeypatch):
+    monkeypatch.setattr(auth, "SECRET_KEY", "secret")
+    monkeypatch.setattr(cache_module, "CACHE_SIGNING_KEY", "signing key")
+    session.add(User(name="user", email_address="user@email.com", password_hash=""))
+    session.commit()
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline, "condition never became true"
+        time.sleep(0.01)
+
+
+def test_encode_command():
+    assert _encode_command("SET", "key", b"\x00", 5) == (
+        b"*4\r\n$3\r\nSET\r\n$3\r\nkey\r\n$1\r\n\x00\r\n$1\r\n5\r\n"
+    )
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(maxsize=2)
+    backend.set("a", 1)
+    backend.set("b", 2)
+    assert backend.get("a") == 1
+    backend.set("c", 3)
+
+    assert backend.get("b") is MISSING
+    assert backend.get("a") == 1
+    assert backend.get("c") == 3
+
+
+def test_memory_backend_expires_entries(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now)
+    backend = MemoryBackend()
+    backend.set("key", "value", ttl=10)
+    assert backend.get("key") == "value"
+
+    now += 10
+    assert backend.get("key") is MISSING
+
+
+def test_memory_backend_keeps_counters():
+    backend = MemoryBackend(maxsize=1)
+    assert backend.counter("count") == 0
+    assert backend.incr("count") == 1
+    backend.set("a", 1)
+    backend.set("b", 2)
+    assert backend.counter("count") == 1
+
+
+def test_cache_invalidate():
+    cache = Cache("test", backend=MemoryBackend())
+    cache.set(1, "one")
+    cache.set(2, "two")
+    generation = cache.generation
+
+    cache.invalidate(1)
+    assert cache.generation == generation + 1
+    assert cache.get(1) is MISSING
+    assert cache.get(2) == "two"
+
+    # Computed before the invalidation, stored after it
+    cache.set(1, "stale", generation)
+    assert cache.get(1) is MISSING
+    cache.set(1, "fresh")
+    assert cache.get(1) == "fresh"
+
+    cache.invalidate()
+    assert cache.get(2) is MISSING
+    cache.set(2, "stale", generation + 1)
+    assert cache.get(2) is MISSING
+
+
+def test_cache_records_hits_and_misses():
+    cache = Cache("metrics_test", backend=MemoryBackend())
+    cache.set("key", "value")
+    cache.get("key")
+    cache.get("key")
+    cache.get("other")
+
+    assert CACHE_REQUESTS._values[("metrics_test", "hit")] == 2
+    assert CACHE_REQUESTS._values[("metrics_test", "miss")] == 1
+
+
+def test_redis_backend(server: StandInServer):
+    backend = RedisBackend(server.url, prefix="test:")
+    backend.set("key", {"nested": [1, 2]})
+    assert backend.get("key") == {"nested": [1, 2]}
+    assert server.data[b"test:key"][0] is None
+
+    backend.set("short", "value", ttl=0.001)
+    time.sleep(0.01)
+    assert backend.get("short") is MISSING
+
+    backend.delete("key")
+    assert backend.get("key") is MISSING
+
+    assert backend.counter("count") == 0
+    assert backend.incr("count") == 1
+    assert backend.incr("count") == 2
+    assert RedisBackend(server.url, prefix="test:").counter("count") == 2
+
+
+def test_redis_backend_signs_entries(server: StandInServer, monkeypatch):
+    backend = RedisBackend(server.url)
+    backend.set("key", "value")
+    assert backend.get("key") == "value"
+    assert RedisBackend(server.url, signing_key="other").get("key") is MISSING
+
+    expiry, data = server.data[b"app:key"]
+    server.data[b"app:key"] = (expiry, data[:32] + pickle.dumps("forged"))
+    assert backend.get("key") is MISSING
+
+    monkeypatch.setattr(cache_module, "CACHE_SIGNING_KEY", None)
+    with pytest.raises(ValueError):
+        RedisBackend(server.url)
+
+
+def test_rediss_connects_over_tls(server: StandInServer, monkeypatch):
+    monkeypatch.setattr(cache_module, "REDIS_TIMEOUT", 0.1)
+    # The stand-in only speaks plain text, so the handshake fails
+    backend = RedisBackend(server.url.replace("redis://", "rediss://"))
+
+    with pytest.raises(CacheError):
+        backend.incr("count")
+    assert server.data == {}
+
+
+def test_redis_backend_failures_are_misses():
+    backend = RedisBackend(unreachable_url())
+
+    backend.set("key", "value")
+    assert backend.get("key") is MISSING
+    with pytest.raises(CacheError):
+        backend.incr("count")
+    with pytest.raises(CacheError):
+        backend.counter("count")
+
+
+@pytest.mark.parametrize(
+    "policy,logged", [(b"allkeys-lru", True), (b"volatile-lru", False)]
+)
+def test_redis_backend_checks_eviction_policy(
+    server: StandInServer, caplog, policy: bytes, logged: bool
+):
+    server.policy = policy
+    with caplog.at_level(logging.ERROR, logger="app.cache"):
+        RedisBackend(server.url).get("key")
+
+    assert ("maxmemory-policy" in caplog.text) is logged
+
+
+def test_entries_expire_and_counters_do_not(server: StandInServer):
+    cache = Cache("roles", ttl=60, backend=RedisBackend(server.url))
+    cache.set(1, "read")
+    cache.invalidate(2)
+
+    assert server.data[b"app:roles:1"][0] is not None
+    assert server.data[b"app:roles:generation"][0] is None
+    assert server.data[b"app:roles:invalidated:2"][0] is None
+
+
+def test_stale_set_from_another_worker_is_ignored(server: StandInServer):
+    first = Cache("roles", backend=RedisBackend(server.url))
+    second = Cache("roles", backend=RedisBackend(server.url))
+    generation = first.generation
+
+    second.invalidate("admin")
+    # The first worker finishes a load it started before the invalidation,
+    # whether or not the broadcast has reached it yet
+    first.set("admin", "stale", generation)
+
+    assert first.get("admin") is MISSING
+    assert second.get("admin") is MISSING
+
+
+def test_invalidation_is_broadcast(server: StandInServer):
+    # Two workers, each with its own connection to the server
+    first = Cache("roles", backend=RedisBackend(server.url))
+    second = Cache("roles", backend=RedisBackend(server.url))
+    first.set("admin", "read")
+    assert second.get("admin") == "read"
+    generation = second.generation
+    server.wait_for_subscribers("app:roles", 2)
+
+    first.invalidate()
+
+    wait_until(lambda: second.generation == generation + 1)
+    assert second.get("admin") is MISSING
+
+
+def test_unanswered_ping_reopens_subscription(server: StandInServer, monkeypatch):
+    monkeypatch.setattr(cache_module, "SUBSCRIBER_PING_INTERVAL", 0.05)
+    monkeypatch.setattr(cache_module, "RESUBSCRIBE_DELAY", 0.01)
+    cache = Cache("roles", backend=RedisBackend(server.url))
+    generation = cache.generation
+    server.wait_for_subscribers("app:roles", 1)
+
+    # The connection stays open but nothing comes back, like one whose peer
+    # vanished, and an invalidation is made without a broadcast
+    server.answer_pings = False
+    server.data[b"app:roles:generation"] = (None, b"%d" % (generation + 1))
+
+    # Resubscribing reloads the generation
+    wait_until(lambda: cache.generation == generation + 1)
+
+
+def test_role_permissions_expire_without_shared_backend(
+    server: StandInServer, monkeypatch
+):
+    now = time.monotonic()
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now)
+    local = RolePermissionCache(Cache("roles", backend=MemoryBackend()), ttl=30)
+    shared = RolePermissionCache(
+        Cache("roles", backend=RedisBackend(server.url)), ttl=30
+    )
+    for roles in (local, shared):
+        roles.set(1, frozenset({"read_role"}), roles.generation)
+    versions = local.version, shared.version
+
+    now += 30
+    assert local.get(1) is None
+    assert local.version != versions[0]
+    assert shared.get(1) == frozenset({"read_role"})
+    assert shared.version == versions[1]
+
+
+def test_consumers_share_state(server: StandInServer):
+    workers = [RedisBackend(server.url) for _ in range(2)]
+    roles = [RolePermissionCache(Cache("roles", backend=b)) for b in workers]
+    tokens = [TokenVersions(b) for b in workers]
+    catalogs = [CatalogCache(Cache("catalog", backend=b)) for b in workers]
+
+    roles[0].set(1, frozenset({"read_role"}), roles[0].generation)
+    assert roles[1].get(1) == frozenset({"read_role"})
+    roles[1].invalidate(1)
+    assert roles[0].get(1) is None
+
+    tokens[0].revoke(7)
+    assert tokens[1].current(7) == 1
+
+    version = max(catalog.version for catalog in catalogs)
+    server.wait_for_subscribers("app:catalog", 2)
+    catalogs[0].invalidate()
+    wait_until(lambda: catalogs[1].version == version + 1)
+
+
+def use_counter_backend(monkeypatch, backend):
+    monkeypatch.setattr(auth, "token_versions", TokenVersions(backend))
+    monkeypatch.setattr(cache_module, "get_counter_backend", lambda: backend)
+
+
+def test_auth_reads_shared_cache_off_the_loop(
+    server: StandInServer, session: Session, monkeypatch
+):
+    use_counter_backend(monkeypatch, RedisBackend(server.url))
+    token = auth.create_user_access_token(session.get(User, 1))
+    threads = []
+    cached_credentials = auth.cached_credentials
+
+    def recording(*args):
+        threads.append(current_thread())
+        return cached_credentials(*args)
+
+    monkeypatch.setattr(auth, "cached_credentials", recording)
+    asyncio.run(auth.get_current_user(token=token, session=session))
+
+    assert threads and main_thread() not in threads
+
+
+def test_auth_fails_closed_without_cache(
+    session: Session, client: TestClient, monkeypatch
+):
+    token = auth.create_user_access_token(session.get(User, 1))
+    use_counter_backend(monkeypatch, RedisBackend(unreachable_url()))
+
+    response = client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 503
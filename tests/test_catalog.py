@@ -0,0 +1,207 @@
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app.db import catalog as catalog_module
+from app.db.catalog import CatalogCache, catalog_cache, load_catalog
+from app.db.deletes import delete_exercises
+from app.db.models import Exercise, ExerciseMuscleGroup, MuscleGroup
+from app.dependencies import get_session
+
+from .fixtures import (  # noqa: F401
+    authenticate,
+    client_fixture,
+    engine_fixture,
+    session_fixture,
+)
+
+
+@pytest.fixture(autouse=True)
+def seed(engine, client: TestClient):
+    with Session(engine) as session:
+        chest = MuscleGroup(id=1, name="chest")
+        triceps = MuscleGroup(id=2, name="triceps")
+        bench = Exercise(id=1, name="bench press")
+        session.add_all(
+            [
+                ExerciseMuscleGroup(exercise=bench, muscle_group=chest),
+                ExerciseMuscleGroup(exercise=bench, muscle_group=triceps),
+                Exercise(id=2, name="squat"),
+            ]
+        )
+        session.commit()
+    # A session per request, so statements are counted like in production
+    client.app.dependency_overrides[get_session] = lambda: Session(engine)
+    authenticate(
+        client,
+        "create_exercise",
+        "read_exercise",
+        "update_exercise",
+        "delete_exercise",
+        "read_musclegroup",
+        "delete_musclegroup",
+        "create_own_sets",
+    )
+    catalog_cache.invalidate()
+
+
+def count_statements(engine) -> list:
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    return statements
+
+
+def test_cache_loads_once(engine):
+    cache = CatalogCache()
+    statements = count_statements(engine)
+    with Session(engine) as session:
+        catalog = cache.get(session)
+        assert cache.get(session) is catalog
+
+    assert len(statements) == 3
+    assert [exercise.name for exercise in catalog.exercises.values()] == [
+        "bench press",
+        "squat",
+    ]
+    assert [group.name for group in catalog.exercise_musclegroup_list(1)] == [
+        "chest",
+        "triceps",
+    ]
+    assert catalog.musclegroup_exercise_list(2)[0].name == "bench press"
+
+
+def test_invalidate_bumps_version(engine):
+    cache = CatalogCache()
+    with Session(engine) as session:
+        catalog = cache.get(session)
+        cache.invalidate()
+        reloaded = cache.get(session)
+
+    assert reloaded is not catalog
+    assert reloaded.version == catalog.version + 1
+
+
+def test_stale_load_is_not_cached(engine, monkeypatch):
+    cache = CatalogCache()
+
+    def racing_load(session, version):
+        catalog = load_catalog(session, version)
+        cache.invalidate()
+        return catalog
+
+    monkeypatch.setattr(catalog_module, "load_catalog", racing_load)
+    with Session(engine) as session:
+        cache.get(session)
+    monkeypatch.undo()
+
+    statements = count_statements(engine)
+    with Session(engine) as session:
+        cache.get(session)
+    assert len(statements) == 3
+
+
+def test_missing_exercise_ids_checks_database(engine):
+    cache = CatalogCache()
+    with Session(engine) as session:
+        version = cache.get(session).version
+        # Created by another worker, so this one's catalog doesn't know it
+        session.add(Exercise(name="deadlift"))
+        session.commit()
+
+        assert cache.missing_exercise_ids(session, [1, 3, 4]) == [4]
+        assert cache.version == version + 1
+        assert 3 in cache.get(session).exercises
+
+
+def test_catalog_expires(engine, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(catalog_module.time, "monotonic", lambda: now)
+    cache = CatalogCache(ttl=30)
+    with Session(engine) as session:
+        catalog = cache.get(session)
+        now += 29
+        assert cache.get(session) is catalog
+        now += 1
+        assert cache.get(session) is not catalog
+
+
+def test_missing_exercise_ids_checks_known_ids(engine):
+    cache = CatalogCache()
+    with Session(engine) as session:
+        cache.get(session)
+        # Deleted by another worker, whose invalidation this one never sees
+        delete_exercises(session, [2])
+        session.commit()
+
+        assert cache.missing_exercise_ids(session, [1, 2]) == [2]
+        assert 2 not in cache.get(session).exercises
+
+
+def test_reads_use_cache(client: TestClient, engine):
+    client.get("/exercises/")
+    statements = count_statements(engine)
+
+    exercises = client.get("/exercises/", params={"offset": 1}).json()
+    exercise = client.get("/exercises/1").json()
+    musclegroup = client.get("/musclegroups/2").json()
+
+    assert statements == []
+    assert exercises == [{"name": "squat", "id": 2}]
+    assert [group["name"] for group in exercise["musclegroups"]] == [
+        "chest",
+        "triceps",
+    ]
+    assert musclegroup["exercises"] == [{"name": "bench press", "id": 1}]
+    assert client.get("/exercises/9").status_code == 404
+
+
+def test_writes_invalidate(client: TestClient):
+    client.get("/exercises/")
+
+    created = client.post(
+        "/exercises/", json={"name": "Dips", "musclegroup_ids": [2, 9]}
+    ).json()
+    assert created["musclegroups"] == [{"name": "triceps", "id": 2}]
+    assert client.get("/exercises/3").json()["musclegroups"] == [
+        {"name": "triceps", "id": 2}
+    ]
+
+    client.patch("/exercises/3", json={"musclegroup_ids": [1]})
+    assert [e["name"] for e in client.get("/musclegroups/1").json()["exercises"]] == [
+        "bench press",
+        "dips",
+    ]
+
+    client.delete("/musclegroups/1")
+    assert client.get("/exercises/3").json()["musclegroups"] == []
+
+    client.delete("/exercises/3")
+    assert client.get("/exercises/3").status_code == 404
+
+
+def test_links_musclegroups_unknown_to_catalog(client: TestClient, engine):
+    client.get("/exercises/")
+    with Session(engine) as session:
+        # Created by another worker
+        session.add(MuscleGroup(id=3, name="shoulders"))
+        session.commit()
+
+    created = client.post(
+        "/exercises/", json={"name": "dips", "musclegroup_ids": [3, 9]}
+    ).json()
+
+    assert created["musclegroups"] == [{"name": "shoulders", "id": 3}]
+
+
+def test_create_set_validates_against_catalog(client: TestClient):
+    response = client.post(
+        "/sets/", json={"reps": 5, "weight": 100, "exercise_id": 9, "workout_id": 1}
+    )
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Exercise with id 9 not found"
@@ -0,0 +1,16 @@
+from app.db.database import create_db_engine
+
+
+def test_sqlite_engine_defaults(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'benchmark.db'}")
+    assert engine.echo is False
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+
+
+def test_in_memory_sqlite_engine():
+    engine = create_db_engine("sqlite://", echo=True)
+    assert engine.echo is True
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "memory"
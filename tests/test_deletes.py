@@ -0,0 +1,118 @@
+import datetime
+
+from sqlalchemy import event, func, text
+from sqlmodel import Session, select
+
+from app.db.deletes import delete_exercises, delete_roles, delete_users
+from app.db.models import (
+    Exercise,
+    ExerciseMuscleGroup,
+    MuscleGroup,
+    Permission,
+    PlannedSet,
+    Role,
+    RolePermissions,
+    RoutineExercise,
+    Set,
+    User,
+    Weight,
+    Workout,
+    WorkoutExercise,
+    WorkoutRoutine,
+)
+
+from .fixtures import create_test_engine, engine_fixture, session_fixture  # noqa: F401
+
+HISTORY_MODELS = [
+    Weight,
+    WorkoutRoutine,
+    RoutineExercise,
+    PlannedSet,
+    Workout,
+    WorkoutExercise,
+    Set,
+]
+
+
+def create_session(workouts: int) -> Session:
+    session = Session(create_test_engine())
+    exercise = Exercise(name="bench press")
+    session.add(
+        ExerciseMuscleGroup(exercise=exercise, muscle_group=MuscleGroup(name="chest"))
+    )
+    for name in ("user", "other"):
+        user = User(name=name, email_address=f"{name}@email.com", password_hash="")
+        routine = WorkoutRoutine(name="test routine", user=user)
+        routine_exercise = RoutineExercise(workout_routine=routine, exercise=exercise)
+        session.add(PlannedSet(reps=5, routine_exercise=routine_exercise))
+        for day in range(workouts):
+            date = datetime.date(2020, 1, 1) + datetime.timedelta(days=day)
+            session.add(Weight(date=date, weight=80, user=user))
+            workout = Workout(date=date, workoutroutine=routine, user=user)
+            workout_exercise = WorkoutExercise(workout=workout, exercise=exercise)
+            session.add(Set(reps=5, weight=60, workout_exercise=workout_exercise))
+    session.commit()
+    return session
+
+
+def count(session: Session, model) -> int:
+    return session.exec(select(func.count()).select_from(model)).one()
+
+
+def test_delete_users_removes_only_their_history():
+    session = create_session(workouts=3)
+    before = {model: count(session, model) for model in HISTORY_MODELS}
+
+    delete_users(session, [1])
+    session.commit()
+
+    assert session.exec(select(User.id)).all() == [2]
+    for model in HISTORY_MODELS:
+        assert count(session, model) == before[model] // 2
+    assert count(session, Exercise) == 1
+
+
+def test_delete_exercises_removes_dependants():
+    session = create_session(workouts=3)
+
+    delete_exercises(session, [1])
+    session.commit()
+
+    for model in (ExerciseMuscleGroup, RoutineExercise, PlannedSet, Set):
+        assert count(session, model) == 0
+    assert count(session, WorkoutExercise) == 0
+    assert count(session, Workout) == 6
+
+
+def test_delete_statement_count_is_constant():
+    statement_counts = []
+    for workouts in (1, 20):
+        session = create_session(workouts=workouts)
+        statements = []
+        event.listen(
+            session.get_bind(),
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: statements.append(statement),
+        )
+        delete_users(session, [1])
+        session.commit()
+        statement_counts.append(len(statements))
+    assert statement_counts[0] == statement_counts[1]
+
+
+def test_delete_roles_unassigns_users(session: Session):
+    # Enforced like on MSSQL, so a dangling role_id fails the delete
+    session.execute(text("PRAGMA foreign_keys=ON"))
+    role = Role(name="admin")
+    session.add(RolePermissions(role=role, permission=Permission(name="read")))
+    session.add(
+        User(name="user", email_address="user@email.com", password_hash="", role=role)
+    )
+    session.commit()
+
+    delete_roles(session, [role.id])
+    session.commit()
+
+    assert count(session, Role) == 0
+    assert count(session, RolePermissions) == 0
+    assert session.exec(select(User.role_id)).all() == [None]
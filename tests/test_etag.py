@@ -0,0 +1,155 @@
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app.db.catalog import catalog_cache
+from app.db.models import (
+    Exercise,
+    Permission,
+    Role,
+    RolePermissions,
+    RoleReadOnlyPermissions,
+    User,
+)
+from app.db import permissions as permissions_module
+from app.db.permissions import role_permission_cache
+from app.dependencies import get_session
+from app.etag import make_etag
+
+from .fixtures import (  # noqa: F401
+    authenticate,
+    client_fixture,
+    engine_fixture,
+    session_fixture,
+)
+
+
+@pytest.fixture(autouse=True)
+def seed(engine, client: TestClient):
+    with Session(engine) as session:
+        role = Role(name="admin")
+        session.add_all(
+            [
+                RolePermissions(role=role, permission=Permission(name="read_role")),
+                User(
+                    name="user",
+                    email_address="user@email.com",
+                    password_hash="",
+                    role=role,
+                ),
+                Exercise(name="bench press"),
+            ]
+        )
+        session.commit()
+    # A session per request, so statements are counted like in production
+    client.app.dependency_overrides[get_session] = lambda: Session(engine)
+    authenticate(
+        client,
+        "create_exercise",
+        "read_exercise",
+        "read_musclegroup",
+        "read_role",
+        "delete_role",
+        "create_own_workout_routine",
+        "read_own_workout_routine",
+    )
+    catalog_cache.invalidate()
+    role_permission_cache.invalidate()
+
+
+def count_statements(engine) -> list:
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    return statements
+
+
+def test_make_etag():
+    assert make_etag("a", 1) == make_etag("a", 1)
+    assert make_etag("a", 1) != make_etag("a1")
+    assert make_etag(b"body").startswith('"')
+
+
+@pytest.mark.parametrize(
+    "path", ["/exercises/", "/exercises/1", "/musclegroups/", "/roles/", "/roles/1"]
+)
+def test_not_modified_without_queries(client: TestClient, engine, path: str):
+    response = client.get(path)
+    etag = response.headers["ETag"]
+    statements = count_statements(engine)
+
+    cached = client.get(path, headers={"If-None-Match": f'W/"other", {etag}'})
+
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+    assert statements == []
+
+
+def test_catalog_headers(client: TestClient):
+    exercises = client.get("/exercises/")
+    assert exercises.headers["Cache-Control"] == "private, max-age=0"
+    assert client.get("/musclegroups/").headers["ETag"] == exercises.headers["ETag"]
+
+    client.post("/exercises/", json={"name": "squat", "musclegroup_ids": []})
+    response = client.get(
+        "/exercises/", headers={"If-None-Match": exercises.headers["ETag"]}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != exercises.headers["ETag"]
+    assert len(response.json()) == 2
+
+
+def test_roles(client: TestClient, engine):
+    response = client.get("/roles/")
+    with Session(engine) as session:
+        role = RoleReadOnlyPermissions.from_orm(session.get(Role, 1))
+    assert response.json() == [role.dict()]
+
+    client.delete("/roles/1")
+    after_delete = client.get(
+        "/roles/", headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert after_delete.status_code == 200
+    assert after_delete.json() == []
+    assert client.get("/roles/1").status_code == 404
+
+
+def test_role_tags_expire_with_permission_cache(
+    client: TestClient, engine, monkeypatch
+):
+    now = 1000.0
+    monkeypatch.setattr(permissions_module.time, "monotonic", lambda: now)
+    etag = client.get("/roles/").headers["ETag"]
+    statements = count_statements(engine)
+
+    # Another worker may have changed the role since
+    now += role_permission_cache.ttl
+    cached = client.get("/roles/", headers={"If-None-Match": etag})
+
+    assert cached.status_code == 304
+    assert statements
+
+
+def test_workout_routine(client: TestClient):
+    client.post(
+        "/workout_routines/",
+        json={
+            "name": "push",
+            "user_id": 1,
+            "exercises": [{"id": 1, "planned_sets": [{"reps": 5}]}],
+        },
+    )
+    response = client.get("/workout_routines/1")
+    etag = response.headers["ETag"]
+    assert etag == make_etag(response.content)
+
+    cached = client.get("/workout_routines/1", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    stale = client.get("/workout_routines/1", headers={"If-None-Match": '"stale"'})
+    assert stale.status_code == 200
@@ -0,0 +1,100 @@
+import csv
+import datetime
+import io
+import json
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlmodel import Session
+
+from app.db import export
+from app.db.models import (
+    Exercise,
+    PlannedSet,
+    RoutineExercise,
+    Set,
+    User,
+    Weight,
+    Workout,
+    WorkoutExercise,
+    WorkoutRoutine,
+)
+
+from .fixtures import (  # noqa: F401
+    authenticate,
+    client_fixture,
+    engine_fixture,
+    session_fixture,
+)
+
+
+@pytest.fixture(autouse=True)
+def seed(session: Session, client: TestClient):
+    exercise = Exercise(name="bench press")
+    for name in ("user", "other"):
+        user = User(name=name, email_address=f"{name}@email.com", password_hash="")
+        routine = WorkoutRoutine(name="test routine", user=user)
+        routine_exercise = RoutineExercise(workout_routine=routine, exercise=exercise)
+        session.add(PlannedSet(reps=5, routine_exercise=routine_exercise))
+        for day in range(1, 4):
+            date = datetime.date(2020, 1, day)
+            session.add(Weight(date=date, weight=80, user=user))
+            workout = Workout(date=date, workoutroutine=routine, user=user)
+            workout_exercise = WorkoutExercise(workout=workout, exercise=exercise)
+            for reps in (5, 3):
+                session.add(
+                    Set(reps=reps, weight=60, workout_exercise=workout_exercise)
+                )
+    session.commit()
+    authenticate(client, "read_own_user")
+
+
+EXPECTED_COUNTS = {
+    "weight": 3,
+    "workout_routine": 1,
+    "routine_exercise": 1,
+    "planned_set": 1,
+    "workout": 3,
+    "workout_exercise": 3,
+    "set": 6,
+}
+
+
+def count_types(records) -> dict[str, int]:
+    counts = {}
+    for record in records:
+        counts[record["type"]] = counts.get(record["type"], 0) + 1
+    return counts
+
+
+def test_export_ndjson(client: TestClient, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+
+    response = client.get("/users/1/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert count_types(records) == EXPECTED_COUNTS
+    assert records[0] == {"type": "weight", "id": 1, "date": "2020-01-01", "weight": 80}
+    workout_exercise = next(r for r in records if r["type"] == "workout_exercise")
+    assert workout_exercise["exercise"] == "bench press"
+
+
+def test_export_csv(client: TestClient):
+    response = client.get("/users/1/export", params={"file_format": "csv"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    records = list(csv.DictReader(io.StringIO(response.text)))
+    assert count_types(records) == EXPECTED_COUNTS
+    assert list(records[0]) == export.export_fields()
+
+
+def test_export_other_user_requires_permission(client: TestClient):
+    assert client.get("/users/2/export").status_code == 400
+
+
+def test_export_missing_user(client: TestClient):
+    authenticate(client, "read_all_users")
+    assert client.get("/users/5/export").status_code == 404
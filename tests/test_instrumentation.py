@@ -0,0 +1,84 @@
+import json
+import logging
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+from app.db.instrumentation import QueryStats, current_query_stats, instrument_engine
+from app.middleware import QueryStatsMiddleware
+
+from .fixtures import engine_fixture  # noqa: F401
+
+
+@pytest.fixture(autouse=True)
+def instrumented(engine):
+    # Twice, to check the listeners are only added once
+    instrument_engine(engine)
+    instrument_engine(engine)
+
+
+def test_statements_are_recorded_in_context(engine):
+    stats = QueryStats()
+    token = current_query_stats.set(stats)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("select 1"))
+            with pytest.raises(OperationalError):
+                conn.execute(text("select * from missing"))
+            conn.execute(text("select 2"))
+    finally:
+        current_query_stats.reset(token)
+
+    assert stats.count == 2
+    assert stats.slowest_statement in ("select 1", "select 2")
+    assert stats.total_time >= stats.slowest_time > 0
+    with engine.connect() as conn:
+        conn.execute(text("select 3"))
+    assert stats.count == 2
+
+
+def create_client(engine, log_sample_rate: float) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware, log_sample_rate=log_sample_rate)
+
+    def get_session():
+        with Session(engine) as session:
+            yield session
+
+    @app.get("/items/{count}")
+    def read_items(count: int, session: Session = Depends(get_session)):
+        for i in range(count):
+            session.execute(text(f"select {i}"))
+        return {}
+
+    return TestClient(app)
+
+
+def test_headers_report_query_count(engine):
+    client = create_client(engine, log_sample_rate=0)
+
+    response = client.get("/items/3")
+
+    assert response.headers["x-query-count"] == "3"
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert 'desc="3 queries"' in response.headers["server-timing"]
+
+
+def test_sampled_log_line(engine, caplog: pytest.LogCaptureFixture):
+    caplog.set_level(logging.INFO, logger="app.requests")
+
+    create_client(engine, log_sample_rate=0).get("/items/1")
+    assert not caplog.records
+
+    create_client(engine, log_sample_rate=1).get("/items/2")
+    [record] = caplog.records
+    fields = json.loads(record.getMessage())
+    assert fields["route"] == "/items/{count}"
+    assert fields["status"] == 200
+    assert fields["queries"] == 2
+    assert fields["slowest_statement"].startswith("select")
+    assert record.sql_stats == fields
@@ -0,0 +1,69 @@
+import datetime
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from app.db.loaders import loader_options
+from app.db.models import (
+    Exercise,
+    PlannedSet,
+    RoutineExercise,
+    Set,
+    User,
+    Workout,
+    WorkoutExercise,
+    WorkoutRead,
+    WorkoutRoutine,
+    WorkoutRoutinesRead,
+)
+
+from .fixtures import create_test_engine
+
+
+def seed(session: Session, workouts: int):
+    user = User(name="user", email_address="user@email.com", password_hash="")
+    exercises = [Exercise(name="bench press"), Exercise(name="squat")]
+    routine = WorkoutRoutine(name="test routine", user=user)
+    for exercise in exercises:
+        routine_exercise = RoutineExercise(workout_routine=routine, exercise=exercise)
+        session.add(PlannedSet(reps=5, routine_exercise=routine_exercise))
+    for day in range(workouts):
+        workout = Workout(
+            date=datetime.date(2020, 1, 1) + datetime.timedelta(days=day),
+            workoutroutine=routine,
+            user=user,
+        )
+        for exercise in exercises:
+            workout_exercise = WorkoutExercise(workout=workout, exercise=exercise)
+            session.add(Set(reps=5, weight=60, workout_exercise=workout_exercise))
+    session.commit()
+
+
+def count_queries(workouts: int, model, response_model) -> int:
+    engine = create_test_engine()
+    with Session(engine) as session:
+        seed(session, workouts=workouts)
+
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    with Session(engine) as session:
+        rows = session.exec(
+            select(model).options(*loader_options(response_model))
+        ).all()
+        [response_model.from_orm(row) for row in rows]
+    return len(statements)
+
+
+@pytest.mark.parametrize(
+    "model,response_model",
+    [(Workout, WorkoutRead), (WorkoutRoutine, WorkoutRoutinesRead)],
+)
+def test_query_count_does_not_grow_with_rows(model, response_model):
+    assert count_queries(1, model, response_model) == count_queries(
+        25, model, response_model
+    )
@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+import time
+
+from anyio import to_thread
+from fastapi.testclient import TestClient
+
+from app.db.database import THREADPOOL_SIZE
+from app.main import create_app
+
+# Generous enough for a cold CI runner; importing the app and building it
+# should never come close unless something starts doing I/O at startup.
+COLD_START_BUDGET_SECONDS = 3.0
+
+COLD_START_SCRIPT = """
+from fastapi.testclient import TestClient
+
+from app.main import create_app
+
+with TestClient(create_app()) as client:
+    assert client.get("/").status_code == 200
+"""
+
+
+def test_cold_start_does_no_database_io(tmp_path):
+    # The database lives in a directory that does not exist, so any attempt
+    # to connect during import or startup fails the script
+    env = dict(
+        os.environ,
+        SQLALCHEMY_DATABASE_URL=f"sqlite:///{tmp_path / 'missing' / 'db.sqlite'}",
+        # The warm-up connects in the background and only logs failures
+        CATALOG_WARM="0",
+    )
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", COLD_START_SCRIPT],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    assert result.returncode == 0, result.stderr
+    assert "Traceback" not in result.stderr, result.stderr
+    assert elapsed < COLD_START_BUDGET_SECONDS
+
+
+def test_threadpool_matches_connection_pool():
+    with TestClient(create_app()) as client:
+        limiter_size = client.portal.call(
+            lambda: to_thread.current_default_thread_limiter().total_tokens
+        )
+    assert limiter_size == THREADPOOL_SIZE
@@ -0,0 +1,73 @@
+from fastapi.testclient import TestClient
+import pytest
+from app.metrics import Counter, Gauge, Histogram, Registry
+
+from .fixtures import (  # noqa: F401
+    authenticate,
+    client_fixture,
+    engine_fixture,
+    session_fixture,
+)
+
+
+def test_render_text_format():
+    registry = Registry()
+    requests = registry.register(Counter("requests_total", "Requests.", ("route",)))
+    in_flight = registry.register(Gauge("in_flight", "In flight."))
+    latency = registry.register(
+        Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1))
+    )
+    requests.inc('/a"b')
+    requests.inc('/a"b', amount=2)
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value, "/a")
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a\\"b"} 3',
+        "# HELP in_flight In flight.",
+        "# TYPE in_flight gauge",
+        "in_flight 1",
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/a",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a",le="1"} 3',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a"} 3.65',
+        'latency_seconds_count{route="/a"} 4',
+    ]
+
+
+@pytest.fixture(autouse=True)
+def authenticated(client: TestClient):
+    authenticate(client, "read_exercise")
+
+
+def sample(metrics: str, prefix: str) -> float:
+    for line in metrics.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return 0
+
+
+def test_metrics_endpoint(client: TestClient):
+    before = client.get("/metrics").text
+    client.get("/exercises/")
+    client.get("/users/")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    metrics = response.text
+    count = 'http_request_duration_seconds_count{method="GET",route="/exercises/"'
+    assert sample(metrics, count) == sample(before, count) + 1
+    queries = 'http_request_queries_count{method="GET",route="/exercises/"}'
+    assert sample(metrics, queries) == sample(before, queries) + 1
+    denied = 'auth_failures_total{reason="permission_denied"}'
+    assert sample(metrics, denied) == sample(before, denied) + 1
+    # Only the /metrics request itself
+    assert sample(metrics, "http_requests_in_flight ") == 1
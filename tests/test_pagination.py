@@ -0,0 +1,55 @@
+import datetime
+
+from fastapi import HTTPException, Response
+import pytest
+from sqlmodel import Session, desc, select
+
+from app.db.models import User, Weight
+from app.pagination import (
+    NEXT_CURSOR_HEADER,
+    before_date_and_id,
+    decode_cursor,
+    encode_cursor,
+    paginate,
+)
+
+from .fixtures import engine_fixture, session_fixture  # noqa: F401
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(datetime.date(2020, 1, 1), 5)
+    assert decode_cursor(cursor) == ["2020-01-01", 5]
+
+
+@pytest.mark.parametrize("cursor", ["garbage", encode_cursor(1)])
+def test_invalid_cursor(cursor: str):
+    with pytest.raises(HTTPException) as exc_info:
+        before_date_and_id(Weight.date, Weight.id, cursor)
+    assert exc_info.value.status_code == 400
+
+
+def test_paginate_weights_by_date_and_id(session: Session):
+    user = User(name="user", email_address="user@email.com", password_hash="")
+    for day in [1, 2, 2, 3, 3, 3, 4]:
+        session.add(Weight(date=datetime.date(2020, 1, day), weight=80, user=user))
+    session.commit()
+
+    pages = []
+    cursor = None
+    while True:
+        query = select(Weight)
+        if cursor:
+            query = query.where(before_date_and_id(Weight.date, Weight.id, cursor))
+        response = Response()
+        rows = paginate(
+            session,
+            query.order_by(desc(Weight.date), desc(Weight.id)),
+            limit=2,
+            response=response,
+            cursor_for=lambda weight: encode_cursor(weight.date, weight.id),
+        )
+        pages.append([weight.id for weight in rows])
+        if not (cursor := response.headers.get(NEXT_CURSOR_HEADER)):
+            break
+
+    assert pages == [[7, 6], [5, 4], [3, 2], [1]]
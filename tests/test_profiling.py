@@ -0,0 +1,139 @@
+import cProfile
+import json
+import pstats
+from threading import Lock
+
+from fastapi.testclient import TestClient
+import pytest
+
+from app import auth, profiling
+from app.db.models import User
+from app.db.permissions import role_permission_cache
+
+from .fixtures import (  # noqa: F401
+    authenticate,
+    client_fixture,
+    engine_fixture,
+    session_fixture,
+)
+
+
+@pytest.fixture(autouse=True)
+def profiling_settings(monkeypatch, tmp_path):
+    monkeypatch.setattr(auth, "SECRET_KEY", "secret")
+    monkeypatch.setattr(profiling, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    yield
+    role_permission_cache.invalidate()
+
+
+def bearer(role_id: int, permissions: set[str]) -> dict[str, str]:
+    role_permission_cache.set(
+        role_id, frozenset(permissions), role_permission_cache.generation
+    )
+    user = User(id=role_id, email_address="admin@email.com", role_id=role_id)
+    return {"Authorization": f"Bearer {auth.create_user_access_token(user)}"}
+
+
+def test_profile_on_header(client: TestClient, tmp_path):
+    authenticate(client, "read_exercise", "profile_requests")
+    headers = {"X-Profile": "1", **bearer(1, {"profile_requests"})}
+
+    response = client.get("/exercises/", headers=headers)
+
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+    assert "handler;dur=" in response.headers["Server-Timing"]
+    summary = json.loads((tmp_path / f"{profile_id}.json").read_text())
+    assert summary["route"] == "/exercises/"
+    assert summary["status"] == 200
+    assert {"total", "sql", "dependencies", "handler", "serialization"} <= set(
+        summary["phases"]
+    )
+    assert any("read_exercises" in row["function"] for row in summary["functions"])
+
+    assert client.get("/profiles/").json()[0]["id"] == profile_id
+    download = client.get(f"/profiles/{profile_id}")
+    assert download.status_code == 200
+    path = tmp_path / "download.prof"
+    path.write_bytes(download.content)
+    assert pstats.Stats(str(path)).total_calls > 0
+
+
+class ExclusiveProfile(cProfile.Profile):
+    """A profiler that behaves like cProfile on Python 3.12+."""
+
+    active = None
+    lock = Lock()
+
+    def enable(self, *args, **kwargs):
+        with self.lock:
+            if ExclusiveProfile.active is not None:
+                raise ValueError("Another profiling tool is already active")
+            ExclusiveProfile.active = self
+        super().enable(*args, **kwargs)
+
+    def disable(self):
+        super().disable()
+        with self.lock:
+            if ExclusiveProfile.active is self:
+                ExclusiveProfile.active = None
+
+
+@pytest.mark.parametrize("sees_all_threads", [True, False])
+def test_one_profiler_at_a_time(
+    client: TestClient, monkeypatch, tmp_path, sees_all_threads: bool
+):
+    monkeypatch.setattr(profiling.cProfile, "Profile", ExclusiveProfile)
+    monkeypatch.setattr(profiling, "PROFILER_SEES_ALL_THREADS", sees_all_threads)
+    authenticate(client, "read_exercise", "profile_requests")
+    headers = {"X-Profile": "1", **bearer(1, {"profile_requests"})}
+
+    response = client.get("/exercises/", headers=headers)
+
+    assert response.status_code == 200
+    assert "X-Profile-Id" in response.headers
+    assert ExclusiveProfile.active is None
+
+
+def test_header_needs_permission(client: TestClient, tmp_path):
+    authenticate(client, "read_exercise")
+
+    anonymous = client.get("/exercises/", headers={"X-Profile": "1"})
+    unauthorized = client.get(
+        "/exercises/", headers={"X-Profile": "1", **bearer(2, {"read_exercise"})}
+    )
+
+    assert "X-Profile-Id" not in anonymous.headers
+    assert "X-Profile-Id" not in unauthorized.headers
+    assert not list(tmp_path.iterdir())
+
+
+def test_sample_rate(client: TestClient, monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(profiling, "PROFILE_KEEP", 2)
+    authenticate(client, "read_exercise")
+
+    for _ in range(3):
+        assert "X-Profile-Id" in client.get("/exercises/").headers
+
+    assert len(list(tmp_path.glob("*.prof"))) == 2
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+
+def test_disabled(monkeypatch, request):
+    monkeypatch.setattr(profiling, "PROFILING_ENABLED", False)
+    # Read when the app is created
+    client = request.getfixturevalue("client")
+    authenticate(client, "read_exercise", "profile_requests")
+    headers = {"X-Profile": "1", **bearer(1, {"profile_requests"})}
+
+    assert "X-Profile-Id" not in client.get("/exercises/", headers=headers).headers
+    assert client.get("/profiles/").status_code == 404
+
+
+def test_unknown_profile(client: TestClient):
+    authenticate(client, "profile_requests")
+
+    assert client.get("/profiles/not-a-profile").status_code == 404
+    assert client.get(f"/profiles/{'0' * 32}").status_code == 404
@@ -0,0 +1,112 @@
+"""Query-count and latency budgets for the read endpoints.
+
+Each data size seeds users with years of history into the engine from
+``tests/fixtures.py`` with ``app.db.seed`` and calls every endpoint a few
+times, counting every statement the engine executes, including those run
+while a streamed body is sent. A budget that is exceeded fails the run with
+a table of every endpoint's numbers.
+"""
+
+from statistics import median
+from time import perf_counter
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app.auth import CurrentUser, get_current_user
+from app.db.catalog import catalog_cache
+from app.db.seed import SeedConfig, seed_database
+
+from .fixtures import client_fixture, engine_fixture, session_fixture  # noqa: F401
+
+# (users, years of history)
+DATA_SIZES = {"month": (1, 1 / 12), "year": (2, 1), "three_years": (3, 3)}
+RUNS = 3
+
+# path: (max queries, max median latency in ms). Latencies are loose enough
+# for a slow CI runner; they catch order-of-magnitude regressions.
+BUDGETS = {
+    # A full page has over 500 workout exercises, so selectinload fetches
+    # their sets in two batches
+    "/workouts/?user_id=1": (4, 300),
+    # The ids are streamed, then the page is loaded by id with its eager loads
+    "/workouts/?user_id=1&stream=json&limit=100": (4, 300),
+    "/workouts/latest?user_id=1": (3, 100),
+    "/workouts/1": (3, 100),
+    "/workout_routines/?user_id=1": (3, 100),
+    "/workout_routines/1": (3, 100),
+    "/workout_exercises/?user_id=1": (2, 200),
+    "/workout_exercises/1": (2, 100),
+    "/sets/?user_id=1": (1, 200),
+    "/planned_sets/?user_id=1": (1, 100),
+    "/weights/?user_id=1": (1, 100),
+    # Served from the catalog cache, which startup warms
+    "/exercises/": (0, 100),
+    "/exercises/1": (0, 100),
+    "/musclegroups/": (0, 100),
+    "/musclegroups/1": (0, 100),
+    "/users/": (1, 100),
+    "/users/1": (1, 100),
+    "/roles/": (2, 100),
+    "/users/1/export": (8, 1000),
+}
+
+
+class Admin(CurrentUser):
+    def has(self, permission: str) -> bool:
+        return True
+
+
+def measure(client: TestClient, statements: list, path: str) -> tuple[int, float]:
+    """Return the query count and median latency in ms of GET ``path``."""
+    query_counts, latencies = set(), []
+    for _ in range(RUNS):
+        statements.clear()
+        start = perf_counter()
+        response = client.get(path)
+        latencies.append((perf_counter() - start) * 1000)
+        assert response.status_code == 200, f"{path}: {response.text}"
+        query_counts.add(len(statements))
+    return max(query_counts), median(latencies)
+
+
+def report(results: dict[str, tuple[int, float]]) -> str:
+    lines = [f"{'endpoint':50} {'queries':>12} {'ms':>16}"]
+    for path, (queries, latency) in results.items():
+        max_queries, max_latency = BUDGETS[path]
+        flag = " <-" if queries > max_queries or latency > max_latency else ""
+        lines.append(
+            f"{path:50} {queries:>5} / {max_queries:<4} "
+            f"{latency:>7.1f} / {max_latency:<6}{flag}"
+        )
+    return "\n".join(lines)
+
+
+@pytest.mark.parametrize("size", DATA_SIZES)
+def test_query_budgets(session: Session, client: TestClient, size: str):
+    users, years = DATA_SIZES[size]
+    seed_database(
+        session.get_bind(),
+        SeedConfig(users=users, years=years, exercises=12, workouts_per_week=4),
+    )
+    catalog_cache.warm(session.get_bind())
+    client.app.dependency_overrides[get_current_user] = lambda: Admin(
+        id=1, email_address="user1@email.com", role_id=1
+    )
+    statements = []
+    event.listen(
+        session.get_bind(),
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    results = {path: measure(client, statements, path) for path in BUDGETS}
+
+    over_budget = [
+        path
+        for path, (queries, latency) in results.items()
+        if queries > BUDGETS[path][0] or latency > BUDGETS[path][1]
+    ]
+    assert not over_budget, f"{size}: over budget\n{report(results)}"
@@ -0,0 +1,67 @@
+import time
+
+from sqlmodel import Session
+
+from app.db import permissions as permissions_module
+from app.db.models import Permission, Role, RolePermissions, User
+from app.db.permissions import RolePermissionCache, role_permission_cache
+
+from .fixtures import engine_fixture, session_fixture  # noqa: F401
+
+
+def test_invalidate_drops_role():
+    cache = RolePermissionCache()
+    cache.set(1, frozenset({"read_exercise"}), cache.generation)
+    cache.set(2, frozenset({"read_role"}), cache.generation)
+    assert cache.get(1) == frozenset({"read_exercise"})
+
+    cache.invalidate(1)
+    assert cache.get(1) is None
+    assert cache.get(2) == frozenset({"read_role"})
+
+    cache.invalidate()
+    assert cache.get(2) is None
+
+
+def test_stale_load_is_not_cached():
+    cache = RolePermissionCache()
+    generation = cache.generation
+    cache.invalidate(1)
+    cache.set(1, frozenset({"read_exercise"}), generation)
+    assert cache.get(1) is None
+
+
+def test_entries_expire(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(permissions_module.time, "monotonic", lambda: now)
+    cache = RolePermissionCache(ttl=30)
+    cache.set(1, frozenset({"read_exercise"}), cache.generation)
+
+    now += 29
+    assert cache.get(1) == frozenset({"read_exercise"})
+    now += 1
+    assert cache.get(1) is None
+
+
+def test_user_has_uses_cache(session: Session):
+    role_permission_cache.invalidate()
+    role = Role(name="user")
+    session.add(RolePermissions(role=role, permission=Permission(name="read_exercise")))
+    user = User(name="user", email_address="user@email.com", password_hash="")
+    user.role = role
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+
+    assert user.has("read_exercise")
+    assert not user.has("delete_exercise")
+    assert role_permission_cache.get(role.id) == frozenset({"read_exercise"})
+
+    # Permission checks are served from the cache until invalidated
+    session.add(
+        RolePermissions(role=role, permission=Permission(name="delete_exercise"))
+    )
+    session.commit()
+    assert not user.has("delete_exercise")
+    role_permission_cache.invalidate(role.id)
+    assert user.has("delete_exercise")
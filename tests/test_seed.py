@@ -0,0 +1,66 @@
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.db.models import Exercise, Set, User, Weight, Workout, WorkoutExercise
+from app.db.seed import SeedConfig, main, seed_database
+
+from .fixtures import create_test_engine
+
+CONFIG = SeedConfig(
+    users=3,
+    years=0.5,
+    exercises=10,
+    exercises_per_workout=3,
+    sets_per_exercise=2,
+    batch_size=100,
+)
+
+
+def create_seeded_engine(config: SeedConfig = CONFIG):
+    engine = create_test_engine()
+    counts = seed_database(engine, config)
+    return engine, counts
+
+
+def dump(engine, model) -> list[tuple]:
+    with Session(engine) as session:
+        return [
+            tuple(row)
+            for row in session.execute(
+                select(*model.__table__.columns).order_by(model.id)
+            )
+        ]
+
+
+def test_seed_is_deterministic():
+    first, counts = create_seeded_engine()
+    second, _ = create_seeded_engine()
+    other_seed, _ = create_seeded_engine(SeedConfig(**{**CONFIG.__dict__, "seed": 1}))
+
+    for model in (User, Weight, Workout, WorkoutExercise, Set):
+        assert dump(first, model) == dump(second, model)
+    assert dump(first, Set) != dump(other_seed, Set)
+    assert counts["user"] == 3
+    assert counts["weight"] == 3 * 182
+    assert counts["workoutexercise"] == counts["workout"] * 3
+    assert counts["set"] == counts["workoutexercise"] * 2
+
+
+def test_seed_appends_to_existing_data():
+    engine, counts = create_seeded_engine()
+    more = seed_database(engine, CONFIG)
+
+    with Session(engine) as session:
+        assert session.exec(select(func.count()).select_from(Set)).one() == (
+            counts["set"] + more["set"]
+        )
+        assert session.exec(select(func.count()).select_from(Exercise)).one() == 10
+        emails = session.exec(select(User.email_address).order_by(User.id)).all()
+        assert emails[-1] == "user6@example.com"
+
+
+def test_main(tmp_path, capsys):
+    url = f"sqlite:///{tmp_path / 'seed.db'}"
+    main(["--url", url, "--create-schema", "--users", "1", "--years", "0.1"])
+
+    assert "set" in capsys.readouterr().out
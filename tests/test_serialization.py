@@ -0,0 +1,122 @@
+import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+from sqlmodel import Session, select
+
+from app import serialization
+from app.db.loaders import loader_options
+from app.db.models import (
+    Exercise,
+    ExerciseReadFull,
+    PlannedSet,
+    PlannedSetRead,
+    Role,
+    RoutineExercise,
+    Set,
+    SetRead,
+    User,
+    UserRead,
+    Weight,
+    WeightRead,
+    Workout,
+    WorkoutExercise,
+    WorkoutExerciseRead,
+    WorkoutRead,
+    WorkoutRoutine,
+    WorkoutRoutineRead,
+    WorkoutsRead,
+)
+from app.serialization import fast_response
+
+from .fixtures import engine_fixture, session_fixture  # noqa: F401
+
+CASES = [
+    (Workout, WorkoutRead),
+    (Workout, WorkoutsRead),
+    (WorkoutRoutine, WorkoutRoutineRead),
+    (WorkoutExercise, WorkoutExerciseRead),
+    (Set, SetRead),
+    (PlannedSet, PlannedSetRead),
+    (Weight, WeightRead),
+    (User, UserRead),
+    (Exercise, ExerciseReadFull),
+]
+
+
+@pytest.fixture(autouse=True)
+def seed(session: Session):
+    user = User(
+        name="zoë",
+        email_address="user@email.com",
+        password_hash="",
+        role=Role(name="user"),
+    )
+    exercises = [Exercise(name="bench press"), Exercise(name="überkreuz")]
+    routine = WorkoutRoutine(name="push “day”", user=user)
+    for exercise in exercises:
+        routine_exercise = RoutineExercise(workout_routine=routine, exercise=exercise)
+        session.add(PlannedSet(reps=5, routine_exercise=routine_exercise))
+    for day in range(1, 4):
+        date = datetime.date(2020, 1, day)
+        session.add(Weight(date=date, weight=80.5, user=user))
+        workout = Workout(date=date, workoutroutine=routine, user=user)
+        for exercise in exercises:
+            workout_exercise = WorkoutExercise(workout=workout, exercise=exercise)
+            session.add(Set(reps=5, weight=62.5, workout_exercise=workout_exercise))
+            session.add(Set(reps=None, weight=None, workout_exercise=workout_exercise))
+    session.commit()
+
+
+def create_client(session: Session, model, response_model) -> TestClient:
+    app = FastAPI()
+
+    def rows():
+        return session.exec(
+            select(model).options(*loader_options(response_model)).order_by(model.id)
+        ).all()
+
+    @app.get("/validated", response_model=list[response_model])
+    def validated():
+        return rows()
+
+    @app.get("/fast", response_model=list[response_model])
+    def fast():
+        return fast_response(response_model, rows())
+
+    @app.get("/validated/one", response_model=response_model)
+    def validated_one():
+        return rows()[0]
+
+    @app.get("/fast/one", response_model=response_model)
+    def fast_one():
+        return fast_response(response_model, rows()[0])
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("orjson", [serialization.orjson, None])
+@pytest.mark.parametrize("model, response_model", CASES)
+def test_fast_response_matches_response_model(
+    session: Session, monkeypatch: pytest.MonkeyPatch, orjson, model, response_model
+):
+    monkeypatch.setattr(serialization, "orjson", orjson)
+    client = create_client(session, model, response_model)
+
+    for path in ("", "/one"):
+        validated = client.get(f"/validated{path}")
+        fast = client.get(f"/fast{path}")
+        assert validated.status_code == fast.status_code == 200
+        assert fast.content == validated.content
+        assert fast.headers["content-type"] == validated.headers["content-type"]
+
+
+def test_float_fields_are_coerced():
+    dump = serialization.dumper(SetRead)
+    assert dump(Set(id=1, reps=5, weight=60, workout_exercise_id=1)) == {
+        "reps": 5,
+        "weight": 60.0,
+        "id": 1,
+        "workout_exercise_id": 1,
+    }
@@ -0,0 +1,128 @@
+import json
+import logging
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from app.db.instrumentation import instrument_engine
+from app.db.models import Weight
+from app.db.slow_queries import (
+    PLAN_CAPTURES,
+    redact_parameters,
+    slow_query_log,
+    statement_shape,
+)
+from app.dependencies import get_session
+
+from .fixtures import (  # noqa: F401
+    authenticate,
+    client_fixture,
+    engine_fixture,
+    session_fixture,
+)
+
+
+@pytest.fixture(autouse=True)
+def slow_log(engine, monkeypatch):
+    monkeypatch.setattr(slow_query_log, "threshold", 0)
+    instrument_engine(engine)
+    slow_query_log.clear()
+    yield
+    slow_query_log.clear()
+
+
+def weight_queries() -> list[dict]:
+    return [
+        query
+        for query in slow_query_log.queries()
+        if query["shape"].startswith("SELECT weight.")
+    ]
+
+
+def test_statement_shape():
+    assert statement_shape("SELECT a\n  FROM t WHERE id IN (?, ?,?)") == (
+        "SELECT a FROM t WHERE id IN (?, ...)"
+    )
+    assert statement_shape("SELECT a FROM t WHERE id IN (?)") != statement_shape(
+        "SELECT a FROM t WHERE id IN (?, ?)"
+    )
+
+
+def test_redact_parameters():
+    assert redact_parameters(("secret", 1, None)) == ["str", "int", "NoneType"]
+    assert redact_parameters({"email": "a@b.c"}) == {"email": "str"}
+
+
+def test_logs_and_captures_plan_once(engine, caplog):
+    caplog.set_level(logging.WARNING, "app.db.slow_queries")
+    for user_id in (1, 2):
+        with Session(engine) as session:
+            session.exec(select(Weight).where(Weight.user_id == user_id)).all()
+
+    [query] = weight_queries()
+    assert query["count"] == 2
+    assert query["dialect"] == "sqlite"
+    assert any("weight" in line for line in query["plan"])
+
+    [record, _] = [
+        json.loads(record.message)
+        for record in caplog.records
+        if "FROM weight" in record.message
+    ]
+    assert record["parameters"] == ["int"]
+    assert record["route"] is None
+
+
+def test_threshold_and_capacity(engine, monkeypatch):
+    monkeypatch.setattr(slow_query_log, "threshold", 60)
+    with Session(engine) as session:
+        session.exec(select(Weight)).all()
+    assert slow_query_log.queries() == []
+
+    monkeypatch.setattr(slow_query_log, "threshold", 0)
+    monkeypatch.setattr(slow_query_log, "capacity", 2)
+    with Session(engine) as session:
+        for column in (Weight.id, Weight.date, Weight.weight):
+            session.exec(select(column)).all()
+    assert [query["shape"] for query in slow_query_log.queries()] == [
+        "SELECT weight.weight FROM weight",
+        "SELECT weight.date FROM weight",
+    ]
+
+
+def test_failed_capture_invalidates_connection(engine, monkeypatch):
+    def fail(cursor, statement, parameters):
+        raise RuntimeError("SET SHOWPLAN_TEXT OFF failed")
+
+    monkeypatch.setitem(PLAN_CAPTURES, "sqlite", fail)
+    invalidated = []
+    event.listen(
+        engine.pool,
+        "invalidate",
+        lambda dbapi_connection, record, exc: invalidated.append(exc),
+    )
+    with Session(engine) as session:
+        session.exec(select(Weight)).all()
+
+    [query] = weight_queries()
+    assert query["plan"] == ["plan unavailable: SET SHOWPLAN_TEXT OFF failed"]
+    assert [str(exc) for exc in invalidated] == ["SET SHOWPLAN_TEXT OFF failed"]
+
+
+def test_endpoint_reports_route(engine, client: TestClient):
+    def get_test_session():
+        # Closed after the request, so its plans are captured on checkin
+        with Session(engine) as session:
+            yield session
+
+    client.app.dependency_overrides[get_session] = get_test_session
+    authenticate(client, "read_own_weight", "read_slow_queries")
+    client.get("/weights/", params={"user_id": 1})
+    response = client.get("/slow_queries/")
+
+    assert response.status_code == 200
+    [query] = [q for q in response.json() if q["shape"].startswith("SELECT weight.")]
+    assert query["route"] == "/weights/"
+    assert query["plan"]
@@ -0,0 +1,124 @@
+import datetime
+import json
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import event
+from sqlmodel import create_engine, Session, SQLModel, select
+
+from app import streaming
+from app.db.models import (
+    Exercise,
+    Role,
+    Set,
+    User,
+    Workout,
+    WorkoutExercise,
+    WorkoutRead,
+    WorkoutRoutine,
+)
+
+from .fixtures import (  # noqa: F401
+    authenticate,
+    client_fixture,
+    engine_fixture,
+    session_fixture,
+)
+
+
+@pytest.fixture(autouse=True)
+def seed(session: Session, client: TestClient, monkeypatch: pytest.MonkeyPatch):
+    role = Role(name="admin")
+    exercises = [Exercise(name="bench press"), Exercise(name="squat")]
+    for name in ("user", "other"):
+        user = User(
+            name=name,
+            email_address=f"{name}@email.com",
+            password_hash="",
+            role=role,
+        )
+        routine = WorkoutRoutine(name="test routine", user=user)
+        for day in range(1, 4):
+            workout = Workout(
+                date=datetime.date(2020, 1, day), workoutroutine=routine, user=user
+            )
+            for exercise in exercises:
+                workout_exercise = WorkoutExercise(workout=workout, exercise=exercise)
+                session.add(Set(reps=day, weight=60, workout_exercise=workout_exercise))
+    session.commit()
+    monkeypatch.setattr(streaming, "STREAM_BATCH_SIZE", 2)
+    authenticate(client, "read_all_workouts", "read_exercise", "read_all_users")
+
+
+@pytest.mark.parametrize("path", ["/workouts/", "/exercises/", "/users/"])
+def test_streamed_json_matches_regular_response(client: TestClient, path: str):
+    regular = client.get(path)
+    streamed = client.get(path, params={"stream": "json"})
+
+    assert streamed.status_code == 200
+    assert streamed.headers["content-type"] == "application/json"
+    assert streamed.json() == regular.json()
+
+
+def test_ndjson_by_accept_header(client: TestClient):
+    regular = client.get("/workouts/", params={"user_id": 1})
+    streamed = client.get(
+        "/workouts/",
+        params={"user_id": 1},
+        headers={"Accept": "application/x-ndjson"},
+    )
+
+    assert streamed.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in streamed.text.splitlines()]
+    assert rows == regular.json()
+    assert len(rows) == 3
+
+
+def test_streaming_applies_offset_and_limit(client: TestClient):
+    streamed = client.get("/workouts/", params={"stream": "json", "offset": 1})
+    assert len(streamed.json()) == 5
+
+    streamed = client.get("/exercises/", params={"stream": "json", "limit": 1})
+    assert [exercise["name"] for exercise in streamed.json()] == ["bench press"]
+
+
+def test_empty_streamed_array(client: TestClient):
+    streamed = client.get("/workouts/", params={"stream": "json", "user_id": 3})
+    assert streamed.text == "[]"
+
+
+def test_cursor_connection_runs_nothing_else(tmp_path):
+    # A pool of real connections, so each session gets its own
+    engine = create_engine(f"sqlite:///{tmp_path / 'stream.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(name="user", email_address="user@email.com", password_hash="")
+        routine = WorkoutRoutine(name="test routine", user=user)
+        for day in range(1, 6):
+            workout = Workout(
+                date=datetime.date(2020, 1, day), workoutroutine=routine, user=user
+            )
+            workout_exercise = WorkoutExercise(
+                workout=workout, exercise=Exercise(name=f"exercise {day}")
+            )
+            session.add(Set(reps=day, weight=60, workout_exercise=workout_exercise))
+        session.commit()
+
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(
+            (conn.connection.dbapi_connection, statement)
+        ),
+    )
+    with Session(engine) as session:
+        query = select(Workout).order_by(Workout.id.desc())
+        batches = list(streaming.stream_rows(session, query, WorkoutRead))
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    rows = [row for batch in batches for row in batch]
+    assert [row["id"] for row in rows] == [5, 4, 3, 2, 1]
+    assert rows[0]["workout_exercises"][0]["sets"][0]["reps"] == 5
+    cursor_connection = statements[0][0]
+    assert [c for c, _ in statements].count(cursor_connection) == 1
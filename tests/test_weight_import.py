@@ -0,0 +1,120 @@
+import datetime
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlmodel import Session, select
+
+from app.db.models import User, Weight
+from app.routers import weights
+
+from .fixtures import (  # noqa: F401
+    authenticate,
+    client_fixture,
+    engine_fixture,
+    session_fixture,
+)
+
+
+@pytest.fixture(autouse=True)
+def seed(session: Session, client: TestClient):
+    for name in ("user", "other"):
+        session.add(
+            User(name=name, email_address=f"{name}@email.com", password_hash="")
+        )
+    session.add(Weight(date=datetime.date(2020, 1, 1), weight=90, user_id=1))
+    session.commit()
+    authenticate(client, "create_own_weight")
+
+
+def user_weights(session: Session, user_id: int = 1) -> dict[str, float]:
+    return {
+        weight.date.isoformat(): weight.weight
+        for weight in session.exec(select(Weight).where(Weight.user_id == user_id))
+    }
+
+
+def test_import_csv_upserts_by_date(
+    client: TestClient, session: Session, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(weights, "IMPORT_CHUNK_SIZE", 2)
+    body = "date,weight\n2020-01-01,80\n2020-01-02,81\n2020-01-03,82\n2020-01-02,79\n"
+
+    response = client.post(
+        "/weights/import", files={"file": ("weights.csv", body, "text/csv")}
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"inserted": 2, "updated": 2}
+    assert user_weights(session) == {
+        "2020-01-01": 80,
+        "2020-01-02": 79,
+        "2020-01-03": 82,
+    }
+
+
+def test_import_ndjson(client: TestClient, session: Session):
+    body = (
+        '{"date": "2020-01-01", "weight": 70}\n\n{"date": "2020-02-01", "weight": 71}\n'
+    )
+
+    response = client.post(
+        "/weights/import", files={"file": ("weights.ndjson", body, "text/plain")}
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"inserted": 1, "updated": 1}
+    assert user_weights(session) == {"2020-01-01": 70, "2020-02-01": 71}
+
+
+def test_import_rejects_invalid_row_without_writing(
+    client: TestClient, session: Session
+):
+    body = "date,weight\n2020-02-01,80\n2020-02-02,heavy\n"
+
+    response = client.post(
+        "/weights/import", files={"file": ("weights.csv", body, "text/csv")}
+    )
+
+    assert response.status_code == 422
+    assert "Line 3" in response.json()["detail"]
+    session.rollback()
+    assert user_weights(session) == {"2020-01-01": 90}
+
+
+@pytest.mark.parametrize("weight", ["nan", "inf", "-Infinity"])
+def test_import_rejects_non_finite_weight(
+    client: TestClient, session: Session, weight: str
+):
+    body = f"date,weight\n2020-02-01,80\n2020-02-02,{weight}\n"
+
+    response = client.post(
+        "/weights/import", files={"file": ("weights.csv", body, "text/csv")}
+    )
+
+    assert response.status_code == 422
+    assert "Line 3" in response.json()["detail"]
+    session.rollback()
+    assert user_weights(session) == {"2020-01-01": 90}
+
+
+def test_import_for_missing_user(client: TestClient, session: Session):
+    authenticate(client, "create_all_weights")
+
+    response = client.post(
+        "/weights/import",
+        params={"user_id": 9},
+        files={"file": ("weights.csv", "date,weight\n2020-02-01,80\n", "text/csv")},
+    )
+
+    assert response.status_code == 404
+    assert session.exec(select(Weight).where(Weight.user_id == 9)).all() == []
+
+
+def test_import_for_another_user_requires_permission(client: TestClient):
+    response = client.post(
+        "/weights/import",
+        params={"user_id": 2},
+        files={"file": ("weights.csv", "date,weight\n", "text/csv")},
+    )
+
+    assert response.status_code == 400